@@ -0,0 +1,91 @@
+import argparse
+import json
+import shutil
+import subprocess
+import time
+from typing import Any, Callable, Dict, List
+
+from dmoj.executors.base_executor import BaseExecutor
+
+
+class TrueExecutor(BaseExecutor):
+    ext = 'txt'
+    command = 'true'
+    runtime_dict = {'true': shutil.which('true')}
+
+    def create_files(self, problem_id: str, source_code: bytes, *args, **kwargs) -> None:
+        # Launching needs a submission directory, even though there's nothing to put in it.
+        self._file()
+
+    def get_cmdline(self, **kwargs) -> List[str]:
+        return ['true']
+
+    def get_executable(self) -> str:
+        command = self.get_command()
+        assert command is not None
+        return command
+
+
+def prepare(executor: BaseExecutor) -> None:
+    executor.get_security(launch_kwargs={'path_case_fixes': [], 'path_whitelist': []})
+
+
+def spawn(executor: BaseExecutor) -> None:
+    process = executor.launch(time=10, memory=65536, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    process.communicate()
+
+
+def launches_per_second(
+    executor: BaseExecutor, func: Callable[[BaseExecutor], None], cached: bool, count: int
+) -> float:
+    func(executor)
+    start = time.perf_counter()
+    for _ in range(count):
+        if not cached:
+            # What every launch used to pay for.
+            executor._launch_template = None
+        func(executor)
+    return count / (time.perf_counter() - start)
+
+
+def run(count: int, modes: List[str]) -> List[Dict[str, Any]]:
+    executor = TrueExecutor('launch_benchmark', b'')
+    executor.create_files('launch_benchmark', b'')
+
+    funcs = {'prepare': prepare, 'spawn': spawn}
+    results = []
+    for mode in modes:
+        for cached in (False, True):
+            rate = launches_per_second(executor, funcs[mode], cached, count)
+            results.append({'mode': mode, 'template_cached': cached, 'launches_per_second': rate})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark sandboxed launches per second, with and without cached launch templates.'
+    )
+    parser.add_argument('--count', type=int, default=500, help='launches per configuration (default: 500)')
+    parser.add_argument(
+        '--mode',
+        choices=['prepare', 'spawn'],
+        action='append',
+        help='prepare: build the sandbox policy only; spawn: also run /bin/true in the sandbox (default: both)',
+    )
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.count, args.mode or ['prepare', 'spawn'])
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(
+            '%-8s template_cached=%-5s %10.1f launches/s'
+            % (result['mode'], result['template_cached'], result['launches_per_second'])
+        )
+
+
+if __name__ == '__main__':
+    main()
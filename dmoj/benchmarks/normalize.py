@@ -0,0 +1,98 @@
+import argparse
+import json
+import time
+from io import BytesIO, TextIOWrapper
+from typing import Any, BinaryIO, Callable, Dict, List
+
+from dmoj.utils import normalize
+
+
+def legacy_file_copy(src: BinaryIO, dst: BinaryIO, block_size: int = 16384) -> None:
+    # The TextIOWrapper-based implementation this module used to ship, kept here as a baseline.
+    reader = TextIOWrapper(src, encoding='iso-8859-1', newline=None)
+    writer = TextIOWrapper(dst, encoding='iso-8859-1', newline='\n')
+    last = '\n'
+    while True:
+        buf = reader.read(block_size)
+        if not buf:
+            break
+        writer.write(buf)
+        last = buf[-1]
+    if last != '\n':
+        writer.write('\n')
+    writer.flush()
+    writer.detach()
+    reader.detach()
+
+
+def replace_bytes(data: bytes) -> bytes:
+    # What TestCase._normalize used to do.
+    data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    return data
+
+
+def make_input(kind: str, size: int) -> bytes:
+    line = b'1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 18 19 20' + {'lf': b'\n', 'crlf': b'\r\n', 'cr': b'\r'}[kind]
+    return (line * (size // len(line) + 1))[:size]
+
+
+def time_once(func: Callable[[bytes], object], data: bytes) -> float:
+    start = time.perf_counter()
+    func(data)
+    return time.perf_counter() - start
+
+
+def run(size: int, repeat: int) -> List[Dict[str, Any]]:
+    def copy_with(impl: Callable) -> Callable[[bytes], object]:
+        def func(data: bytes) -> None:
+            old = normalize.normalize_newlines
+            normalize.normalize_newlines = impl
+            try:
+                normalize.normalized_file_copy(BytesIO(data), BytesIO())
+            finally:
+                normalize.normalize_newlines = old
+
+        return func
+
+    methods: Dict[str, Callable[[bytes], object]] = {
+        'legacy_file_copy': lambda data: legacy_file_copy(BytesIO(data), BytesIO()),
+        'python_file_copy': copy_with(normalize._normalize_newlines),
+        'replace_bytes': replace_bytes,
+        'python_bytes': lambda data: normalize._normalize_newlines(data, final=True),
+    }
+    if normalize.normalize_newlines is not normalize._normalize_newlines:
+        methods['native_file_copy'] = copy_with(normalize.normalize_newlines)
+        methods['native_bytes'] = normalize.normalized_bytes
+
+    results = []
+    for kind in ('lf', 'crlf', 'cr'):
+        data = make_input(kind, size)
+        for name, func in methods.items():
+            best = min(time_once(func, data) for _ in range(repeat))
+            results.append({'input': kind, 'method': name, 'seconds': best, 'mb_per_second': size / best / 1048576})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark newline normalization throughput.')
+    parser.add_argument('--size', type=int, default=100, help='input size in MiB (default: 100)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per method, best is reported (default: 3)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.size * 1048576, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(
+            '%-5s %-18s %8.3fs %10.1f MiB/s'
+            % (result['input'], result['method'], result['seconds'], result['mb_per_second'])
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dmoj.cptbox import TracedPopen
+from dmoj.executors.base_executor import BaseExecutor
+from dmoj.utils.unicode import utf8bytes
+
+# Each microprogram reads a benchmark and a number of iterations from stdin, and does one of these per iteration:
+# syscall: a system call the sandbox allows without trapping.
+# open: opening and closing a file, which traps to the filesystem policy.
+# thread: starting and joining a thread.
+# fork: forking and reaping a child.
+# io: writing 4 KiB to stdout.
+MICROPROGRAMS = {
+    'C': r"""
+#include <fcntl.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <string.h>
+#include <sys/syscall.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+static void *nothing(void *arg) { return arg; }
+
+int main() {
+    char mode[16], buffer[4096];
+    int n;
+    if (scanf("%15s %d", mode, &n) != 2)
+        return 2;
+    memset(buffer, 'x', sizeof buffer);
+    for (int i = 0; i < n; ++i) {
+        if (!strcmp(mode, "syscall")) {
+            syscall(SYS_getppid);
+        } else if (!strcmp(mode, "open")) {
+            int fd = open("/dev/null", O_RDONLY);
+            if (fd < 0)
+                return 1;
+            close(fd);
+        } else if (!strcmp(mode, "thread")) {
+            pthread_t thread;
+            if (pthread_create(&thread, NULL, nothing, NULL))
+                return 1;
+            pthread_join(thread, NULL);
+        } else if (!strcmp(mode, "fork")) {
+            pid_t pid = fork();
+            if (pid < 0)
+                return 1;
+            if (!pid)
+                _exit(0);
+            waitpid(pid, NULL, 0);
+        } else if (!strcmp(mode, "io")) {
+            if (write(1, buffer, sizeof buffer) != sizeof buffer)
+                return 1;
+        } else {
+            return 2;
+        }
+    }
+    return 0;
+}
+""",
+    'PY3': r"""
+import os
+import sys
+import threading
+
+mode, n = input().split()
+buffer = b'x' * 4096
+for _ in range(int(n)):
+    if mode == 'syscall':
+        os.getppid()
+    elif mode == 'open':
+        os.close(os.open('/dev/null', os.O_RDONLY))
+    elif mode == 'thread':
+        thread = threading.Thread(target=int)
+        thread.start()
+        thread.join()
+    elif mode == 'fork':
+        pid = os.fork()
+        if not pid:
+            os._exit(0)
+        os.waitpid(pid, 0)
+    elif mode == 'io':
+        sys.stdout.buffer.write(buffer)
+    else:
+        sys.exit(2)
+""",
+}
+
+ITERATIONS = {'syscall': 100000, 'open': 10000, 'thread': 1000, 'fork': 200, 'io': 20000}
+
+TIME_LIMIT = 60
+MEMORY_LIMIT = 262144
+
+
+def load_executor_class(language: str) -> Tuple[Optional[Any], str]:
+    from dmoj.executors import load_executor
+
+    executor = load_executor(language).Executor
+    # Like autoconfig, find the installed runtime without touching any configuration.
+    runtime, success, message, _ = executor.autoconfig()
+    if not success:
+        return None, message
+    executor_class = type('Executor', (executor,), {'runtime_dict': runtime})
+    executor_class.__module__ = executor.__module__
+    return executor_class, ''
+
+
+def run_native(executor: BaseExecutor, input: bytes) -> Tuple[float, str]:
+    template = executor.get_launch_template()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        executor.get_cmdline(),
+        executable=executor.get_executable(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=executor._dir,
+        env=template.env,
+    )
+    process.communicate(input)
+    return time.perf_counter() - start, 'ok' if process.returncode == 0 else 'returncode %d' % process.returncode
+
+
+def run_sandboxed(executor: BaseExecutor, input: bytes) -> Tuple[float, float, str]:
+    start = time.perf_counter()
+    process: TracedPopen = executor.launch(
+        time=TIME_LIMIT, memory=MEMORY_LIMIT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    spawned = time.perf_counter()
+    # The I/O microprogram writes more than the default output limit.
+    process.unsafe_communicate(input)
+    seconds = time.perf_counter() - start
+
+    if process.protection_fault:
+        status = 'protection fault: %s' % process.protection_fault[1]
+    elif process.is_tle or process.is_mle:
+        status = 'tle' if process.is_tle else 'mle'
+    elif process.returncode:
+        status = 'returncode %d' % process.returncode
+    else:
+        status = 'ok'
+    return seconds, spawned - start, status
+
+
+def measure(executor: BaseExecutor, name: str, input: bytes, runs: int, calls: int = 0) -> Dict[str, Any]:
+    native = [run_native(executor, input) for _ in range(runs)]
+    sandboxed = [run_sandboxed(executor, input) for _ in range(runs)]
+    statuses = [status for _, status in native] + [status for _, _, status in sandboxed]
+    status = next((status for status in statuses if status != 'ok'), 'ok')
+
+    native_ms = statistics.median(seconds for seconds, _ in native) * 1000
+    sandboxed_ms = statistics.median(seconds for seconds, _, _ in sandboxed) * 1000
+    result: Dict[str, Any] = {
+        'language': executor.get_executor_name(),
+        'benchmark': name,
+        'status': status,
+        'native_ms': native_ms,
+        'sandboxed_ms': sandboxed_ms,
+        'spawn_ms': statistics.median(spawn for _, spawn, _ in sandboxed) * 1000,
+        'overhead_ms': sandboxed_ms - native_ms,
+    }
+    if calls:
+        result['calls'] = calls
+        result['overhead_us_per_call'] = result['overhead_ms'] * 1000 / calls
+    return result
+
+
+def run(languages: List[str], benchmarks: List[str], runs: int, scale: float) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for language in languages:
+        executor_class, message = load_executor_class(language)
+        if executor_class is None:
+            results.append({'language': language, 'benchmark': 'startup', 'status': 'unavailable: ' + message})
+            continue
+
+        # The self-test program echoes its input, which is as close to doing nothing as every language gets.
+        executor = executor_class('overhead_benchmark', utf8bytes(executor_class.test_program))
+        results.append(measure(executor, 'startup', b'echo: Hello, World!\n', runs))
+
+        if language not in MICROPROGRAMS:
+            continue
+        executor = executor_class('overhead_benchmark', utf8bytes(MICROPROGRAMS[language]))
+        for benchmark in benchmarks:
+            calls = max(int(ITERATIONS[benchmark] * scale), 1)
+            results.append(measure(executor, benchmark, b'%s %d\n' % (benchmark.encode(), calls), runs, calls))
+    return results
+
+
+def find_regressions(
+    results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float, slack_ms: float
+) -> List[str]:
+    previous = {(result['language'], result['benchmark']): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result['language'], result['benchmark']))
+        if old is None or 'overhead_ms' not in old or 'overhead_ms' not in result:
+            continue
+        if old['status'] == 'ok' and result['status'] != 'ok':
+            regressions.append('%s %s: %s' % (result['language'], result['benchmark'], result['status']))
+        # Small overheads are mostly noise, so they only count once they grow past the slack as well.
+        elif result['overhead_ms'] > max(old['overhead_ms'], 0) * (1 + tolerance) + slack_ms:
+            regressions.append(
+                '%s %s: overhead %.3f ms, was %.3f ms'
+                % (result['language'], result['benchmark'], result['overhead_ms'], old['overhead_ms'])
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark the overhead of the sandbox over running natively, for startup of every language and '
+        'for syscall, open, thread, fork and I/O heavy microprograms.'
+    )
+    parser.add_argument(
+        '--language',
+        action='append',
+        help='executor to benchmark, skipped if its runtime is not installed (default: C, CPP17, PY3, PERL, RUBY, '
+        'V8JS, JAVA)',
+    )
+    parser.add_argument(
+        '--benchmark', choices=list(ITERATIONS), action='append', help='microprogram to run (default: all)'
+    )
+    parser.add_argument('--runs', type=int, default=5, help='runs per benchmark, of which the median is taken')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplier for microprogram iterations')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--output', help='also save results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results to compare against, exiting with 1 on regressions')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25, help='relative growth in overhead that is a regression (default: 0.25)'
+    )
+    parser.add_argument(
+        '--slack-ms', type=float, default=1.0, help='growth in overhead that is never a regression (default: 1.0)'
+    )
+    args = parser.parse_args()
+
+    results = run(
+        args.language or ['C', 'CPP17', 'PY3', 'PERL', 'RUBY', 'V8JS', 'JAVA'],
+        args.benchmark or list(ITERATIONS),
+        args.runs,
+        args.scale,
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            if 'overhead_ms' not in result:
+                print('%-6s %-8s %s' % (result['language'], result['benchmark'], result['status']))
+                continue
+            print(
+                '%-6s %-8s native %9.3f ms, sandboxed %9.3f ms, spawn %7.3f ms, overhead %9.3f ms%s%s'
+                % (
+                    result['language'],
+                    result['benchmark'],
+                    result['native_ms'],
+                    result['sandboxed_ms'],
+                    result['spawn_ms'],
+                    result['overhead_ms'],
+                    ' (%.3f us/call)' % result['overhead_us_per_call'] if 'calls' in result else '',
+                    '' if result['status'] == 'ok' else ' [%s]' % result['status'],
+                )
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance, args.slack_ms)
+        for regression in regressions:
+            print('Regression: ' + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
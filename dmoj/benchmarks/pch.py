@@ -0,0 +1,95 @@
+import argparse
+import json
+import shutil
+import statistics
+import time
+from typing import Any, Dict, List
+
+from dmoj.judgeenv import env
+
+PROGRAM = b"""\
+#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    int n;
+    cin >> n;
+    vector<long long> a(n);
+    for (auto &x : a) cin >> x;
+    sort(a.begin(), a.end());
+    cout << accumulate(a.begin(), a.end(), 0LL) << '\\n';
+}
+"""
+
+
+def time_compiles(executor_class, repeat: int) -> List[float]:
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        # Vary the problem name so that nothing is served from the binary cache.
+        executor_class(f'pch_benchmark_{i}', PROGRAM)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(language: str, compiler: str, repeat: int) -> List[Dict[str, Any]]:
+    from dmoj.executors import load_executor
+
+    executor = load_executor(language).Executor
+    # Like autoconfig, point the executor at the compiler to benchmark without touching any configuration.
+    executor_class = type('Executor', (executor,), {'runtime_dict': {executor.command: compiler}})
+    executor_class.__module__ = executor.__module__
+
+    results = []
+    for precompiled_headers in (False, True):
+        env['precompiled_headers'] = precompiled_headers
+        first = time_compiles(executor_class, 1)[0]
+        times = time_compiles(executor_class, repeat)
+        results.append(
+            {
+                'language': language,
+                'precompiled_headers': precompiled_headers,
+                'first_seconds': first,
+                'median_seconds': statistics.median(times),
+                'min_seconds': min(times),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark sandboxed compile time of a bits/stdc++.h submission, with and without '
+        'precompiled headers.'
+    )
+    parser.add_argument('--language', default='CPP17', help='C++ executor to benchmark (default: CPP17)')
+    parser.add_argument('--compiler', default='g++', help='compiler to benchmark (default: g++)')
+    parser.add_argument('--repeat', type=int, default=5, help='compiles per configuration (default: 5)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    compiler = shutil.which(args.compiler)
+    if compiler is None:
+        parser.error(f'compiler not found: {args.compiler}')
+
+    results = run(args.language, compiler, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    # The first compile with precompiled headers includes building the header, unless it was already built.
+    for result in results:
+        print(
+            '%-8s pch=%-5s first %6.2fs median %6.2fs min %6.2fs'
+            % (
+                result['language'],
+                result['precompiled_headers'],
+                result['first_seconds'],
+                result['median_seconds'],
+                result['min_seconds'],
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
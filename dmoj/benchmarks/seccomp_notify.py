@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from dmoj.cptbox import PIPE, SECCOMP_NOTIFY_SUPPORTED, TracedPopen
+from dmoj.cptbox.isolate import IsolateTracer
+from dmoj.executors.base_executor import BASE_FILESYSTEM, BASE_WRITE_FILESYSTEM
+
+
+def stat_files(paths: List[str], seccomp_notify: bool) -> Dict[str, Any]:
+    stat = shutil.which('stat')
+    assert stat is not None
+    # Every path is checked against the sandbox's filesystem policy, like the headers and libraries a compiler opens.
+    security = IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM)
+    start = time.perf_counter()
+    process = TracedPopen(
+        [b'stat', b'-L', b'-c', b'%s'] + [os.fsencode(path) for path in paths],
+        executable=os.fsencode(stat),
+        security=security,
+        time=60,
+        memory=262144,
+        stdout=PIPE,
+        stderr=PIPE,
+        seccomp_notify=seccomp_notify,
+    )
+    stdout, stderr = process.communicate()
+    return {
+        'seconds': time.perf_counter() - start,
+        'uses_seccomp_notify': process.uses_seccomp_notify,
+        'returncode': process.returncode,
+        'protection_fault': process.protection_fault,
+        'stdout': stdout,
+        'stderr': stderr,
+    }
+
+
+def run(count: int, runs: int) -> List[Dict[str, Any]]:
+    stat = shutil.which('stat')
+    assert stat is not None
+    with tempfile.TemporaryDirectory() as dir:
+        # Outside the policy, so every backend must deny it the same way.
+        denied = os.path.join(dir, 'denied')
+        open(denied, 'w').close()
+        paths = [os.path.realpath(stat)] * count + [denied]
+
+        results = []
+        for seccomp_notify in (False, True) if SECCOMP_NOTIFY_SUPPORTED else (False,):
+            samples = [stat_files(paths, seccomp_notify) for _ in range(runs)]
+            result = samples[-1]
+            result['backend'] = 'seccomp_notify' if seccomp_notify else 'ptrace'
+            result['seconds'] = statistics.median(sample['seconds'] for sample in samples)
+            result['checks_per_second'] = len(paths) / result['seconds']
+            results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark filesystem access checks in the sandbox, traced with ptrace and with seccomp user '
+        'notifications.'
+    )
+    parser.add_argument('--count', type=int, default=10000, help='files to stat per run (default: 10000)')
+    parser.add_argument('--runs', type=int, default=5, help='runs per backend, of which the median is taken')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.count, args.runs)
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {key: result[key] for key in ('backend', 'uses_seccomp_notify', 'seconds', 'checks_per_second')}
+                    for result in results
+                ],
+                indent=2,
+            )
+        )
+        return
+
+    for result in results:
+        print('%-14s %8.3f s %10.1f checks/s' % (result['backend'], result['seconds'], result['checks_per_second']))
+
+
+if __name__ == '__main__':
+    main()
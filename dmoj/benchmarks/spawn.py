@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import time
+from typing import Any, Dict, List
+
+from dmoj.cptbox import PIPE, TracedPopen
+from dmoj.cptbox.isolate import IsolateTracer
+from dmoj.executors.base_executor import BASE_FILESYSTEM, BASE_WRITE_FILESYSTEM
+
+
+def get_rss() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def spawn_true() -> float:
+    true = shutil.which('true')
+    assert true is not None
+    security = IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM)
+    # TracedPopen returns once the child is running, before it execs.
+    start = time.perf_counter()
+    process = TracedPopen(
+        [b'true'], executable=os.fsencode(true), security=security, time=10, memory=65536, stdout=PIPE, stderr=PIPE
+    )
+    seconds = time.perf_counter() - start
+    process.communicate()
+    assert process.returncode == 0, process.protection_fault
+    return seconds
+
+
+def run(sizes: List[int], runs: int) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        # Touched, so that every page is mapped into the judge like the data it actually holds.
+        ballast = b'\1' * (size << 20)
+        samples = [spawn_true() for _ in range(runs)]
+        results.append(
+            {
+                'ballast_mb': size,
+                'rss_mb': get_rss() / (1 << 20),
+                'spawn_ms': statistics.median(samples) * 1000,
+            }
+        )
+        del ballast
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Benchmark how long spawning a sandboxed process takes against the memory used by the judge.'
+    )
+    parser.add_argument(
+        '--sizes', default='0,256,1024,4096', help='comma-separated MiB of memory to hold while spawning'
+    )
+    parser.add_argument('--runs', type=int, default=50, help='spawns per size, of which the median is taken')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(',')], args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print('%8.1f MiB RSS %8.3f ms' % (result['rss_mb'], result['spawn_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,23 @@
 import os
+import select
 import shlex
 import subprocess
+import time
+from typing import Dict, Hashable, Optional, TYPE_CHECKING, Tuple, Union
 
 from dmoj.contrib import contrib_modules
+from dmoj.cptbox import TracedPopen
 from dmoj.cptbox.filesystem_policies import ExactFile
+from dmoj.cptbox.utils import MemoryIO
 from dmoj.error import InternalError
 from dmoj.judgeenv import env, get_problem_root
 from dmoj.result import CheckerResult
-from dmoj.utils.helper_files import compile_with_auxiliary_files, mkdtemp, mktemp
+from dmoj.utils.helper_files import compile_with_auxiliary_files, mkdtemp, parse_helper_file_error
 from dmoj.utils.unicode import utf8text
 
+if TYPE_CHECKING:
+    from dmoj.executors.base_executor import BaseExecutor
+
 
 def get_executor(problem_id, storage_namespace, files, flags, lang, compiler_time_limit):
     if isinstance(files, str):
@@ -23,6 +31,184 @@ def get_executor(problem_id, storage_namespace, files, flags, lang, compiler_tim
     return executor
 
 
+def compile_checker(
+    problem_id,
+    storage_namespace,
+    files,
+    lang='CPP17',
+    compiler_time_limit=env['generator_compiler_limit'],
+    flags=None,
+    type='default',
+    **kwargs,
+):
+    # Don't modify the list passed in, which may be shared with the problem configuration.
+    flags = list(flags or [])
+    if lang == 'PAS':
+        flags.append('-Fu/usr/lib/fpc')
+    elif type == 'themis':
+        # Actually it should be `defines` instead of `flags`
+        # but using `defines` requires more changes
+        flags.append('-DTHEMIS')
+    elif type == 'cms':
+        flags.append('-DCMS')
+    return get_executor(problem_id, storage_namespace, files, flags, lang, compiler_time_limit)
+
+
+class _AnsweredCheck:
+    # What parsing the verdict needs of a checker's process, for a check answered by a checker server.
+    is_tle = is_mle = is_ole = is_rte = False
+    protection_fault = None
+    signal = None
+    was_initialized = True
+
+    def __init__(self, returncode: int) -> None:
+        self.returncode = returncode
+
+    @property
+    def is_ir(self) -> bool:
+        return self.returncode > 0
+
+
+class _TimedOutCheck(_AnsweredCheck):
+    is_tle = True
+
+
+CheckProcess = Union[TracedPopen, _AnsweredCheck]
+
+
+class CheckerServer:
+    """
+    A checker that keeps running for the whole submission and is sent every check, instead of being launched for each
+    case, which is what most of the time goes to on problems with many cases.
+
+    Each check is sent to its stdin as a line of the arguments it would otherwise be launched with. It answers with a
+    line of the code it would otherwise exit with and the number of bytes it would print to stdout and to stderr,
+    followed by those bytes. The checker stays in the same sandbox throughout, and each check is limited in time like
+    a checker of its own.
+    """
+
+    MAX_HEADER = 1024
+    # As much as is read from what a checker of its own prints.
+    MAX_OUTPUT = 10485760
+
+    def __init__(self, executor: 'BaseExecutor', time_limit: float, memory_limit: int) -> None:
+        self.executor = executor
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self._buffer = b''
+
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            # The time limit applies to each check instead, see _read_answer.
+            self.process = executor.launch(
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull, memory=memory_limit
+            )
+        finally:
+            os.close(devnull)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    def check(
+        self, args_format_string: str, input_path: str, output_path: str, answer_path: str
+    ) -> Tuple[CheckProcess, bytes, bytes]:
+        """
+        :return: what to parse the verdict from as the checker's process, and what the checker printed to stdout and
+                 stderr.
+        """
+        # The sandbox was set up before these files existed, but it can read the temporary directory.
+        with mkdtemp() as dir:
+            paths = {}
+            for name, path in (('input_file', input_path), ('output_file', output_path), ('answer_file', answer_path)):
+                paths[name] = os.path.join(dir, name)
+                os.symlink(path, paths[name])
+            args = args_format_string.format(**{name: shlex.quote(path) for name, path in paths.items()})
+
+            start_time = self.process.execution_time
+            start_wall_time = time.monotonic()
+            try:
+                assert self.process.stdin is not None
+                self.process.stdin.write(args.encode() + b'\n')
+                self.process.stdin.flush()
+            except BrokenPipeError:
+                pass
+            return self._read_answer(start_time, start_wall_time)
+
+    def _read_answer(self, start_time: float, start_wall_time: float) -> Tuple[CheckProcess, bytes, bytes]:
+        assert self.process.stdout is not None
+        fd = self.process.stdout.fileno()
+        while True:
+            answer = self._parse_answer()
+            if answer is not None:
+                return answer
+
+            # Like the supervisor of a checker of its own, as neither clock can run faster than real time.
+            time_left = min(
+                self.time_limit - (self.process.execution_time - start_time),
+                self.time_limit * 3 - (time.monotonic() - start_wall_time),
+            )
+            if time_left <= 0:
+                self.close()
+                return _TimedOutCheck(self.process.wait()), b'', b''
+
+            if select.select([fd], [], [], time_left)[0]:
+                data = os.read(fd, 65536)
+                if not data:
+                    return self._died()
+                self._buffer += data
+
+    def _parse_answer(self) -> Optional[Tuple[CheckProcess, bytes, bytes]]:
+        header, newline, rest = self._buffer.partition(b'\n')
+        if not newline:
+            if len(header) > self.MAX_HEADER:
+                self.close()
+                raise InternalError('invalid answer from checker server: %r' % header[: self.MAX_HEADER])
+            return None
+
+        try:
+            code, stdout_length, stderr_length = map(int, header.split())
+        except ValueError:
+            self.close()
+            raise InternalError('invalid answer from checker server: %r' % header[: self.MAX_HEADER])
+        if not 0 <= stdout_length <= self.MAX_OUTPUT or not 0 <= stderr_length <= self.MAX_OUTPUT:
+            self.close()
+            raise InternalError('checker server answered with more than %d bytes' % self.MAX_OUTPUT)
+
+        if len(rest) < stdout_length + stderr_length:
+            return None
+        self._buffer = rest[stdout_length + stderr_length :]
+        return _AnsweredCheck(code), rest[:stdout_length], rest[stdout_length : stdout_length + stderr_length]
+
+    def _died(self) -> Tuple[CheckProcess, bytes, bytes]:
+        self.close()
+        # Exiting is only a verdict for checkers that aren't servers.
+        parse_helper_file_error(self.process, self.executor, 'checker server', b'', self.time_limit, self.memory_limit)
+        raise InternalError('checker server exited without answering')
+
+    def close(self) -> None:
+        self.process.kill()
+        self.process.wait()
+        for file in (self.process.stdin, self.process.stdout):
+            if file:
+                file.close()
+
+
+_servers: Dict[Tuple[Hashable, float, int], CheckerServer] = {}
+
+
+def get_checker_server(
+    checker: Hashable, executor: 'BaseExecutor', time_limit: float, memory_limit: int
+) -> CheckerServer:
+    # Checkers are compiled again for every case, and not all of them are cached, so servers are kept for the checker
+    # rather than for its executor.
+    key = (checker, time_limit, memory_limit)
+    server = _servers.get(key)
+    if server is None or not server.alive:
+        server = _servers[key] = CheckerServer(executor, time_limit, memory_limit)
+    return server
+
+
 def check(
     process_output,
     judge_output,
@@ -43,19 +229,11 @@ def check(
     output_name=None,
     treat_checker_points_as_percentage=False,
     storage_namespace=None,
+    persistent=False,
     **kwargs,
 ) -> CheckerResult:
 
-    flags = flags or []
-    if lang == 'PAS':
-        flags.append('-Fu/usr/lib/fpc')
-    elif type == 'themis':
-        # Actually it should be `defines` instead of `flags`
-        # but using `defines` requires more changes
-        flags.append('-DTHEMIS')
-    elif type == 'cms':
-        flags.append('-DCMS')
-    executor = get_executor(problem_id, storage_namespace, files, flags, lang, compiler_time_limit)
+    executor = compile_checker(problem_id, storage_namespace, files, lang, compiler_time_limit, flags, type)
 
     if type not in contrib_modules:
         raise InternalError('%s is not a valid contrib module' % type)
@@ -69,24 +247,26 @@ def check(
         """
         if not input_name or not output_name:
             raise InternalError('Themis checker need input & output files')
+        if persistent:
+            raise InternalError('Themis checker cannot be persistent')
 
-        with mkdtemp() as test_data_folder, mkdtemp() as user_output_folder:
+        with mkdtemp() as test_data_folder, mkdtemp() as user_output_folder, MemoryIO(
+            prefill=process_output, seal=True
+        ) as output_io:
             if test_data_folder[-1] != '/':
                 test_data_folder += '/'
             if user_output_folder[-1] != '/':
                 user_output_folder += '/'
 
+            # The files are links to the data in memory, like file IO gives submissions their input, rather than copies.
             input_file_path = os.path.join(test_data_folder, os.path.basename(input_name))
-            with open(input_file_path, 'wb') as f:
-                f.write(judge_input)
+            os.symlink(case.input_data_io().to_path(), input_file_path)
 
             answer_file_path = os.path.join(test_data_folder, os.path.basename(output_name))
-            with open(answer_file_path, 'wb') as f:
-                f.write(judge_output)
+            os.symlink(case.output_data_io().to_path(), answer_file_path)
 
             user_output_file_path = os.path.join(user_output_folder, os.path.basename(output_name))
-            with open(user_output_file_path, 'wb') as f:
-                f.write(process_output)
+            os.symlink(output_io.to_path(), user_output_file_path)
 
             process = executor.launch(
                 stdin=subprocess.PIPE,
@@ -112,28 +292,35 @@ def check(
                 stderr=error,
             )
 
-    with mktemp(process_output) as output_file, mktemp(judge_output) as answer_file:
+    with MemoryIO(prefill=process_output, seal=True) as output_io:
         input_path = case.input_data_io().to_path()
+        output_path = output_io.to_path()
+        answer_path = case.output_data_io().to_path()
 
         args_format_string = args_format_string or contrib_modules[type].ContribModule.get_checker_args_format_string()
 
-        checker_args = shlex.split(
-            args_format_string.format(
-                input_file=shlex.quote(input_path),
-                output_file=shlex.quote(output_file.name),
-                answer_file=shlex.quote(answer_file.name),
+        if persistent:
+            checker = (storage_namespace, problem_id, str(files), lang, str(flags), type)
+            server = get_checker_server(checker, executor, time_limit, memory_limit)
+            process, proc_output, error = server.check(args_format_string, input_path, output_path, answer_path)
+        else:
+            checker_args = shlex.split(
+                args_format_string.format(
+                    input_file=shlex.quote(input_path),
+                    output_file=shlex.quote(output_path),
+                    answer_file=shlex.quote(answer_path),
+                )
+            )
+            process = executor.launch(
+                *checker_args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                memory=memory_limit,
+                time=time_limit,
+                extra_fs=[ExactFile(input_path), ExactFile(output_path), ExactFile(answer_path)],
             )
-        )
-        process = executor.launch(
-            *checker_args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            memory=memory_limit,
-            time=time_limit,
-            extra_fs=[ExactFile(input_path)],
-        )
 
-        proc_output, error = process.communicate()
+            proc_output, error = process.communicate()
         proc_output = utf8text(proc_output, 'replace')
 
         return contrib_modules[type].ContribModule.parse_return_code(
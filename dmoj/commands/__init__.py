@@ -1,5 +1,6 @@
 from typing import List, Type
 
+from dmoj.commands.archive import ConvertArchiveCommand
 from dmoj.commands.base_command import Command, commands, register_command
 from dmoj.commands.diff import DifferenceCommand
 from dmoj.commands.help import HelpCommand
@@ -27,4 +28,5 @@ all_commands: List[Type[Command]] = [
     HelpCommand,
     QuitCommand,
     ValidateCommand,
+    ConvertArchiveCommand,
 ]
@@ -0,0 +1,54 @@
+import os
+
+from dmoj.commands.base_command import Command
+from dmoj.error import InvalidCommandException
+from dmoj.judgeenv import get_problem_root
+from dmoj.problem import ProblemConfig, ProblemDataManager
+from dmoj.utils.ansi import print_ansi
+from dmoj.utils.archive import ARCHIVE_FORMATS, BadArchiveError, convert_archive
+
+
+class ConvertArchiveCommand(Command):
+    name = 'convert-archive'
+    help = (
+        'Rewrites the test data archives of problems in another format. '
+        '"zstd" and "stored" trade archive size for faster decoding at judge time.'
+    )
+
+    def _populate_parser(self) -> None:
+        self.arg_parser.add_argument('problem_ids', nargs='+', help='ids of problems whose archives to convert')
+        self.arg_parser.add_argument(
+            '-f', '--format', choices=ARCHIVE_FORMATS, default='zstd', help='archive format to convert to'
+        )
+        self.arg_parser.add_argument('-l', '--level', type=int, default=3, help='zstd compression level')
+
+    def execute(self, line: str) -> int:
+        args = self.arg_parser.parse_args(line)
+
+        failed = 0
+        for problem_id in args.problem_ids:
+            problem_root = get_problem_root(problem_id)
+            if problem_root is None:
+                raise InvalidCommandException(f"unknown problem '{problem_id}'")
+
+            config = ProblemConfig(ProblemDataManager(problem_root))
+            if not config.archive:
+                print_ansi(f'Problem #ansi[{problem_id}](cyan|bold) #ansi[has no archive](magenta|bold), skipping.')
+                continue
+
+            archive_path = os.path.join(problem_root, config.archive)
+            old_size = os.path.getsize(archive_path)
+            try:
+                convert_archive(archive_path, args.format, level=args.level)
+            except (BadArchiveError, OSError) as e:
+                print_ansi(f'Problem #ansi[{problem_id}](cyan|bold) #ansi[failed to convert](red|bold): {e}')
+                failed += 1
+                continue
+
+            new_size = os.path.getsize(archive_path)
+            print_ansi(
+                f'Problem #ansi[{problem_id}](cyan|bold) converted to {args.format}: '
+                f'{old_size / 1048576:.1f} MiB -> {new_size / 1048576:.1f} MiB'
+            )
+
+        return failed
@@ -1,5 +1,6 @@
 from dmoj.cptbox._cptbox import (
     Debugger,
+    LANDLOCK_SUPPORTED,
     NATIVE_ABI,
     PTBOX_ABI_ARM,
     PTBOX_ABI_ARM64,
@@ -7,6 +8,7 @@ from dmoj.cptbox._cptbox import (
     PTBOX_ABI_X32,
     PTBOX_ABI_X64,
     PTBOX_ABI_X86,
+    SECCOMP_NOTIFY_SUPPORTED,
 )
 from dmoj.cptbox.handlers import ALLOW, DISALLOW
 from dmoj.cptbox.isolate import FilesystemSyscallKind, IsolateTracer
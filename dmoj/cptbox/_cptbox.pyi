@@ -1,4 +1,4 @@
-from typing import Callable, Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
 
 PTBOX_ABI_X86: int
 PTBOX_ABI_X64: int
@@ -40,6 +40,50 @@ class Debugger:
     def writestr(self, address: int, s: str) -> None: ...
     def on_return(self, callback: Callable[[], None]): ...
 
+PTBOX_FS_NONE: int
+PTBOX_FS_EXACT: int
+PTBOX_FS_RECURSIVE: int
+PTBOX_FS_FILE: int
+PTBOX_FS_IMMUTABLE: int
+
+PTBOX_FS_CHECK_NONE: int
+PTBOX_FS_CHECK_READ: int
+PTBOX_FS_CHECK_WRITE: int
+PTBOX_FS_CHECK_OPEN: int
+PTBOX_FS_CHECK_FSTAT: int
+
+class SyscallTable:
+    def __init__(
+        self,
+        handlers: List[List[int]],
+        seccomp_handlers: List[int],
+        fs_rules: List[List[int]],
+        arg_rules: List[List[Optional[Tuple[Tuple[int, Tuple[int, ...], bool], ...]]]],
+    ): ...
+
+class NativeFilesystemPolicy:
+    def __init__(self, nodes: Iterable[Tuple[str, int]]): ...
+    def check(self, path: str) -> bool: ...
+    def check_path(self, path: str, *others: NativeFilesystemPolicy) -> bool: ...
+    @property
+    def cache_size(self) -> int: ...
+
+class SeccompNotification:
+    tid: int
+    abi: int
+    syscall: int
+    args: Tuple[int, int, int, int, int, int]
+    def readstr(self, address: int, max_size: int = ...) -> Optional[bytes]: ...
+
+SECCOMP_NOTIFY_SUPPORTED: bool
+LANDLOCK_SUPPORTED: bool
+
+PTBOX_SECCOMP_LANDLOCK_OPEN: int
+PTBOX_LANDLOCK_READ_FILE: int
+PTBOX_LANDLOCK_READ_DIR: int
+PTBOX_LANDLOCK_WRITE_FILE: int
+PTBOX_LANDLOCK_WRITE_DIR: int
+
 class Process:
     debugger: Debugger
     _child_stdin: int
@@ -47,6 +91,7 @@ class Process:
     _child_stderr: int
     _child_fd_3: int
     _child_fd_4: int
+    _cgroup_fd: int
     _child_memory: int
     _child_address: int
     _child_personality: int
@@ -57,14 +102,19 @@ class Process:
 
     use_seccomp: bool
     _trace_syscalls: bool
+    _use_seccomp_notify: bool
     def create_debugger(self) -> Debugger: ...
     def _callback(self, syscall: int) -> bool: ...
+    def _notify_callback(self, notification: SeccompNotification) -> int: ...
     def _ptrace_error(self, errno: int) -> None: ...
     def _protection_fault(self, syscall: int, is_update: bool) -> None: ...
     def _cpu_time_exceeded(self) -> None: ...
     def _handler(self, abi: int, syscall: int, handler: int) -> None: ...
-    def _get_seccomp_whitelist(self) -> List[bool]: ...
-    def _get_seccomp_errnolist(self) -> List[int]: ...
+    def _set_syscall_table(self, table: SyscallTable) -> None: ...
+    def _set_fs_policies(self, read: List[NativeFilesystemPolicy], write: List[NativeFilesystemPolicy]) -> None: ...
+    def _set_landlock_rules(self, rules: Optional[List[Tuple[bytes, int]]]) -> None: ...
+    def _profile_traps(self) -> None: ...
+    def _get_trap_counts(self) -> List[Tuple[int, int, int]]: ...
     def _spawn(self, file: bytes, args: List[bytes], env: List[bytes], chdir: bytes = ...) -> None: ...
     def _monitor(self) -> int: ...
     @property
@@ -74,12 +124,18 @@ class Process:
     @property
     def was_initialized(self) -> bool: ...
     @property
+    def uses_seccomp_notify(self) -> bool: ...
+    @property
+    def uses_landlock(self) -> bool: ...
+    @property
     def pid(self) -> int: ...
     @property
     def execution_time(self) -> float: ...
     @property
     def wall_clock_time(self) -> float: ...
     @property
+    def _stop_time(self) -> float: ...
+    @property
     def cpu_time(self) -> float: ...
     @property
     def max_memory(self) -> int: ...
@@ -98,6 +154,8 @@ PTBOX_SPAWN_FAIL_SECCOMP: int
 PTBOX_SPAWN_FAIL_TRACEME: int
 PTBOX_SPAWN_FAIL_EXECVE: int
 PTBOX_SPAWN_FAIL_SETAFFINITY: int
+PTBOX_SPAWN_FAIL_LANDLOCK: int
+PTBOX_SPAWN_FAIL_CGROUP: int
 
 AT_FDCWD: int
 bsd_get_proc_cwd: Callable[[int], str]
@@ -106,5 +164,9 @@ bsd_get_proc_fdno: Callable[[int, int], str]
 memfd_create: Callable[[], int]
 memfd_seal: Callable[[int], None]
 
+def communicate(
+    stdin: int, input: bytes, stdout: int, stderr: int, outlimit: int, errlimit: int
+) -> Tuple[bytes, bytes, Optional[int]]: ...
+
 class BufferProxy:
     def _get_real_buffer(self): ...
@@ -2,20 +2,28 @@
 from cpython.exc cimport PyErr_NoMemory, PyErr_SetFromErrno
 from cpython.buffer cimport PyObject_GetBuffer
 from cpython.bytes cimport PyBytes_AsString, PyBytes_AsStringAndSize, PyBytes_FromStringAndSize
+from libc.stdint cimport uint64_t
 from libc.stdio cimport FILE, fopen, fclose, fgets, sprintf
-from libc.stdlib cimport malloc, free, strtoul
-from libc.string cimport strncmp, strlen
+from libc.stdlib cimport calloc, malloc, free, strtoul
+from libc.string cimport memset, strncmp, strlen
 from libc.signal cimport SIGTRAP, SIGXCPU
 from libcpp cimport bool
+from libcpp.string cimport string
+from libcpp.vector cimport vector
 from posix.resource cimport rusage
 from posix.types cimport pid_t
 
-__all__ = ['Process', 'Debugger', 'bsd_get_proc_cwd', 'bsd_get_proc_fdno', 'MAX_SYSCALL_NUMBER',
+__all__ = ['Process', 'Debugger', 'SyscallTable', 'NativeFilesystemPolicy', 'SeccompNotification',
+           'SECCOMP_NOTIFY_SUPPORTED', 'LANDLOCK_SUPPORTED', 'bsd_get_proc_cwd', 'bsd_get_proc_fdno', 'MAX_SYSCALL_NUMBER',
            'AT_FDCWD', 'ALL_ABIS', 'SUPPORTED_ABIS', 'NATIVE_ABI',
            'PTBOX_ABI_X86', 'PTBOX_ABI_X64', 'PTBOX_ABI_X32', 'PTBOX_ABI_ARM', 'PTBOX_ABI_ARM64',
            'PTBOX_ABI_FREEBSD_X64', 'PTBOX_ABI_INVALID', 'PTBOX_ABI_COUNT',
            'PTBOX_SPAWN_FAIL_NO_NEW_PRIVS', 'PTBOX_SPAWN_FAIL_SECCOMP', 'PTBOX_SPAWN_FAIL_TRACEME',
-           'PTBOX_SPAWN_FAIL_EXECVE', 'PTBOX_SPAWN_FAIL_SETAFFINITY']
+           'PTBOX_SPAWN_FAIL_EXECVE', 'PTBOX_SPAWN_FAIL_SETAFFINITY', 'PTBOX_SPAWN_FAIL_LANDLOCK',
+           'PTBOX_SPAWN_FAIL_CGROUP', 'PTBOX_SECCOMP_LANDLOCK_OPEN', 'PTBOX_LANDLOCK_READ_FILE', 'PTBOX_LANDLOCK_READ_DIR',
+           'PTBOX_LANDLOCK_WRITE_FILE', 'PTBOX_LANDLOCK_WRITE_DIR',
+           'PTBOX_FS_NONE', 'PTBOX_FS_EXACT', 'PTBOX_FS_RECURSIVE', 'PTBOX_FS_FILE', 'PTBOX_FS_IMMUTABLE',
+           'PTBOX_FS_CHECK_NONE', 'PTBOX_FS_CHECK_READ', 'PTBOX_FS_CHECK_WRITE', 'PTBOX_FS_CHECK_OPEN', 'PTBOX_FS_CHECK_FSTAT']
 
 
 cdef extern from 'ptbox.h' nogil:
@@ -27,6 +35,15 @@ cdef extern from 'ptbox.h' nogil:
     ctypedef int (*pt_fork_handler)(void *context)
     ctypedef int (*pt_event_callback)(void *context, int event, unsigned long param)
 
+    cdef struct pt_notification:
+        uint64_t id
+        pid_t tid
+        int abi
+        int syscall
+        unsigned long args[6]
+
+    ctypedef int (*pt_notify_callback)(void *context, const pt_notification *notification)
+
     cdef cppclass pt_debugger:
         int syscall()
         int syscall(int)
@@ -56,13 +73,38 @@ cdef extern from 'ptbox.h' nogil:
         int abi()
         void on_return(pt_syscall_return_callback callback, void *context)
 
+    cdef cppclass pt_fs_policy:
+        bint add(const char *path, int type) except +
+        bint check(const char *path) except +
+        size_t cache_size()
+
+    bint pt_fs_check_path(const vector[const pt_fs_policy *] &policies, const string &path, bint cacheable) except +
+
+    cdef struct pt_arg_condition:
+        int reg
+        bool match_pid
+        vector[unsigned long] values
+
+    cdef cppclass pt_arg_rule:
+        vector[pt_arg_condition] conditions
+
     cdef cppclass pt_process:
         pt_process(pt_debugger *) except +
         void set_callback(pt_handler_callback callback, void* context)
         void set_event_proc(pt_event_callback, void *context)
         int set_handler(int abi, int syscall, int handler)
+        void set_handlers(const int *handlers, const int *fs_rules, const pt_arg_rule **arg_rules)
+        void clear_fs_policies()
+        void add_fs_policy(bint write, const pt_fs_policy *policy) except +
+        void set_notify_callback(pt_notify_callback callback, void *context)
+        bint use_seccomp_notify()
+        void use_seccomp_notify(bint value)
+        char *notify_readstr(const pt_notification *notification, unsigned long addr, size_t max_size)
         bint trace_syscalls()
         void trace_syscalls(bint value)
+        void profile_traps()
+        unsigned long trap_count(int abi, int syscall)
+        double stop_time()
         int spawn(pt_fork_handler, void *context)
         int monitor()
         int getpid()
@@ -86,6 +128,20 @@ cdef extern from 'ptbox.h' nogil:
     cdef int PTBOX_EXIT_NORMAL
     cdef int PTBOX_EXIT_PROTECTION
 
+    cpdef enum:
+        PTBOX_FS_NONE
+        PTBOX_FS_EXACT
+        PTBOX_FS_RECURSIVE
+        PTBOX_FS_FILE
+        PTBOX_FS_IMMUTABLE
+
+    cpdef enum:
+        PTBOX_FS_CHECK_NONE
+        PTBOX_FS_CHECK_READ
+        PTBOX_FS_CHECK_WRITE
+        PTBOX_FS_CHECK_OPEN
+        PTBOX_FS_CHECK_FSTAT
+
     cpdef enum:
         PTBOX_ABI_X86
         PTBOX_ABI_X64
@@ -122,11 +178,20 @@ cdef extern from 'helper.h' nogil:
         int fd_3_
         int fd_4_
         int abi_for_seccomp
-        int *seccomp_handlers
+        void *seccomp_filter
+        int seccomp_notify
+        char **landlock_paths
+        int *landlock_access
+        int cgroup_fd
         unsigned long cpu_affinity_mask
 
     void cptbox_closefrom(int lowfd)
     int cptbox_child_run(child_config *)
+    void *cptbox_seccomp_compile(const int *handlers, const pt_arg_rule **arg_rules)
+    void cptbox_seccomp_free(void *)
+    int cptbox_seccomp_notify_supported()
+    cdef int PTBOX_SECCOMP_NOTIFY
+    int cptbox_landlock_abi()
     char *_bsd_get_proc_cwd "bsd_get_proc_cwd"(pid_t pid)
     char *_bsd_get_proc_fdno "bsd_get_proc_fdno"(pid_t pid, int fdno)
 
@@ -136,10 +201,29 @@ cdef extern from 'helper.h' nogil:
         PTBOX_SPAWN_FAIL_TRACEME
         PTBOX_SPAWN_FAIL_EXECVE
         PTBOX_SPAWN_FAIL_SETAFFINITY
+        PTBOX_SPAWN_FAIL_LANDLOCK
+        PTBOX_SPAWN_FAIL_CGROUP
+
+    cpdef enum:
+        PTBOX_SECCOMP_LANDLOCK_OPEN
+        PTBOX_LANDLOCK_READ_FILE
+        PTBOX_LANDLOCK_READ_DIR
+        PTBOX_LANDLOCK_WRITE_FILE
+        PTBOX_LANDLOCK_WRITE_DIR
 
     int cptbox_memfd_create()
     int cptbox_memfd_seal(int fd)
 
+    cdef struct pt_output:
+        char *data
+        size_t size
+        size_t capacity
+        size_t limit
+        int exceeded
+
+    int cptbox_communicate(int in_fd, const char *input, size_t input_size, int out_fd, pt_output *out, int err_fd,
+                           pt_output *err)
+
 
 cdef extern from 'fcntl.h' nogil:
     cpdef enum:
@@ -149,6 +233,8 @@ cdef extern from "errno.h":
     int errno
 
 MAX_SYSCALL_NUMBER = MAX_SYSCALL
+SECCOMP_NOTIFY_SUPPORTED = cptbox_seccomp_notify_supported() != 0
+LANDLOCK_SUPPORTED = cptbox_landlock_abi() > 0
 
 cdef int pt_child(void *context) noexcept nogil:
     cdef child_config *config = <child_config*> context
@@ -166,6 +252,9 @@ cdef void pt_syscall_return_handler(void *context, pid_t pid, int syscall) noexc
 cdef int pt_event_handler(void *context, int event, unsigned long param) noexcept nogil:
     return (<Process>context)._event_handler(event, param)
 
+cdef int pt_notify_handler(void *context, const pt_notification *notification) noexcept nogil:
+    return (<Process>context)._notify_handler(notification)
+
 cdef char **alloc_byte_array(list list) except NULL:
     cdef size_t length = len(list)
     cdef char **array = <char**>malloc((length + 1) * sizeof(char*))
@@ -229,6 +318,35 @@ def memfd_seal(int fd):
     if result == -1:
         PyErr_SetFromErrno(OSError)
 
+def communicate(int stdin, bytes input, int stdout, int stderr, size_t outlimit, size_t errlimit):
+    """
+    Writes input to stdin, closing it afterwards, while reading stdout and stderr up to their limits, all without
+    holding the GIL. Any of the file descriptors may be -1 if unused.
+    :return: stdout, stderr and the file descriptor of the output that exceeded its limit, if any, with only one byte
+             past the limit read from it.
+    """
+    cdef const char *data = input
+    cdef size_t size = len(input)
+    cdef pt_output out, err
+    cdef int result
+
+    memset(&out, 0, sizeof(out))
+    memset(&err, 0, sizeof(err))
+    out.limit = outlimit
+    err.limit = errlimit
+    with nogil:
+        result = cptbox_communicate(stdin, data, size, stdout, &out, stderr, &err)
+
+    try:
+        if result:
+            PyErr_SetFromErrno(OSError)
+        exceeded = stdout if out.exceeded else stderr if err.exceeded else None
+        return out.data[:out.size] if out.size else b'', err.data[:err.size] if err.size else b'', exceeded
+    finally:
+        free(out.data)
+        free(err.data)
+
+
 cdef class Process
 
 
@@ -422,18 +540,170 @@ cdef class Debugger:
         del self.on_return_callback[pid]
 
 
+cdef pt_arg_rule *new_arg_rule(conditions) except NULL:
+    cdef pt_arg_rule *rule = new pt_arg_rule()
+    cdef pt_arg_condition condition
+    try:
+        for reg, values, match_pid in conditions:
+            condition.reg = reg
+            condition.match_pid = match_pid
+            condition.values.clear()
+            for value in values:
+                condition.values.push_back(value)
+            rule.conditions.push_back(condition)
+    except:
+        del rule
+        raise
+    return rule
+
+
+cdef class SyscallTable:
+    # The handler of every system call of every ABI, the native filesystem access check and argument rule (see
+    # ArgumentRule) of those that have one, and the seccomp filter to spawn processes with, resolved from a security
+    # profile. Since none of these depend on the process, a table is shared by every process with the same profile.
+    cdef int *handlers
+    cdef int *fs_rules
+    cdef pt_arg_rule **arg_rules
+    cdef void *seccomp_filter
+    # The same filter, except that it sends the calls with a native filesystem access check to the supervisor, if
+    # there are any, and seccomp user notifications are supported.
+    cdef void *notify_filter
+
+    def __cinit__(self, handlers, seccomp_handlers, fs_rules, arg_rules):
+        cdef int *seccomp_array = NULL
+        cdef const pt_arg_rule **native_arg_rules
+        cdef bint notify = False
+
+        assert len(handlers) == len(fs_rules) == len(arg_rules) == PTBOX_ABI_COUNT
+        self.handlers = <int*>malloc(sizeof(int) * PTBOX_ABI_COUNT * MAX_SYSCALL)
+        self.fs_rules = <int*>malloc(sizeof(int) * PTBOX_ABI_COUNT * MAX_SYSCALL)
+        self.arg_rules = <pt_arg_rule**>calloc(PTBOX_ABI_COUNT * MAX_SYSCALL, sizeof(pt_arg_rule*))
+        if not self.handlers or not self.fs_rules or not self.arg_rules:
+            PyErr_NoMemory()
+        for abi in range(PTBOX_ABI_COUNT):
+            assert len(handlers[abi]) == len(fs_rules[abi]) == len(arg_rules[abi]) == MAX_SYSCALL
+            for i in range(MAX_SYSCALL):
+                self.handlers[abi * MAX_SYSCALL + i] = handlers[abi][i]
+                self.fs_rules[abi * MAX_SYSCALL + i] = fs_rules[abi][i]
+                if arg_rules[abi][i] is not None:
+                    self.arg_rules[abi * MAX_SYSCALL + i] = new_arg_rule(arg_rules[abi][i])
+
+        if not PTBOX_FREEBSD:
+            assert len(seccomp_handlers) == MAX_SYSCALL
+            native_arg_rules = <const pt_arg_rule **>&self.arg_rules[NATIVE_ABI * MAX_SYSCALL]
+            seccomp_array = <int*>malloc(sizeof(int) * MAX_SYSCALL)
+            if not seccomp_array:
+                PyErr_NoMemory()
+            try:
+                for i in range(MAX_SYSCALL):
+                    seccomp_array[i] = seccomp_handlers[i]
+                self.seccomp_filter = cptbox_seccomp_compile(seccomp_array, native_arg_rules)
+
+                if SECCOMP_NOTIFY_SUPPORTED:
+                    for i in range(MAX_SYSCALL):
+                        if fs_rules[NATIVE_ABI][i] and seccomp_handlers[i] == -1:
+                            seccomp_array[i] = PTBOX_SECCOMP_NOTIFY
+                            notify = True
+                    if notify:
+                        # Processes are traced as usual if this fails.
+                        self.notify_filter = cptbox_seccomp_compile(seccomp_array, native_arg_rules)
+            finally:
+                free(seccomp_array)
+            if not self.seccomp_filter:
+                raise RuntimeError('failed to compile seccomp filter')
+
+    def __dealloc__(self):
+        free(self.handlers)
+        free(self.fs_rules)
+        if self.arg_rules:
+            for i in range(PTBOX_ABI_COUNT * MAX_SYSCALL):
+                del self.arg_rules[i]
+        free(self.arg_rules)
+        cptbox_seccomp_free(self.seccomp_filter)
+        cptbox_seccomp_free(self.notify_filter)
+
+
+cdef class NativeFilesystemPolicy:
+    # A copy of a FilesystemPolicy that the tracer can check without holding the GIL, built from (path, type)
+    # pairs for every node of its tree, where type is one of PTBOX_FS_NONE, EXACT, RECURSIVE or FILE. Recursive
+    # directories may be marked with PTBOX_FS_IMMUTABLE, in which case allowed paths within them are cached.
+    cdef pt_fs_policy *policy
+
+    def __cinit__(self, nodes):
+        self.policy = new pt_fs_policy()
+        for path, type in nodes:
+            if not self.policy.add(path.encode('utf-8'), type):
+                raise ValueError('Invalid filesystem policy node: %s' % path)
+
+    def __dealloc__(self):
+        del self.policy
+
+    def check(self, path):
+        return self.policy.check(path.encode('utf-8'))
+
+    def check_path(self, path, *others):
+        # Checks an absolute path on the filesystem, the same way the tracer would for a process with this policy,
+        # followed by the others.
+        cdef vector[const pt_fs_policy *] policies
+        cdef NativeFilesystemPolicy other
+        policies.push_back(self.policy)
+        for other in others:
+            policies.push_back(other.policy)
+        return pt_fs_check_path(policies, path.encode('utf-8'), True)
+
+    @property
+    def cache_size(self):
+        return self.policy.cache_size()
+
+
+cdef class SeccompNotification:
+    # A system call sent to the supervisor, which, unlike with a Debugger, can be inspected but not modified.
+    cdef Process process
+    cdef pt_notification notification
+
+    @property
+    def tid(self):
+        return self.notification.tid
+
+    @property
+    def abi(self):
+        return self.notification.abi
+
+    @property
+    def syscall(self):
+        return self.notification.syscall
+
+    @property
+    def args(self):
+        return tuple(self.notification.args[i] for i in range(6))
+
+    def readstr(self, unsigned long address, size_t max_size=4096):
+        cdef char* str = self.process.process.notify_readstr(&self.notification, address, max_size)
+        pystr = <object>str if str != NULL else None
+        free(str)
+        return pystr
+
+
 cdef class Process:
     cdef pt_process *process
+    cdef SyscallTable _syscall_table
+    cdef tuple _fs_policies
+    cdef list _landlock_rules
+    cdef public bint _use_seccomp_notify
     cdef public Debugger debugger
     cdef readonly bint _exited
     cdef readonly int _exitcode
     cdef public int _child_stdin, _child_stdout, _child_stderr, _child_fd_3, _child_fd_4
+    cdef public int _cgroup_fd
     cdef public unsigned long _child_memory, _child_address, _child_personality
     cdef public unsigned int _cpu_time
     cdef public int _nproc, _fsize
     cdef public unsigned long _cpu_affinity_mask
     cdef unsigned long _max_memory
     cdef unsigned long _init_nvcsw, _init_nivcsw
+    # The child reads its configuration from our memory until it execs, so it is kept until the child is done.
+    cdef child_config _config
+    cdef tuple _config_refs
 
     cpdef Debugger create_debugger(self):
         return Debugger(self)
@@ -441,26 +711,54 @@ cdef class Process:
     def __cinit__(self, *args, **kwargs):
         self._child_memory = self._child_address = 0
         self._child_stdin = self._child_stdout = self._child_stderr = self._child_fd_3 = self._child_fd_4 = -1
+        self._cgroup_fd = -1
         self._cpu_time = 0
         self._fsize = -1
         self._nproc = -1
         self._cpu_affinity_mask = 0
         self._init_nvcsw = self._init_nivcsw = 0
+        self._use_seccomp_notify = True
 
         self.debugger = self.create_debugger()
         self.process = new pt_process(self.debugger.thisptr)
         self.process.set_callback(pt_syscall_handler, <void*>self)
         self.process.set_event_proc(pt_event_handler, <void*>self)
+        self.process.set_notify_callback(pt_notify_handler, <void*>self)
 
     def __dealloc__(self):
+        self._free_config()
         del self.process
 
+    cdef _free_config(self):
+        free(self._config.argv)
+        free(self._config.envp)
+        free(self._config.landlock_paths)
+        free(self._config.landlock_access)
+        self._config.argv = self._config.envp = self._config.landlock_paths = NULL
+        self._config.landlock_access = NULL
+        self._config_refs = None
+
     def _callback(self, syscall):
         return False
 
     cdef int _syscall_handler(self, int syscall) with gil:
         return self._callback(syscall)
 
+    def _notify_callback(self, notification):
+        return -1
+
+    cdef int _notify_handler(self, const pt_notification *notification) with gil:
+        cdef SeccompNotification wrapper = SeccompNotification.__new__(SeccompNotification)
+        wrapper.process = self
+        wrapper.notification = notification[0]
+        try:
+            return self._notify_callback(wrapper)
+        except:
+            # Unlike with _callback, returning 0 would allow the call.
+            import traceback
+            traceback.print_exc()
+            return -1
+
     cdef int _event_handler(self, int event, unsigned long param) nogil:
         cdef const rusage *usage
 
@@ -488,6 +786,38 @@ cdef class Process:
     cpdef _handler(self, abi, syscall, handler):
         self.process.set_handler(abi, syscall, handler)
 
+    cpdef _set_syscall_table(self, SyscallTable table):
+        self._syscall_table = table
+        self.process.set_handlers(table.handlers, table.fs_rules, <const pt_arg_rule **>table.arg_rules)
+
+    cpdef _set_fs_policies(self, read, write):
+        # Native filesystem access checks are only done with policies, which must outlive the process.
+        self._fs_policies = (list(read), list(write))
+        self.process.clear_fs_policies()
+        for policy in self._fs_policies[0]:
+            self.process.add_fs_policy(False, (<NativeFilesystemPolicy?>policy).policy)
+        for policy in self._fs_policies[1]:
+            self.process.add_fs_policy(True, (<NativeFilesystemPolicy?>policy).policy)
+
+    cpdef _set_landlock_rules(self, rules):
+        # Paths as bytes, with the PTBOX_LANDLOCK_* access of each, or None not to use Landlock.
+        self._landlock_rules = list(rules) if rules is not None else None
+
+    cpdef _profile_traps(self):
+        # Counts every trapped system call from now on, for _get_trap_counts.
+        self.process.profile_traps()
+
+    def _get_trap_counts(self):
+        cdef int abi, syscall
+        cdef unsigned long count
+        counts = []
+        for abi in range(PTBOX_ABI_COUNT):
+            for syscall in range(MAX_SYSCALL):
+                count = self.process.trap_count(abi, syscall)
+                if count:
+                    counts.append((abi, syscall, count))
+        return counts
+
     cpdef _protection_fault(self, syscall, is_update):
         pass
 
@@ -497,14 +827,18 @@ cdef class Process:
     cpdef _cpu_time_exceeded(self):
         pass
 
-    cpdef _get_seccomp_handlers(self):
-        return [-1] * MAX_SYSCALL
-
     cpdef _spawn(self, file, args, env=(), chdir=''):
-        cdef child_config config
-        config.argv = NULL
-        config.envp = NULL
-        config.seccomp_handlers = NULL
+        cdef child_config *config = &self._config
+        self._free_config()
+        # Without a syscall table, the child refuses to run rather than run unconfined.
+        config.seccomp_filter = self._syscall_table.seccomp_filter if self._syscall_table is not None else NULL
+        # Filesystem access checks are sent to the supervisor if possible, which is only useful when they can
+        # mostly be done natively.
+        config.seccomp_notify = (self._use_seccomp_notify and self._fs_policies is not None and
+                                 self._syscall_table is not None and self._syscall_table.notify_filter != NULL)
+        if config.seccomp_notify:
+            config.seccomp_filter = self._syscall_table.notify_filter
+        self.process.use_seccomp_notify(config.seccomp_notify)
 
         try:
             config.address_space = self._child_address
@@ -521,31 +855,30 @@ cdef class Process:
             config.stderr_ = self._child_stderr
             config.fd_3_ = self._child_fd_3
             config.fd_4_ = self._child_fd_4
+            config.cgroup_fd = self._cgroup_fd
             config.argv = alloc_byte_array(args)
             config.envp = alloc_byte_array(env)
-
-            if not PTBOX_FREEBSD:
-                handlers = self._get_seccomp_handlers()
-                assert len(handlers) == MAX_SYSCALL
-
-                config.seccomp_handlers = <int*>malloc(sizeof(int) * MAX_SYSCALL)
-                if not config.seccomp_handlers:
+            if self._landlock_rules is not None:
+                config.landlock_paths = alloc_byte_array([path for path, _ in self._landlock_rules])
+                config.landlock_access = <int*>malloc(sizeof(int) * len(self._landlock_rules))
+                if not config.landlock_access:
                     PyErr_NoMemory()
+                for i, (_, access) in enumerate(self._landlock_rules):
+                    config.landlock_access[i] = access
 
-                for i in range(MAX_SYSCALL):
-                    config.seccomp_handlers[i] = handlers[i]
+            self._config_refs = (file, args, env, chdir)
 
-            if self.process.spawn(pt_child, &config):
+            if self.process.spawn(pt_child, config):
                 raise RuntimeError('failed to spawn child')
-        finally:
-            free(config.argv)
-            free(config.envp)
-            free(config.seccomp_handlers)
+        except:
+            self._free_config()
+            raise
 
     cpdef _monitor(self):
         cdef int exitcode
         with nogil:
             exitcode = self.process.monitor()
+        self._free_config()
         self._exitcode = exitcode
         self._exited = True
         return self._exitcode
@@ -554,6 +887,14 @@ cdef class Process:
     def was_initialized(self):
         return self.process.was_initialized()
 
+    @property
+    def uses_seccomp_notify(self):
+        return self.process.use_seccomp_notify()
+
+    @property
+    def uses_landlock(self):
+        return self._landlock_rules is not None
+
     @property
     def _trace_syscalls(self):
         return self.process.trace_syscalls()
@@ -574,6 +915,10 @@ cdef class Process:
     def wall_clock_time(self):
         return self.process.wall_clock_time()
 
+    @property
+    def _stop_time(self):
+        return self.process.stop_time()
+
     @property
     def cpu_time(self):
         cdef const rusage *usage = self.process.getrusage()
@@ -0,0 +1,152 @@
+import errno
+import itertools
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Dict, Optional
+
+log = logging.getLogger('dmoj.cptbox')
+
+# Controllers that sandboxed processes are accounted and limited with, if the delegated cgroup has them.
+CONTROLLERS = ('memory', 'cpu')
+
+_counter = itertools.count()
+_prepared: Dict[str, bool] = {}
+_prepare_lock = threading.Lock()
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_keyed(path: str) -> Dict[str, int]:
+    values = {}
+    for line in (_read(path) or '').splitlines():
+        key, _, value = line.partition(' ')
+        if value.isdigit():
+            values[key] = int(value)
+    return values
+
+
+def _write(path: str, value: str) -> bool:
+    try:
+        with open(path, 'w') as f:
+            f.write(value)
+    except OSError as e:
+        log.debug('Failed to write %r to %s: %s', value, path, e.strerror)
+        return False
+    return True
+
+
+def prepare_cgroup(root: str) -> bool:
+    """
+    Prepares a delegated cgroup v2 directory to hold a cgroup for every sandboxed process tree. Processes can only
+    live in leaf cgroups once controllers are enabled for children, so any process already in it, like the judge
+    itself when it was started in it, is moved into a `judge` child first.
+    :return: whether the directory can be used.
+    """
+    with _prepare_lock:
+        if root in _prepared:
+            return _prepared[root]
+
+        ok = os.access(os.path.join(root, 'cgroup.procs'), os.W_OK) and os.access(root, os.W_OK)
+        if ok:
+            procs = (_read(os.path.join(root, 'cgroup.procs')) or '').split()
+            if procs:
+                judge = os.path.join(root, 'judge')
+                try:
+                    os.mkdir(judge)
+                except FileExistsError:
+                    pass
+                except OSError as e:
+                    log.warning('Failed to create %s: %s', judge, e.strerror)
+                for pid in procs:
+                    _write(os.path.join(judge, 'cgroup.procs'), pid)
+
+            available = (_read(os.path.join(root, 'cgroup.controllers')) or '').split()
+            for controller in CONTROLLERS:
+                if controller not in available:
+                    log.warning('cgroup controller %s is not delegated to %s', controller, root)
+                elif not _write(os.path.join(root, 'cgroup.subtree_control'), '+' + controller):
+                    log.warning('Failed to enable cgroup controller %s in %s', controller, root)
+        else:
+            log.warning('Cannot create cgroups in %s, is it a delegated cgroup v2 directory?', root)
+
+        _prepared[root] = ok
+        return ok
+
+
+class Cgroup:
+    """
+    A transient leaf cgroup v2 for a single sandboxed process tree, which accounts for every process in it exactly
+    and can kill all of them at once.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.path = os.path.join(root, 'box-%d-%d' % (os.getpid(), next(_counter)))
+        os.mkdir(self.path)
+        try:
+            # The child moves itself in by writing to this before it runs anything.
+            self.procs_fd = os.open(os.path.join(self.path, 'cgroup.procs'), os.O_WRONLY | os.O_CLOEXEC)
+        except OSError:
+            os.rmdir(self.path)
+            raise
+
+    def set_memory_limit(self, limit: int) -> bool:
+        """
+        Limits the memory of the whole tree, which is killed as one when it runs out.
+        :return: whether the memory controller is available to enforce the limit.
+        """
+        if not _write(os.path.join(self.path, 'memory.max'), str(limit)):
+            return False
+        _write(os.path.join(self.path, 'memory.swap.max'), '0')
+        _write(os.path.join(self.path, 'memory.oom.group'), '1')
+        return True
+
+    @property
+    def memory_peak(self) -> Optional[int]:
+        """The most memory the tree ever used in bytes, or None if it isn't known (Linux 5.19+)."""
+        peak = _read(os.path.join(self.path, 'memory.peak'))
+        return int(peak) if peak is not None else None
+
+    @property
+    def oom_killed(self) -> bool:
+        return _read_keyed(os.path.join(self.path, 'memory.events')).get('oom_kill', 0) > 0
+
+    @property
+    def cpu_usage(self) -> Optional[float]:
+        """The CPU time used by the tree in seconds, or None if it isn't known."""
+        usage = _read_keyed(os.path.join(self.path, 'cpu.stat')).get('usage_usec')
+        return usage / 1000000 if usage is not None else None
+
+    def kill(self) -> None:
+        # cgroup.kill needs Linux 5.14+, before which processes that are forking can escape.
+        if _write(os.path.join(self.path, 'cgroup.kill'), '1'):
+            return
+        for pid in (_read(os.path.join(self.path, 'cgroup.procs')) or '').split():
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+            except OSError:
+                pass
+
+    def close(self, timeout: float = 5) -> None:
+        self.kill()
+        os.close(self.procs_fd)
+
+        # Killed processes only leave the cgroup once they exit, which takes a moment.
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.rmdir(self.path)
+                return
+            except OSError as e:
+                if e.errno != errno.EBUSY or time.monotonic() > deadline:
+                    log.warning('Failed to remove cgroup %s: %s', self.path, e.strerror)
+                    return
+            time.sleep(0.01)
@@ -1,6 +1,6 @@
 import os
 from enum import Enum
-from typing import Sequence, Union
+from typing import Iterator, List, Sequence, Tuple, Union
 
 
 class AccessMode(Enum):
@@ -139,3 +139,28 @@ class FilesystemPolicy:
 
     def _check_final_node(self, node: Union[Dir, File]) -> bool:
         return isinstance(node, File) or node.access_mode != AccessMode.NONE
+
+    def walk(self) -> Iterator[Tuple[str, Union[Dir, File]]]:
+        """
+        Yields every node of the policy with its path, parents first.
+        """
+        stack: List[Tuple[str, Union[Dir, File]]] = [('/', self.root)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            if isinstance(node, Dir):
+                for component, child in node.subpath_map.items():
+                    stack.append((os.path.join(path, component), child))
+
+
+class CombinedFilesystemPolicy(FilesystemPolicy):
+    """
+    Allows any path allowed by one of several policies, which is equivalent to a single policy built from all of
+    their rules. This lets a prebuilt policy be extended with a few rules without rebuilding it.
+    """
+
+    def __init__(self, policies: List[FilesystemPolicy]):
+        self.policies = policies
+
+    def check(self, path: str) -> bool:
+        return any(policy.check(path) for policy in self.policies)
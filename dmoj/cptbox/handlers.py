@@ -1,4 +1,5 @@
 import errno
+from typing import Any, Callable, Iterable, Tuple, TypeVar, Union
 
 from dmoj.cptbox._cptbox import Debugger
 
@@ -24,5 +25,75 @@ class ErrnoHandlerCallback:
         return True
 
 
+class _Pid:
+    def __repr__(self) -> str:
+        return 'PID'
+
+
+# Stands for the pid of the sandboxed process in an ArgumentRule.
+PID = _Pid()
+
+
+class ArgumentRule:
+    """
+    A declarative check of the arguments of a system call, which allows it if every argument given, as arg0 to
+    arg5, is one of the values given for it, where PID stands for the pid of the process. The tracer checks these
+    without calling into Python, and if they only compare with constants, so does the seccomp filter, so that the
+    call doesn't even trap.
+    """
+
+    conditions: Tuple[Tuple[int, Tuple[int, ...], bool], ...]
+
+    def __init__(self, **args: Iterable[Union[int, _Pid]]) -> None:
+        conditions = []
+        for name, values in sorted(args.items()):
+            if not (name.startswith('arg') and name[3:].isdigit() and 0 <= int(name[3:]) < 6):
+                raise TypeError(f'Unexpected argument: {name}')
+            values = set(values)
+            if not values:
+                raise ValueError(f'No values given for {name}')
+            constants = tuple(sorted(value for value in values if not isinstance(value, _Pid)))
+            if not all(isinstance(value, int) and value >= 0 for value in constants):
+                raise ValueError(f'Values of {name} must be non-negative integers or PID')
+            conditions.append((int(name[3:]), constants, PID in values))
+        self.conditions = tuple(conditions)
+
+    def allows(self, debugger: Debugger) -> bool:
+        for reg, constants, match_pid in self.conditions:
+            value = getattr(debugger, 'uarg%d' % reg)
+            if value not in constants and not (match_pid and value == debugger.pid):
+                return False
+        return True
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, ArgumentRule) and self.conditions == other.conditions
+
+    def __hash__(self) -> int:
+        return hash(self.conditions)
+
+    def __repr__(self) -> str:
+        return 'ArgumentRule(%s)' % ', '.join(
+            'arg%d=%r' % (reg, set(constants) | ({PID} if match_pid else set()))
+            for reg, constants, match_pid in self.conditions
+        )
+
+
+Handler = TypeVar('Handler', bound=Callable[..., Any])
+
+
+def argument_rule(**args: Iterable[Union[int, _Pid]]) -> Callable[[Handler], Handler]:
+    """
+    Declares which calls a handler certainly allows with an ArgumentRule, so that these are allowed without calling
+    it. Every other call, including every denial, is still left to the handler.
+    """
+    rule = ArgumentRule(**args)
+
+    def decorator(handler: Handler) -> Handler:
+        handler.argument_rule = rule  # type: ignore[attr-defined]
+        return handler
+
+    return decorator
+
+
 for code, name in errno.errorcode.items():
     globals()[f'ACCESS_{name}'] = ErrnoHandlerCallback(name, code)
@@ -1,3 +1,5 @@
+from typing import Any, Callable, Iterable, Tuple, TypeVar, Union
+
 from dmoj.cptbox._cptbox import Debugger
 
 ALLOW: int
@@ -16,3 +18,16 @@ ACCESS_EINVAL: ErrnoHandlerCallback
 ACCESS_ENOENT: ErrnoHandlerCallback
 ACCESS_EPERM: ErrnoHandlerCallback
 ACCESS_ENAMETOOLONG: ErrnoHandlerCallback
+
+class _Pid: ...
+
+PID: _Pid
+
+class ArgumentRule:
+    conditions: Tuple[Tuple[int, Tuple[int, ...], bool], ...]
+    def __init__(self, **args: Iterable[Union[int, _Pid]]) -> None: ...
+    def allows(self, debugger: Debugger) -> bool: ...
+
+Handler = TypeVar('Handler', bound=Callable[..., Any])
+
+def argument_rule(**args: Iterable[Union[int, _Pid]]) -> Callable[[Handler], Handler]: ...
@@ -4,12 +4,15 @@
 #include <dirent.h>
 #include <errno.h>
 #include <fcntl.h>
+#include <poll.h>
 #include <signal.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <sys/mman.h>
 #include <sys/resource.h>
+#include <sys/stat.h>
+#include <sys/syscall.h>
 #include <sys/types.h>
 #include <unistd.h>
 
@@ -21,10 +24,22 @@
 
 #include <libprocstat.h>
 #else
+#include <linux/filter.h>
+#include <linux/seccomp.h>
 #include <sched.h>
 // No ASLR on FreeBSD... not as of 11.0, anyway
 #include <sys/personality.h>
 #include <sys/prctl.h>
+
+#if __has_include(<linux/landlock.h>)
+#include <linux/landlock.h>
+#endif
+#endif
+
+#if defined(LANDLOCK_CREATE_RULESET_VERSION) && defined(__NR_landlock_create_ruleset)
+#define PTBOX_LANDLOCK 1
+#else
+#define PTBOX_LANDLOCK 0
 #endif
 
 #if defined(__FreeBSD__) || (defined(__APPLE__) && defined(__MACH__))
@@ -50,6 +65,12 @@ static inline void cptbox_close_fd(int fd) {
 }
 
 int cptbox_child_run(const struct child_config *config) {
+    // Before anything else, so that everything the child ever uses or spawns is accounted to the cgroup.
+    if (config->cgroup_fd >= 0 && write(config->cgroup_fd, "0", 1) != 1) {
+        perror("cgroup");
+        return PTBOX_SPAWN_FAIL_CGROUP;
+    }
+
 #ifndef __FreeBSD__
     // There is no ASLR on FreeBSD, but disable it elsewhere
     if (config->personality > 0)
@@ -94,45 +115,20 @@ int cptbox_child_run(const struct child_config *config) {
 
     kill(getpid(), SIGSTOP);
 
-#if !PTBOX_FREEBSD
-    scmp_filter_ctx ctx = seccomp_init(SCMP_ACT_TRACE(0));
-    if (!ctx) {
-        fprintf(stderr, "Failed to initialize seccomp context!");
-        goto seccomp_init_fail;
-    }
-
-    int rc;
-    // By default, the native architecture is added to the filter already, so we add all the non-native ones.
-    // This will bloat the filter due to additional architectures, but a few extra compares in the BPF matters
-    // very little when syscalls are rare and other overhead is expensive.
-    for (uint32_t *arch = pt_debugger::seccomp_non_native_arch_list; *arch; ++arch) {
-        if ((rc = seccomp_arch_add(ctx, *arch))) {
-            fprintf(stderr, "seccomp_arch_add(%u): %s\n", *arch, strerror(-rc));
-            // This failure is not fatal, it'll just cause the syscall to trap anyway.
-        }
-    }
-
-    for (int syscall = 0; syscall < MAX_SYSCALL; syscall++) {
-        int handler = config->seccomp_handlers[syscall];
-        if (handler == 0) {
-            if ((rc = seccomp_rule_add(ctx, SCMP_ACT_ALLOW, syscall, 0))) {
-                fprintf(stderr, "seccomp_rule_add(..., SCMP_ACT_ALLOW, %d): %s\n", syscall, strerror(-rc));
-                // This failure is not fatal, it'll just cause the syscall to trap anyway.
-            }
-        } else if (handler > 0) {
-            if ((rc = seccomp_rule_add(ctx, SCMP_ACT_ERRNO(handler), syscall, 0))) {
-                fprintf(stderr, "seccomp_rule_add(..., SCMP_ACT_ERRNO(%d), %d): %s\n", handler, syscall, strerror(-rc));
-                // This failure is not fatal, it'll just cause the syscall to trap anyway.
-            }
-        }
+    // Before seccomp, so that building the ruleset doesn't trap.
+    if (config->landlock_paths && cptbox_landlock_restrict(config->landlock_paths, config->landlock_access)) {
+        perror("landlock");
+        return PTBOX_SPAWN_FAIL_LANDLOCK;
     }
 
-    if ((rc = seccomp_load(ctx))) {
-        fprintf(stderr, "seccomp_load: %s\n", strerror(-rc));
-        goto seccomp_load_fail;
+#if !PTBOX_FREEBSD
+    // The filter is compiled by the parent ahead of time, since it's the same for every process with the same
+    // security profile. Loading it here is a single system call.
+    if (!config->seccomp_notify &&
+        (!config->seccomp_filter || prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, config->seccomp_filter))) {
+        perror("seccomp");
+        return PTBOX_SPAWN_FAIL_SECCOMP;
     }
-
-    seccomp_release(ctx);
 #endif
 
     if (config->stdin_ >= 0)
@@ -151,9 +147,8 @@ int cptbox_child_run(const struct child_config *config) {
         cptbox_close_fd(4);
     cptbox_closefrom(5);
 
-    // All these limits should be dropped after initializing seccomp, since seccomp allocates
-    // memory, and if an arena isn't sufficiently free it could force seccomp into an OOM
-    // situation where we'd fail to initialize.
+    // All these limits should be dropped after initializing seccomp, since we wouldn't be able
+    // to report the failure to initialize it if they caused one.
     if (config->address_space)
         setrlimit2(RLIMIT_AS, config->address_space);
 
@@ -175,16 +170,250 @@ int cptbox_child_run(const struct child_config *config) {
     setrlimit2(RLIMIT_STACK, RLIM_INFINITY);
     setrlimit2(RLIMIT_CORE, 0);
 
+#if !PTBOX_FREEBSD && defined(SECCOMP_FILTER_FLAG_NEW_LISTENER)
+    // The tracer takes the listener from us when execve traps, and it is closed on exec. Any notification before
+    // then would wait for a supervisor that doesn't exist yet, so this filter is loaded last.
+    if (config->seccomp_notify &&
+        (!config->seccomp_filter || syscall(__NR_seccomp, SECCOMP_SET_MODE_FILTER, SECCOMP_FILTER_FLAG_NEW_LISTENER,
+                                            config->seccomp_filter) < 0)) {
+        perror("seccomp");
+        return PTBOX_SPAWN_FAIL_SECCOMP;
+    }
+#else
+    if (config->seccomp_notify)
+        return PTBOX_SPAWN_FAIL_SECCOMP;
+#endif
+
     execve(config->file, config->argv, config->envp);
     perror("execve");
     return PTBOX_SPAWN_FAIL_EXECVE;
+}
 
 #if !PTBOX_FREEBSD
-seccomp_init_fail:
+// Argument rules that need more seccomp rules than this are left to the tracer, rather than bloat the filter.
+#define PTBOX_SECCOMP_MAX_ARG_RULES 64
+
+// Allows the calls that certainly satisfy an argument rule, with a rule for every combination of allowed values. The
+// filter is shared by every process, so calls with the pid of the process are left to the tracer.
+static void cptbox_seccomp_add_arg_rule(scmp_filter_ctx ctx, int syscall, const pt_arg_rule *rule) {
+    size_t combinations = 1;
+    for (const pt_arg_condition &condition : rule->conditions) {
+        combinations *= condition.values.size();
+        if (combinations > PTBOX_SECCOMP_MAX_ARG_RULES)
+            return;
+    }
+
+    std::vector<struct scmp_arg_cmp> comparisons(rule->conditions.size());
+    for (size_t combination = 0; combination < combinations; ++combination) {
+        size_t rest = combination;
+        for (size_t i = 0; i < rule->conditions.size(); ++i) {
+            const std::vector<unsigned long> &values = rule->conditions[i].values;
+            comparisons[i] =
+                SCMP_CMP((unsigned int) rule->conditions[i].reg, SCMP_CMP_EQ, values[rest % values.size()]);
+            rest /= values.size();
+        }
+
+        int rc = seccomp_rule_add_array(ctx, SCMP_ACT_ALLOW, syscall, comparisons.size(), comparisons.data());
+        if (rc) {
+            fprintf(stderr, "seccomp_rule_add_array(..., SCMP_ACT_ALLOW, %d, ...): %s\n", syscall, strerror(-rc));
+            // This failure is not fatal, it'll just cause the syscall to trap anyway.
+        }
+    }
+}
+#endif
+
+void *cptbox_seccomp_compile(const int *handlers, const pt_arg_rule *const *arg_rules) {
+#if PTBOX_FREEBSD
+    errno = ENOSYS;
+    return NULL;
+#else
+    struct sock_fprog *program = NULL;
+    struct stat st;
+    char *buffer;
+    size_t size, offset;
+    ssize_t bytes;
+    int fd = -1, rc;
+
+    scmp_filter_ctx ctx = seccomp_init(SCMP_ACT_TRACE(0));
+    if (!ctx) {
+        fprintf(stderr, "Failed to initialize seccomp context!");
+        return NULL;
+    }
+
+    // By default, the native architecture is added to the filter already, so we add all the non-native ones.
+    // This will bloat the filter due to additional architectures, but a few extra compares in the BPF matters
+    // very little when syscalls are rare and other overhead is expensive.
+    for (uint32_t *arch = pt_debugger::seccomp_non_native_arch_list; *arch; ++arch) {
+        if ((rc = seccomp_arch_add(ctx, *arch))) {
+            fprintf(stderr, "seccomp_arch_add(%u): %s\n", *arch, strerror(-rc));
+            // This failure is not fatal, it'll just cause the syscall to trap anyway.
+        }
+    }
+
+    for (int syscall = 0; syscall < MAX_SYSCALL; syscall++) {
+        int handler = handlers[syscall];
+        if (handler == 0) {
+            if ((rc = seccomp_rule_add(ctx, SCMP_ACT_ALLOW, syscall, 0))) {
+                fprintf(stderr, "seccomp_rule_add(..., SCMP_ACT_ALLOW, %d): %s\n", syscall, strerror(-rc));
+                // This failure is not fatal, it'll just cause the syscall to trap anyway.
+            }
+        } else if (handler > 0) {
+            if ((rc = seccomp_rule_add(ctx, SCMP_ACT_ERRNO(handler), syscall, 0))) {
+                fprintf(stderr, "seccomp_rule_add(..., SCMP_ACT_ERRNO(%d), %d): %s\n", handler, syscall, strerror(-rc));
+                // This failure is not fatal, it'll just cause the syscall to trap anyway.
+            }
+        } else if (handler <= PTBOX_SECCOMP_LANDLOCK_OPEN && handler > PTBOX_SECCOMP_LANDLOCK_OPEN - 6) {
+            // Landlock doesn't check O_PATH opens, nor O_TRUNC on files that are opened read-only before Landlock
+            // ABI 3, so these still trap.
+            unsigned int flag_reg = PTBOX_SECCOMP_LANDLOCK_OPEN - handler;
+            if ((rc = seccomp_rule_add(ctx, SCMP_ACT_ALLOW, syscall, 1,
+                                       SCMP_CMP(flag_reg, SCMP_CMP_MASKED_EQ, O_PATH | O_TRUNC, 0)))) {
+                fprintf(stderr, "seccomp_rule_add(..., SCMP_ACT_ALLOW, %d, O_PATH | O_TRUNC): %s\n", syscall,
+                        strerror(-rc));
+                // Likewise, it'll just trap.
+            }
+        } else if (handler == -1 && arg_rules && arg_rules[syscall]) {
+            cptbox_seccomp_add_arg_rule(ctx, syscall, arg_rules[syscall]);
+        } else if (handler == PTBOX_SECCOMP_NOTIFY) {
+#ifdef SCMP_ACT_NOTIFY
+            if ((rc = seccomp_rule_add(ctx, SCMP_ACT_NOTIFY, syscall, 0))) {
+                fprintf(stderr, "seccomp_rule_add(..., SCMP_ACT_NOTIFY, %d): %s\n", syscall, strerror(-rc));
+                // Likewise, it'll just trap, and the tracer checks it instead.
+            }
+#endif
+        }
+    }
+
+    // libseccomp can only export the program to a file descriptor, so we read it back from an anonymous file.
+    if ((fd = cptbox_memfd_create()) < 0 || (rc = seccomp_export_bpf(ctx, fd))) {
+        perror("seccomp_export_bpf");
+        goto fail;
+    }
+
+    if (fstat(fd, &st) || !st.st_size || st.st_size % sizeof(struct sock_filter) ||
+        st.st_size / sizeof(struct sock_filter) > BPF_MAXINSNS) {
+        fprintf(stderr, "seccomp_export_bpf: invalid program\n");
+        goto fail;
+    }
+
+    size = st.st_size;
+    program = (struct sock_fprog *) malloc(sizeof(struct sock_fprog) + size);
+    if (!program)
+        goto fail;
+
+    buffer = (char *) (program + 1);
+    for (offset = 0; offset < size; offset += bytes) {
+        bytes = pread(fd, buffer + offset, size - offset, offset);
+        if (bytes < 0 && errno == EINTR) {
+            bytes = 0;
+        } else if (bytes <= 0) {
+            perror("pread");
+            free(program);
+            program = NULL;
+            goto fail;
+        }
+    }
+
+    program->len = size / sizeof(struct sock_filter);
+    program->filter = (struct sock_filter *) buffer;
+
+fail:
+    if (fd >= 0)
+        cptbox_close_fd(fd);
     seccomp_release(ctx);
+    return program;
+#endif
+}
+
+void cptbox_seccomp_free(void *filter) {
+    free(filter);
+}
 
-seccomp_load_fail:
-    return PTBOX_SPAWN_FAIL_SECCOMP;
+int cptbox_seccomp_notify_supported(void) {
+#if PTBOX_FREEBSD || !defined(SCMP_ACT_NOTIFY) || !defined(SECCOMP_USER_NOTIF_FLAG_CONTINUE) ||                        \
+    !defined(SYS_pidfd_getfd)
+    return 0;
+#else
+    // Notifications need API level 5 of libseccomp, SECCOMP_USER_NOTIF_FLAG_CONTINUE needs Linux 5.5, and
+    // pidfd_getfd needs Linux 5.6.
+    uint32_t action = SECCOMP_RET_USER_NOTIF;
+    if (seccomp_api_get() < 5 || syscall(__NR_seccomp, SECCOMP_GET_ACTION_AVAIL, 0, &action))
+        return 0;
+    return syscall(SYS_pidfd_getfd, -1, 0, 0) < 0 && errno == EBADF;
+#endif
+}
+
+int cptbox_landlock_abi(void) {
+#if PTBOX_LANDLOCK
+    int abi = syscall(__NR_landlock_create_ruleset, NULL, 0, LANDLOCK_CREATE_RULESET_VERSION);
+    return abi < 0 ? 0 : abi;
+#else
+    return 0;
+#endif
+}
+
+#if PTBOX_LANDLOCK
+#define PTBOX_LANDLOCK_FILE_ACCESS (LANDLOCK_ACCESS_FS_READ_FILE | LANDLOCK_ACCESS_FS_WRITE_FILE)
+
+static __u64 landlock_access(int access, __u64 handled) {
+    switch (access) {
+        case PTBOX_LANDLOCK_READ_FILE:
+            return LANDLOCK_ACCESS_FS_READ_FILE;
+        case PTBOX_LANDLOCK_READ_DIR:
+            return LANDLOCK_ACCESS_FS_READ_FILE | LANDLOCK_ACCESS_FS_READ_DIR;
+        case PTBOX_LANDLOCK_WRITE_FILE:
+            return LANDLOCK_ACCESS_FS_WRITE_FILE;
+        case PTBOX_LANDLOCK_WRITE_DIR:
+            return handled & ~(LANDLOCK_ACCESS_FS_READ_FILE | LANDLOCK_ACCESS_FS_READ_DIR);
+        default:
+            return 0;
+    }
+}
+#endif
+
+int cptbox_landlock_restrict(char **paths, const int *access) {
+#if PTBOX_LANDLOCK
+    struct landlock_ruleset_attr ruleset_attr = {};
+    struct landlock_path_beneath_attr rule = {};
+    struct stat st;
+    int ruleset, rc = 0;
+
+    // Only what open(2) needs is handled: every other filesystem system call is still checked by the tracer.
+    ruleset_attr.handled_access_fs = LANDLOCK_ACCESS_FS_READ_FILE | LANDLOCK_ACCESS_FS_READ_DIR |
+                                     LANDLOCK_ACCESS_FS_WRITE_FILE | LANDLOCK_ACCESS_FS_MAKE_REG;
+#ifdef LANDLOCK_ACCESS_FS_REFER
+    // Without this, Landlock forbids moving files between directories altogether.
+    if (cptbox_landlock_abi() >= 2)
+        ruleset_attr.handled_access_fs |= LANDLOCK_ACCESS_FS_REFER;
+#endif
+
+    ruleset = syscall(__NR_landlock_create_ruleset, &ruleset_attr, sizeof(ruleset_attr), 0);
+    if (ruleset < 0)
+        return -1;
+
+    for (; *paths; ++paths, ++access) {
+        // Rules are opened here rather than by the parent, so that /proc/self is the child.
+        rule.parent_fd = open(*paths, O_PATH | O_CLOEXEC);
+        if (rule.parent_fd < 0)
+            continue;  // Nothing to allow.
+
+        rule.allowed_access = landlock_access(*access, ruleset_attr.handled_access_fs);
+        if (!fstat(rule.parent_fd, &st) && !S_ISDIR(st.st_mode))
+            rule.allowed_access &= PTBOX_LANDLOCK_FILE_ACCESS;
+
+        rc = rule.allowed_access ? syscall(__NR_landlock_add_rule, ruleset, LANDLOCK_RULE_PATH_BENEATH, &rule, 0) : 0;
+        close(rule.parent_fd);
+        if (rc)
+            break;
+    }
+
+    if (!rc)
+        rc = syscall(__NR_landlock_restrict_self, ruleset, 0);
+    close(ruleset);
+    return rc;
+#else
+    errno = ENOSYS;
+    return -1;
 #endif
 }
 
@@ -353,3 +582,105 @@ int cptbox_memfd_seal(int fd) {
     return fcntl(fd, F_ADD_SEALS, F_SEAL_GROW | F_SEAL_SHRINK | F_SEAL_WRITE);
 #endif
 }
+
+// Enlarges a pipe from the default of 64 KiB, so that the process writing to it has to wait for us less often, and we
+// can read and write it in fewer, larger calls. This fails harmlessly past /proc/sys/fs/pipe-max-size, which only
+// applies to unprivileged users, and for anything that isn't a pipe.
+static void cptbox_enlarge_pipe(int fd) {
+#ifdef F_SETPIPE_SZ
+    if (fd >= 0)
+        fcntl(fd, F_SETPIPE_SZ, PTBOX_PIPE_SIZE);
+#endif
+}
+
+// Reads what is available from fd into output, keeping no more than one byte past its limit. Returns what read does.
+static ssize_t cptbox_read_output(int fd, pt_output *output) {
+    if (output->capacity - output->size < PTBOX_OUTPUT_CHUNK) {
+        size_t capacity = output->capacity * 2;
+        if (capacity < output->size + PTBOX_OUTPUT_CHUNK)
+            capacity = output->size + PTBOX_OUTPUT_CHUNK;
+        char *data = (char *) realloc(output->data, capacity);
+        if (!data)
+            return -1;
+        output->data = data;
+        output->capacity = capacity;
+    }
+
+    size_t size = output->capacity - output->size;
+    if (size > output->limit - output->size)
+        size = output->limit - output->size + 1;
+    ssize_t bytes = read(fd, output->data + output->size, size);
+    if (bytes > 0) {
+        output->size += bytes;
+        output->exceeded = output->size > output->limit;
+    }
+    return bytes;
+}
+
+int cptbox_communicate(int in_fd, const char *input, size_t input_size, int out_fd, pt_output *out, int err_fd,
+                       pt_output *err) {
+    struct pollfd fds[3] = { { in_fd, POLLOUT, 0 }, { out_fd, POLLIN | POLLPRI, 0 }, { err_fd, POLLIN | POLLPRI, 0 } };
+    pt_output *outputs[3] = { NULL, out, err };
+    size_t offset = 0;
+    int error = 0;
+
+    if (in_fd >= 0 && !input_size) {
+        close(in_fd);
+        fds[0].fd = -1;
+    } else if (in_fd >= 0) {
+        // Writes can be as large as what fits in the pipe, rather than PIPE_BUF at a time.
+        fcntl(in_fd, F_SETFL, fcntl(in_fd, F_GETFL) | O_NONBLOCK);
+        cptbox_enlarge_pipe(in_fd);
+    }
+    cptbox_enlarge_pipe(out_fd);
+    cptbox_enlarge_pipe(err_fd);
+
+    while (fds[0].fd >= 0 || fds[1].fd >= 0 || fds[2].fd >= 0) {
+        if (poll(fds, 3, -1) < 0) {
+            if (errno == EINTR)
+                continue;
+            error = errno;
+            break;
+        }
+
+        if (fds[0].revents & POLLOUT) {
+            ssize_t bytes = write(fds[0].fd, input + offset, input_size - offset);
+            if (bytes < 0 && errno != EAGAIN && errno != EINTR && errno != EPIPE) {
+                error = errno;
+                break;
+            }
+            if (bytes > 0)
+                offset += bytes;
+            if (offset >= input_size || (bytes < 0 && errno == EPIPE)) {
+                close(fds[0].fd);
+                fds[0].fd = -1;
+            }
+        } else if (fds[0].revents) {
+            // Ignore hang up or errors.
+            close(fds[0].fd);
+            fds[0].fd = -1;
+        }
+
+        for (int i = 1; i < 3; ++i) {
+            if (fds[i].revents & (POLLIN | POLLPRI | POLLHUP)) {
+                ssize_t bytes = cptbox_read_output(fds[i].fd, outputs[i]);
+                // A pty's master fails with EIO once its slave is closed, which is its end of file.
+                if (!bytes || (bytes < 0 && errno == EIO))
+                    fds[i].fd = -1;
+                else if (bytes < 0 && errno != EAGAIN && errno != EINTR) {
+                    error = errno;
+                    break;
+                }
+            } else if (fds[i].revents) {
+                fds[i].fd = -1;
+            }
+        }
+        if (error || out->exceeded || err->exceeded)
+            break;
+    }
+
+    if (fds[0].fd >= 0)
+        close(fds[0].fd);
+    errno = error;
+    return error ? -1 : 0;
+}
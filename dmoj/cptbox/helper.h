@@ -9,6 +9,22 @@
 #define PTBOX_SPAWN_FAIL_TRACEME      204
 #define PTBOX_SPAWN_FAIL_EXECVE       205
 #define PTBOX_SPAWN_FAIL_SETAFFINITY  206
+#define PTBOX_SPAWN_FAIL_LANDLOCK     207
+#define PTBOX_SPAWN_FAIL_CGROUP       208
+
+// Handler for cptbox_seccomp_compile of system calls sent to a seccomp user notification listener.
+#define PTBOX_SECCOMP_NOTIFY -2
+// Handler for cptbox_seccomp_compile of open system calls whose access is checked by Landlock instead, which are
+// allowed unless their flags, in argument PTBOX_SECCOMP_LANDLOCK_OPEN - handler, ask for what Landlock can't check.
+#define PTBOX_SECCOMP_LANDLOCK_OPEN -16
+
+// What a Landlock rule allows beneath its path, mirroring what a filesystem policy allows opening.
+#define PTBOX_LANDLOCK_READ_FILE  1
+#define PTBOX_LANDLOCK_READ_DIR   2
+#define PTBOX_LANDLOCK_WRITE_FILE 3
+#define PTBOX_LANDLOCK_WRITE_DIR  4
+
+struct pt_arg_rule;
 
 struct child_config {
     unsigned long memory;
@@ -26,7 +42,15 @@ struct child_config {
     int stderr_;
     int fd_3_;
     int fd_4_;
-    int *seccomp_handlers;
+    // A struct sock_fprog from cptbox_seccomp_compile.
+    void *seccomp_filter;
+    // Whether seccomp_filter sends notifications, in which case it's loaded with a listener right before execve.
+    int seccomp_notify;
+    // Paths to allow with Landlock and the PTBOX_LANDLOCK_* access of each, or NULL not to use Landlock.
+    char **landlock_paths;
+    int *landlock_access;
+    // The cgroup.procs of the cgroup to run in, or -1 to stay in that of the parent.
+    int cgroup_fd;
     // 64 cores ought to be enough for anyone.
     unsigned long cpu_affinity_mask;
 };
@@ -34,10 +58,46 @@ struct child_config {
 void cptbox_closefrom(int lowfd);
 int cptbox_child_run(const struct child_config *config);
 
+// Compiles a seccomp filter that allows the system calls with a handler of 0, fails those with a positive handler
+// with that errno, notifies the listener of those with PTBOX_SECCOMP_NOTIFY, and traps everything else to the
+// tracer, except for the calls that arg_rules (if not NULL) certainly allows without knowing the pid. Returns NULL
+// on failure.
+void *cptbox_seccomp_compile(const int *handlers, const pt_arg_rule *const *arg_rules);
+void cptbox_seccomp_free(void *filter);
+// Whether both the kernel and libseccomp support supervising system calls through seccomp user notifications,
+// such that their listener can be taken from the child and they can be allowed to continue.
+int cptbox_seccomp_notify_supported(void);
+// The Landlock ABI version supported by the kernel, or 0 if it can't be used.
+int cptbox_landlock_abi(void);
+// Restricts the calling process with Landlock to the given access beneath each path, of those that exist.
+int cptbox_landlock_restrict(char **paths, const int *access);
+
 char *bsd_get_proc_cwd(pid_t pid);
 char *bsd_get_proc_fdno(pid_t pid, int fdno);
 
 int cptbox_memfd_create(void);
 int cptbox_memfd_seal(int fd);
 
+// What cptbox_communicate requests pipes to be enlarged to.
+#define PTBOX_PIPE_SIZE (1 << 20)
+// The least room cptbox_communicate makes in an output's buffer before reading into it, which grows geometrically.
+#define PTBOX_OUTPUT_CHUNK 65536
+
+// An output read by cptbox_communicate, into a buffer allocated with malloc that the caller frees.
+struct pt_output {
+    char *data;
+    size_t size;
+    size_t capacity;
+    // The most to read, past which only one more byte is read and the output is marked as exceeded.
+    size_t limit;
+    int exceeded;
+};
+
+// Writes input to in_fd, and reads out_fd into out and err_fd into err, until every one of them is done with or either
+// output exceeds its limit. Any of the file descriptors may be -1 to skip it. in_fd is closed once everything has
+// been written to it, or when returning, so that the reader sees the end of the input. Returns 0 on success, or -1
+// with errno set.
+int cptbox_communicate(int in_fd, const char *input, size_t input_size, int out_fd, pt_output *out, int err_fd,
+                       pt_output *err);
+
 #endif
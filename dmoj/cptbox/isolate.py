@@ -1,11 +1,39 @@
 import logging
 import os
+import re
 import sys
+import tempfile
 from enum import Enum
-from typing import Any, Callable, List, Mapping, Sequence
-
-from dmoj.cptbox._cptbox import AT_FDCWD, Debugger, bsd_get_proc_cwd, bsd_get_proc_fdno
-from dmoj.cptbox.filesystem_policies import FilesystemAccessRule, FilesystemPolicy
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from dmoj.cptbox._cptbox import (
+    AT_FDCWD,
+    Debugger,
+    NativeFilesystemPolicy,
+    PTBOX_FS_CHECK_FSTAT,
+    PTBOX_FS_CHECK_NONE,
+    PTBOX_FS_CHECK_OPEN,
+    PTBOX_FS_CHECK_READ,
+    PTBOX_FS_CHECK_WRITE,
+    PTBOX_FS_FILE,
+    PTBOX_FS_IMMUTABLE,
+    PTBOX_FS_RECURSIVE,
+    PTBOX_LANDLOCK_READ_DIR,
+    PTBOX_LANDLOCK_READ_FILE,
+    PTBOX_LANDLOCK_WRITE_DIR,
+    PTBOX_LANDLOCK_WRITE_FILE,
+    bsd_get_proc_cwd,
+    bsd_get_proc_fdno,
+)
+from dmoj.cptbox.filesystem_policies import (
+    AccessMode,
+    CombinedFilesystemPolicy,
+    Dir,
+    File,
+    FilesystemAccessRule,
+    FilesystemPolicy,
+)
 from dmoj.cptbox.handlers import (
     ACCESS_EACCES,
     ACCESS_EFAULT,
@@ -13,7 +41,10 @@ from dmoj.cptbox.handlers import (
     ACCESS_ENOENT,
     ACCESS_EPERM,
     ALLOW,
+    ArgumentRule,
     ErrnoHandlerCallback,
+    PID,
+    argument_rule,
 )
 from dmoj.cptbox.syscalls import *
 from dmoj.cptbox.syscalls import by_id
@@ -40,17 +71,151 @@ AccessChecker = Callable[[Debugger], None]
 FSJailGetter = Callable[[Debugger], FilesystemPolicy]
 DirFDGetter = Callable[[Debugger], int]
 
+_native_fs_policies: 'WeakKeyDictionary[FilesystemPolicy, NativeFilesystemPolicy]' = WeakKeyDictionary()
+_landlock_paths: 'WeakKeyDictionary[FilesystemPolicy, List[Tuple[str, bool]]]' = WeakKeyDictionary()
+
+# Symlinks to /proc/self are resolved to the judge when building policies.
+_proc_pid_re = re.compile(r'/proc/\d+(/|$)')
+
+# Directories that only change when the system is updated. The tracer caches its verdicts for paths that resolve
+# entirely within them, for as long as they keep resolving to the same file.
+IMMUTABLE_DIRS = ['/usr', '/lib', '/lib32', '/lib64', '/libx32', '/bin', '/sbin', '/opt']
+
+
+def native_fs_rule(kind: int, *, file_reg: int, dir_reg: Optional[int] = None, flag_reg: Optional[int] = None) -> int:
+    # See PTBOX_FS_CHECK_* in ptbox.h.
+    dir_field = 0 if dir_reg is None else dir_reg + 1
+    flag_field = 0 if flag_reg is None else flag_reg + 1
+    return kind | dir_field << 4 | file_reg << 8 | flag_field << 12
+
+
+def _is_within(path: str, dir: str) -> bool:
+    return path == dir or path.startswith(dir.rstrip('/') + '/')
+
+
+def is_immutable_dir(path: str) -> bool:
+    """
+    Checks whether a directory is within IMMUTABLE_DIRS, and doesn't overlap with anywhere the judge writes to.
+    """
+    from dmoj.judgeenv import env
+
+    if not any(_is_within(path, dir) for dir in IMMUTABLE_DIRS):
+        return False
+
+    for dir in (tempfile.gettempdir(), env.tempdir, env.compiled_binary_cache_dir):
+        if not dir:
+            continue
+        for mutable in {os.path.abspath(dir), os.path.realpath(dir)}:
+            if _is_within(path, mutable) or _is_within(mutable, path):
+                return False
+    return True
+
+
+def _native_node_type(path: str, node: Union[Dir, File]) -> int:
+    if isinstance(node, File):
+        return PTBOX_FS_FILE
+    if node.access_mode == AccessMode.RECURSIVE and is_immutable_dir(path):
+        return PTBOX_FS_RECURSIVE | PTBOX_FS_IMMUTABLE
+    return node.access_mode.value
+
+
+def get_native_fs_policies(policy: FilesystemPolicy) -> Optional[List[NativeFilesystemPolicy]]:
+    """
+    Converts a filesystem policy into native policies that allow the same paths, building each FilesystemPolicy
+    only once.
+    :return: the native policies, or None if the policy can't be checked natively.
+    """
+    if isinstance(policy, CombinedFilesystemPolicy):
+        natives: List[NativeFilesystemPolicy] = []
+        for child in policy.policies:
+            child_natives = get_native_fs_policies(child)
+            if child_natives is None:
+                return None
+            natives += child_natives
+        return natives
+
+    # Subclasses may check paths differently.
+    if type(policy) is not FilesystemPolicy:
+        return None
+
+    native = _native_fs_policies.get(policy)
+    if native is None:
+        native = NativeFilesystemPolicy((path, _native_node_type(path, node)) for path, node in policy.walk())
+        _native_fs_policies[policy] = native
+    return [native]
+
+
+def get_landlock_rules(policy: FilesystemPolicy, *, write: bool) -> Optional[List[Tuple[str, int]]]:
+    """
+    Converts a filesystem policy into Landlock rules that allow opening at most the paths it allows. Landlock can
+    only allow listing a directory along with everything beneath it, so directories that are allowed exactly can't
+    be opened at all.
+    :return: the paths with the PTBOX_LANDLOCK_* access of each, or None if the policy can't be enforced by Landlock.
+    """
+    if isinstance(policy, CombinedFilesystemPolicy):
+        rules: List[Tuple[str, int]] = []
+        for child in policy.policies:
+            child_rules = get_landlock_rules(child, write=write)
+            if child_rules is None:
+                return None
+            rules += child_rules
+        return rules
+
+    if type(policy) is not FilesystemPolicy:
+        return None
+
+    paths = _landlock_paths.get(policy)
+    if paths is None:
+        paths = []
+        for path, node in policy.walk():
+            if _proc_pid_re.match(path):
+                continue
+            if isinstance(node, File):
+                paths.append((path, False))
+            elif node.access_mode == AccessMode.RECURSIVE:
+                paths.append((path, True))
+        _landlock_paths[policy] = paths
+
+    if write:
+        return [(path, PTBOX_LANDLOCK_WRITE_DIR if is_dir else PTBOX_LANDLOCK_WRITE_FILE) for path, is_dir in paths]
+    return [(path, PTBOX_LANDLOCK_READ_DIR if is_dir else PTBOX_LANDLOCK_READ_FILE) for path, is_dir in paths]
+
+
+PR_GET_DUMPABLE = 3
+PR_SET_NAME = 15
+PR_GET_NAME = 16
+PR_CAPBSET_READ = 23
+PR_SET_THP_DISABLE = 41
+PR_SVE_SET_VL = 50  # ARM64 SVE
+PR_SVE_GET_VL = 51  # ARM64 SVE
+PR_SET_VMA = 0x53564D41  # Used on Android
+ALLOWED_PRCTL_OPTIONS = (
+    PR_GET_DUMPABLE,
+    PR_SET_NAME,
+    PR_GET_NAME,
+    PR_CAPBSET_READ,
+    PR_SET_THP_DISABLE,
+    PR_SVE_SET_VL,
+    PR_SVE_GET_VL,
+    PR_SET_VMA,
+)
+
 
 class IsolateTracer(dict):
     def __init__(
         self,
         *,
-        read_fs: List[FilesystemAccessRule],
-        write_fs: List[FilesystemAccessRule],
+        read_fs: Union[Sequence[FilesystemAccessRule], FilesystemPolicy],
+        write_fs: Union[Sequence[FilesystemAccessRule], FilesystemPolicy],
         path_case_fixes=None,
         path_whitelist=None,
     ):
         super().__init__()
+        # Filesystem access checks that the tracer can do without calling into Python, by syscall; see
+        # native_fs_rule. The callback is still used for anything it doesn't allow.
+        self.native_fs_rules: Dict[int, int] = {}
+        # Likewise for the arguments of other calls, from handlers declared with argument_rule.
+        self.native_arg_rules: Dict[int, ArgumentRule] = {}
         self.read_fs_jail = self._compile_fs_jail(read_fs)
         self.write_fs_jail = self._compile_fs_jail(write_fs)
 
@@ -230,9 +395,32 @@ class IsolateTracer(dict):
                 }
             )
 
-    def _compile_fs_jail(self, fs: Sequence[FilesystemAccessRule]) -> FilesystemPolicy:
+    def _compile_fs_jail(self, fs: Union[Sequence[FilesystemAccessRule], FilesystemPolicy]) -> FilesystemPolicy:
+        # Policies are immutable once built, so prebuilt ones can be shared between tracers.
+        if isinstance(fs, FilesystemPolicy):
+            return fs
         return FilesystemPolicy(fs)
 
+    def get_native_fs_policies(self) -> Optional[Tuple[List[NativeFilesystemPolicy], List[NativeFilesystemPolicy]]]:
+        # Paths that need their case fixed must always go through _fix_path_case.
+        if self._path_case_fixes:
+            return None
+        read_fs = get_native_fs_policies(self.read_fs_jail)
+        write_fs = get_native_fs_policies(self.write_fs_jail)
+        if read_fs is None or write_fs is None:
+            return None
+        return read_fs, write_fs
+
+    def get_landlock_rules(self) -> Optional[List[Tuple[str, int]]]:
+        # Like native checks, Landlock can't fix the case of paths.
+        if self._path_case_fixes:
+            return None
+        read_rules = get_landlock_rules(self.read_fs_jail, write=False)
+        write_rules = get_landlock_rules(self.write_fs_jail, write=True)
+        if read_rules is None or write_rules is None:
+            return None
+        return read_rules + write_rules
+
     def _dirfd_getter_from_reg(self, reg: int) -> DirFDGetter:
         def getter(debugger: Debugger) -> int:
             return getattr(debugger, 'uarg%d' % reg)
@@ -272,16 +460,27 @@ class IsolateTracer(dict):
         return getter
 
     def handle_file_access(self, kind: FilesystemSyscallKind, *, file_reg: int) -> AccessChecker:
-        return self.access_check(self._fs_jail_getter_from_kind(kind), self._dirfd_getter_cwd, file_reg=file_reg)
+        return self.access_check(
+            self._fs_jail_getter_from_kind(kind),
+            self._dirfd_getter_cwd,
+            file_reg=file_reg,
+            native_rule=native_fs_rule(self._native_check_from_kind(kind), file_reg=file_reg),
+        )
 
     def handle_file_access_at(self, kind: FilesystemSyscallKind, *, dir_reg: int, file_reg: int) -> AccessChecker:
         return self.access_check(
-            self._fs_jail_getter_from_kind(kind), self._dirfd_getter_from_reg(dir_reg), file_reg=file_reg
+            self._fs_jail_getter_from_kind(kind),
+            self._dirfd_getter_from_reg(dir_reg),
+            file_reg=file_reg,
+            native_rule=native_fs_rule(self._native_check_from_kind(kind), dir_reg=dir_reg, file_reg=file_reg),
         )
 
     def handle_open(self, *, file_reg: int, flag_reg: int) -> AccessChecker:
         return self.access_check(
-            self._fs_jail_getter_from_open_flags_reg(flag_reg), self._dirfd_getter_cwd, file_reg=file_reg
+            self._fs_jail_getter_from_open_flags_reg(flag_reg),
+            self._dirfd_getter_cwd,
+            file_reg=file_reg,
+            native_rule=native_fs_rule(PTBOX_FS_CHECK_OPEN, file_reg=file_reg, flag_reg=flag_reg),
         )
 
     def handle_openat(self, *, dir_reg: int, file_reg: int, flag_reg: int) -> AccessChecker:
@@ -289,8 +488,16 @@ class IsolateTracer(dict):
             self._fs_jail_getter_from_open_flags_reg(flag_reg),
             self._dirfd_getter_from_reg(dir_reg),
             file_reg=file_reg,
+            native_rule=native_fs_rule(PTBOX_FS_CHECK_OPEN, dir_reg=dir_reg, file_reg=file_reg, flag_reg=flag_reg),
         )
 
+    @staticmethod
+    def _native_check_from_kind(kind: FilesystemSyscallKind) -> int:
+        return {
+            FilesystemSyscallKind.READ: PTBOX_FS_CHECK_READ,
+            FilesystemSyscallKind.WRITE: PTBOX_FS_CHECK_WRITE,
+        }[kind]
+
     def handle_fstat(self, *, dir_reg: int, file_reg: int) -> AccessChecker:
         def check(debugger: Debugger) -> None:
             rel_file = self.get_rel_file(debugger, reg=file_reg)
@@ -316,9 +523,19 @@ class IsolateTracer(dict):
             full_path = self._fix_path_case(full_path, rel_file, debugger, getattr(debugger, 'uarg%d' % file_reg))
             self._access_check(debugger, full_path, self.read_fs_jail)
 
+        check.native_rule = native_fs_rule(  # type: ignore[attr-defined]
+            PTBOX_FS_CHECK_FSTAT, dir_reg=dir_reg, file_reg=file_reg, flag_reg=3
+        )
         return check
 
-    def access_check(self, fs_jail_getter: FSJailGetter, dirfd_getter: DirFDGetter, *, file_reg: int) -> AccessChecker:
+    def access_check(
+        self,
+        fs_jail_getter: FSJailGetter,
+        dirfd_getter: DirFDGetter,
+        *,
+        file_reg: int,
+        native_rule: int = PTBOX_FS_CHECK_NONE,
+    ) -> AccessChecker:
         def check(debugger: Debugger) -> None:
             rel_file = self.get_rel_file(debugger, reg=file_reg)
             dirfd = dirfd_getter(debugger)
@@ -327,6 +544,8 @@ class IsolateTracer(dict):
             fs_jail = fs_jail_getter(debugger)
             self._access_check(debugger, full_path, fs_jail)
 
+        # The same check, if the tracer can do it natively.
+        check.native_rule = native_rule  # type: ignore[attr-defined]
         return check
 
     def get_rel_file(self, debugger: Debugger, *, reg: int) -> str:
@@ -457,6 +676,7 @@ class IsolateTracer(dict):
         file = '/' + os.path.normpath(file).lstrip('/')
         return file
 
+    @argument_rule(arg0={PID})
     def handle_kill(self, debugger: Debugger) -> None:
         # Allow tgkill to execute as long as the target thread group is the debugged process
         # libstdc++ seems to use this to signal itself, see <https://github.com/DMOJ/judge-server/issues/183>
@@ -464,30 +684,15 @@ class IsolateTracer(dict):
         if target != debugger.pid:
             raise DeniedSyscall(ACCESS_EPERM, f'Cannot kill other processes (target={target}, self={debugger.pid})')
 
+    @argument_rule(arg0={0, PID})
     def handle_prlimit(self, debugger: Debugger) -> None:
         target = debugger.uarg0
         if target not in (0, debugger.pid):
             raise DeniedSyscall(ACCESS_EPERM, f'Cannot prlimit other processes (target={target}, self={debugger.pid})')
 
+    @argument_rule(arg0=ALLOWED_PRCTL_OPTIONS)
     def handle_prctl(self, debugger: Debugger) -> None:
-        PR_GET_DUMPABLE = 3
-        PR_SET_NAME = 15
-        PR_GET_NAME = 16
-        PR_CAPBSET_READ = 23
-        PR_SET_THP_DISABLE = 41
-        PR_SVE_SET_VL = 50  # ARM64 SVE
-        PR_SVE_GET_VL = 51  # ARM64 SVE
-        PR_SET_VMA = 0x53564D41  # Used on Android
-        if debugger.arg0 not in (
-            PR_GET_DUMPABLE,
-            PR_SET_NAME,
-            PR_GET_NAME,
-            PR_CAPBSET_READ,
-            PR_SET_THP_DISABLE,
-            PR_SVE_SET_VL,
-            PR_SVE_GET_VL,
-            PR_SET_VMA,
-        ):
+        if debugger.arg0 not in ALLOWED_PRCTL_OPTIONS:
             raise DeniedSyscall(protection_fault, f'Non-whitelisted prctl option: {debugger.arg0}')
 
     # ignore typing because of overload checks
@@ -501,6 +706,18 @@ class IsolateTracer(dict):
         else:
             super().__setitem__(syscall, wrap_access_check(syscall, handler))
 
+        native_rule = getattr(handler, 'native_rule', PTBOX_FS_CHECK_NONE)
+        if native_rule != PTBOX_FS_CHECK_NONE:
+            self.native_fs_rules[syscall] = native_rule
+        else:
+            self.native_fs_rules.pop(syscall, None)
+
+        arg_rule = getattr(handler, 'argument_rule', None)
+        if arg_rule is not None:
+            self.native_arg_rules[syscall] = arg_rule
+        else:
+            self.native_arg_rules.pop(syscall, None)
+
 
 def wrap_access_check(syscall: int, check: AccessChecker) -> HandlerCallback:
     def inner(debugger) -> bool:
@@ -10,7 +10,15 @@
 #include <sys/time.h>
 #include <sys/types.h>
 
+#include <atomic>
+#include <functional>
 #include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <unordered_map>
+#include <vector>
 
 #if defined(__FreeBSD__) || defined(__FreeBSD_kernel__)
 #define PTBOX_FREEBSD 1
@@ -42,6 +50,25 @@
 #define PTBOX_EXIT_NORMAL     0
 #define PTBOX_EXIT_PROTECTION 1
 
+// Node types of a pt_fs_policy, matching AccessMode in filesystem_policies.py for directories.
+#define PTBOX_FS_NONE      0
+#define PTBOX_FS_EXACT     1
+#define PTBOX_FS_RECURSIVE 2
+#define PTBOX_FS_FILE      3
+// Flag for a PTBOX_FS_RECURSIVE directory that only changes when the system is updated, like /usr. Verdicts for
+// paths that resolve entirely within such directories are cached.
+#define PTBOX_FS_IMMUTABLE 0x10
+
+// Filesystem access checks that can be done without calling into Python. A rule is packed as
+// kind | (dir_reg + 1) << 4 | file_reg << 8 | (flag_reg + 1) << 12, where a dir_reg of -1 means the path is
+// relative to the current directory, and flag_reg holds the open flags for PTBOX_FS_CHECK_OPEN, or the
+// fstatat flags for PTBOX_FS_CHECK_FSTAT.
+#define PTBOX_FS_CHECK_NONE  0
+#define PTBOX_FS_CHECK_READ  1
+#define PTBOX_FS_CHECK_WRITE 2
+#define PTBOX_FS_CHECK_OPEN  3
+#define PTBOX_FS_CHECK_FSTAT 4
+
 enum {
     PTBOX_ABI_X86 = 0,
     PTBOX_ABI_X64,
@@ -90,23 +117,93 @@ inline void timespec_sub(struct timespec *a, struct timespec *b, struct timespec
 
 class pt_debugger;
 
+// A native copy of a FilesystemPolicy, along with a cache of the paths it allowed within immutable directories.
+class pt_fs_policy {
+  public:
+    bool add(const char *path, int type);
+    bool check(const std::string &path) const;
+    bool check(const char *path) const { return check(std::string(path)); }
+    bool is_immutable(const std::string &path) const;
+    bool cached(const std::string &path) const;
+    void cache(const std::string &path) const;
+    size_t cache_size() const;
+
+  private:
+    struct node {
+        int type = PTBOX_FS_NONE;
+        bool immutable = false;
+        bool immutable_below = false;
+        std::map<std::string, std::unique_ptr<node>> children;
+    };
+    // The identity of the file a cached path resolved to, or the error resolving it.
+    struct cache_entry {
+        int error;
+        dev_t dev;
+        ino_t ino;
+    };
+    node root;
+    mutable std::mutex cache_lock;
+    mutable std::unordered_map<std::string, cache_entry> verdicts;
+};
+
+// Same as IsolateTracer._access_check for an absolute path, except that it gives up instead of denying access.
+// Allowed paths may be cached by the policies if cacheable is true.
+bool pt_fs_check_path(const std::vector<const pt_fs_policy *> &policies, const std::string &path, bool cacheable);
+
 typedef int (*pt_handler_callback)(void *context, int syscall);
 typedef void (*pt_syscall_return_callback)(void *context, pid_t pid, int syscall);
 typedef int (*pt_fork_handler)(void *context);
 typedef int (*pt_event_callback)(void *context, int event, unsigned long param);
 
+// A system call sent to the supervisor through a seccomp user notification.
+struct pt_notification {
+    uint64_t id;
+    pid_t tid;
+    int abi;
+    int syscall;
+    unsigned long args[6];
+};
+
+// A check of the arguments of a system call that can be done without calling into Python, which allows the call if
+// every condition holds. A condition holds if argument reg is one of values, or the pid of the process if match_pid
+// is set.
+struct pt_arg_condition {
+    int reg;
+    bool match_pid;
+    std::vector<unsigned long> values;
+};
+
+struct pt_arg_rule {
+    std::vector<pt_arg_condition> conditions;
+};
+
+// Decides a system call sent to the supervisor: 0 lets it continue, a positive value fails it with that errno, and
+// a negative value kills the process.
+typedef int (*pt_notify_callback)(void *context, const pt_notification *notification);
+
 class pt_process {
   public:
     pt_process(pt_debugger *debugger);
+    ~pt_process();
     void set_callback(pt_handler_callback, void *context);
     void set_event_proc(pt_event_callback, void *context);
     int set_handler(int abi, int syscall, int handler);
+    void set_handlers(const int *handlers, const int *fs_rules, const pt_arg_rule *const *arg_rules);
+    void clear_fs_policies();
+    void add_fs_policy(bool write, const pt_fs_policy *policy);
+    void set_notify_callback(pt_notify_callback, void *context);
+    bool use_seccomp_notify() { return _use_seccomp_notify; }
+    void use_seccomp_notify(bool value) { _use_seccomp_notify = value; }
+    char *notify_readstr(const pt_notification *notification, unsigned long addr, size_t max_size);
     bool trace_syscalls() { return _trace_syscalls; }
+    void profile_traps();
+    unsigned long trap_count(int abi, int syscall);
+    double stop_time() { return _stop_time; }
     void trace_syscalls(bool value) { _trace_syscalls = value; }
     int spawn(pt_fork_handler child, void *context);
     int monitor();
     int getpid() { return pid; }
-    double execution_time() { return exec_time.tv_sec + exec_time.tv_nsec / 1000000000.0; }
+    double execution_time();
     double wall_clock_time();
     const rusage *getrusage() { return &_rusage; }
     bool was_initialized() { return _initialized; }
@@ -114,17 +211,47 @@ class pt_process {
   protected:
     int dispatch(int event, unsigned long param);
     int protection_fault(int syscall, int type = PTBOX_EVENT_PROTECTION);
+    bool check_arg_rule(const pt_arg_rule *rule);
+    bool check_fs_access(int rule);
+    bool check_fs_access(int rule, int abi, pid_t tid, const unsigned long *args,
+                         const std::function<char *(unsigned long, size_t)> &readstr);
+    void free_child_stack();
+    void count_trap(int abi, int syscall);
+    bool start_supervisor(pid_t tid);
+    void stop_supervisor();
+    void supervise();
+    int handle_notification(const pt_notification *notification);
 
   private:
     pid_t pid;
+    // The stack the child runs on until it execs, since it shares our memory instead of getting a copy of it.
+    void *child_stack;
     int handler[PTBOX_ABI_COUNT][MAX_SYSCALL];
+    int fs_rule[PTBOX_ABI_COUNT][MAX_SYSCALL];
+    // The argument rule of every system call of every ABI, or NULL for those without one, which must outlive us.
+    const pt_arg_rule *const *arg_rules;
+    std::vector<const pt_fs_policy *> read_fs, write_fs;
     pt_handler_callback callback;
     void *context;
-    struct timespec exec_time, start_time, end_time;
+    struct timespec start_time, end_time;
+    // The time the process spent running between events, and when we started waiting for the current one (or 0 if
+    // we are handling one) on CLOCK_MONOTONIC, so that the execution time can be read from other threads while the
+    // process runs.
+    std::atomic<double> exec_time, wait_start;
+    // The time the process spent stopped for us to handle events.
+    double _stop_time;
+    // The number of system calls trapped to us by ABI and number, if they are being counted.
+    std::unique_ptr<std::atomic<unsigned long>[]> trap_counts;
     struct rusage _rusage;
     pt_debugger *debugger;
     pt_event_callback event_proc;
     void *event_context;
+    pt_notify_callback notify_callback;
+    void *notify_context;
+    int notify_fd, notify_stop_fd;
+    std::thread supervisor;
+    std::atomic<bool> notify_fault;
+    bool _use_seccomp_notify;
     bool _trace_syscalls;
     bool _initialized;
 };
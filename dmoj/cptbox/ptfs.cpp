@@ -0,0 +1,386 @@
+#define _DEFAULT_SOURCE
+#define _BSD_SOURCE
+
+#include <errno.h>
+#include <fcntl.h>
+#include <limits.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include "ptbox.h"
+
+// Same limit as IsolateTracer.get_rel_file.
+#define PTBOX_FS_MAX_PATH 4096
+// Same limit as the kernel, after which path resolution fails with ELOOP.
+#define PTBOX_FS_MAX_SYMLINKS 40
+// Beyond this, the verdict cache of a policy is simply cleared.
+#define PTBOX_FS_MAX_CACHED 65536
+// Defined here because FreeBSD 13 does not implement AT_EMPTY_PATH; see IsolateTracer.handle_fstat.
+#define PTBOX_AT_EMPTY_PATH 0x1000
+
+// clang-format off
+static const int open_write_flags[] = {
+    O_WRONLY,
+    O_RDWR,
+    O_TRUNC,
+    O_CREAT,
+    O_EXCL,
+#ifdef O_TMPFILE
+    O_TMPFILE,
+#endif
+};
+// clang-format on
+
+// Pushes the components of path onto a stack, such that the first component is popped first.
+static void push_components(std::vector<std::string> &stack, const std::string &path) {
+    size_t end = path.size();
+    while (end > 0) {
+        size_t start = path.rfind('/', end - 1);
+        start = start == std::string::npos ? 0 : start + 1;
+        if (start < end)
+            stack.emplace_back(path, start, end - start);
+        end = start ? start - 1 : 0;
+    }
+}
+
+// Equivalent to '/' + os.path.normpath(path).lstrip('/') for an absolute path.
+static std::string normalize_path(const std::string &path) {
+    std::vector<std::string> stack, components;
+    push_components(stack, path);
+    while (!stack.empty()) {
+        std::string &name = stack.back();
+        if (name == "..") {
+            if (!components.empty())
+                components.pop_back();
+        } else if (name != ".") {
+            components.push_back(std::move(name));
+        }
+        stack.pop_back();
+    }
+
+    if (components.empty())
+        return "/";
+
+    std::string result;
+    for (const std::string &name : components) {
+        result += '/';
+        result += name;
+    }
+    return result;
+}
+
+// Equivalent to os.path.realpath for an absolute path, which, unlike realpath(3), also resolves paths that don't
+// exist. Returns false on symlink loops, which os.path.realpath handles in its own way. Every path looked at along
+// the way is added to visited, if given.
+static bool resolve_path(const std::string &path, std::string &resolved, std::vector<std::string> *visited = nullptr) {
+    std::vector<std::string> stack;
+    char target[PATH_MAX];
+    struct stat st;
+    int links = 0;
+
+    push_components(stack, path);
+    resolved.clear();
+    while (!stack.empty()) {
+        std::string name = std::move(stack.back());
+        stack.pop_back();
+
+        if (name == ".")
+            continue;
+        if (name == "..") {
+            resolved.resize(resolved.rfind('/') == std::string::npos ? 0 : resolved.rfind('/'));
+            continue;
+        }
+
+        std::string next = resolved + '/' + name;
+        if (visited)
+            visited->push_back(next);
+        if (lstat(next.c_str(), &st) || !S_ISLNK(st.st_mode)) {
+            resolved = std::move(next);
+            continue;
+        }
+
+        if (++links > PTBOX_FS_MAX_SYMLINKS)
+            return false;
+
+        ssize_t size = readlink(next.c_str(), target, sizeof target);
+        if (size <= 0 || (size_t) size >= sizeof target)
+            return false;
+        if (target[0] == '/')
+            resolved.clear();
+        push_components(stack, std::string(target, size));
+    }
+
+    if (resolved.empty())
+        resolved = "/";
+    return true;
+}
+
+static bool is_proc_path(const std::string &path) {
+    return path.compare(0, 5, "/proc") == 0 && (path.size() == 5 || path[5] == '/');
+}
+
+static bool check_policies(const std::vector<const pt_fs_policy *> &policies, const std::string &path) {
+    for (const pt_fs_policy *policy : policies)
+        if (policy->check(path))
+            return true;
+    return false;
+}
+
+bool pt_fs_policy::add(const char *path, int type) {
+    std::vector<std::string> stack;
+    std::vector<node *> parents;
+    node *current = &root;
+    bool immutable = type & PTBOX_FS_IMMUTABLE;
+
+    type &= ~PTBOX_FS_IMMUTABLE;
+    if (*path != '/' || (immutable && type != PTBOX_FS_RECURSIVE))
+        return false;
+
+    push_components(stack, path);
+    while (!stack.empty()) {
+        if (current->type == PTBOX_FS_FILE)
+            return false;
+        parents.push_back(current);
+        std::unique_ptr<node> &child = current->children[stack.back()];
+        if (!child)
+            child.reset(new node());
+        current = child.get();
+        stack.pop_back();
+    }
+
+    current->type = type;
+    current->immutable = immutable;
+    if (immutable)
+        for (node *parent : parents)
+            parent->immutable_below = true;
+    return true;
+}
+
+// Same as FilesystemPolicy.check for a normalized path.
+bool pt_fs_policy::check(const std::string &path) const {
+    const node *current = &root;
+    size_t start = 1;
+
+    while (start < path.size()) {
+        if (current->type == PTBOX_FS_FILE)
+            return false;
+        if (current->type == PTBOX_FS_RECURSIVE)
+            return true;
+
+        size_t end = path.find('/', start);
+        if (end == std::string::npos)
+            end = path.size();
+        auto child = current->children.find(path.substr(start, end - start));
+        if (child == current->children.end())
+            return false;
+        current = child->second.get();
+        start = end + 1;
+    }
+
+    return current->type != PTBOX_FS_NONE;
+}
+
+// Whether the path is within an immutable directory, or is one of its parents. Since immutable directories never
+// overlap with anything the judge writes to, neither can change while the judge is running.
+bool pt_fs_policy::is_immutable(const std::string &path) const {
+    const node *current = &root;
+    size_t start = 1;
+
+    while (start < path.size()) {
+        if (current->immutable)
+            return true;
+        if (current->type == PTBOX_FS_FILE)
+            return false;
+
+        size_t end = path.find('/', start);
+        if (end == std::string::npos)
+            end = path.size();
+        auto child = current->children.find(path.substr(start, end - start));
+        if (child == current->children.end())
+            return false;
+        current = child->second.get();
+        start = end + 1;
+    }
+
+    return current->immutable || current->immutable_below;
+}
+
+// Whether the path was allowed before and still resolves to the same file, or still fails to resolve the same way.
+bool pt_fs_policy::cached(const std::string &path) const {
+    cache_entry entry;
+    {
+        std::lock_guard<std::mutex> guard(cache_lock);
+        auto it = verdicts.find(path);
+        if (it == verdicts.end())
+            return false;
+        entry = it->second;
+    }
+
+    struct stat st;
+    if (stat(path.c_str(), &st))
+        return entry.error == errno;
+    return !entry.error && entry.dev == st.st_dev && entry.ino == st.st_ino;
+}
+
+void pt_fs_policy::cache(const std::string &path) const {
+    struct stat st;
+    cache_entry entry = { 0, 0, 0 };
+    if (stat(path.c_str(), &st)) {
+        entry.error = errno;
+    } else {
+        entry.dev = st.st_dev;
+        entry.ino = st.st_ino;
+    }
+
+    std::lock_guard<std::mutex> guard(cache_lock);
+    if (verdicts.size() >= PTBOX_FS_MAX_CACHED)
+        verdicts.clear();
+    verdicts[path] = entry;
+}
+
+size_t pt_fs_policy::cache_size() const {
+    std::lock_guard<std::mutex> guard(cache_lock);
+    return verdicts.size();
+}
+
+bool pt_fs_check_path(const std::vector<const pt_fs_policy *> &policies, const std::string &path, bool cacheable) {
+    std::string normalized = normalize_path(path), real;
+    if (is_proc_path(normalized))
+        return false;
+
+    // Only normalized paths are cached, so that the cached path is the one checked, and is resolved component by
+    // component from the root, within immutable directories.
+    cacheable = cacheable && path == normalized;
+    if (cacheable)
+        for (const pt_fs_policy *policy : policies)
+            if (policy->cached(path))
+                return true;
+
+    std::vector<std::string> visited;
+    if (!resolve_path(path, real, cacheable ? &visited : nullptr) || is_proc_path(real))
+        return false;
+
+    if (normalized != real) {
+        // Same as the symlink trickery check in Python: both must be the same file, and both must be allowed.
+        struct stat normalized_stat, real_stat;
+        if (stat(normalized.c_str(), &normalized_stat) || stat(real.c_str(), &real_stat))
+            return false;
+        if (normalized_stat.st_dev != real_stat.st_dev || normalized_stat.st_ino != real_stat.st_ino)
+            return false;
+        if (!check_policies(policies, real))
+            return false;
+    }
+
+    if (!check_policies(policies, normalized))
+        return false;
+
+    if (cacheable) {
+        // The verdict can only be reused if nothing that went into it can change, which excludes anything that
+        // resolves through a symlink out of the immutable directories, even if it comes back. Policies are shared
+        // between processes, so it is only cached on a policy that allows the path by itself.
+        for (const pt_fs_policy *policy : policies) {
+            if (!policy->check(normalized) || (normalized != real && !policy->check(real)))
+                continue;
+            bool immutable = policy->is_immutable(normalized) && policy->is_immutable(real);
+            for (size_t i = 0; immutable && i < visited.size(); ++i)
+                immutable = policy->is_immutable(visited[i]);
+            if (immutable) {
+                policy->cache(path);
+                break;
+            }
+        }
+    }
+    return true;
+}
+
+void pt_process::clear_fs_policies() {
+    read_fs.clear();
+    write_fs.clear();
+}
+
+void pt_process::add_fs_policy(bool write, const pt_fs_policy *policy) {
+    (write ? write_fs : read_fs).push_back(policy);
+}
+
+// A subset of IsolateTracer._access_check: returns true only if the access is allowed there too. It gives up on
+// anything unusual, like /proc (which is relative to the process resolving it), paths that aren't ASCII, or
+// paths that can't be read, so that the callback can deal with it.
+bool pt_process::check_fs_access(int rule) {
+    unsigned long args[6] = {
+        (unsigned long) debugger->arg0(), (unsigned long) debugger->arg1(), (unsigned long) debugger->arg2(),
+        (unsigned long) debugger->arg3(), (unsigned long) debugger->arg4(), (unsigned long) debugger->arg5(),
+    };
+    return check_fs_access(rule, debugger->abi(), debugger->gettid(), args,
+                           [this](unsigned long addr, size_t size) { return debugger->readstr(addr, size); });
+}
+
+// Same as above, for a system call of the thread tid with the given arguments, where readstr returns a string
+// allocated with malloc.
+bool pt_process::check_fs_access(int rule, int abi, pid_t tid, const unsigned long *args,
+                                 const std::function<char *(unsigned long, size_t)> &readstr) {
+#if PTBOX_FREEBSD
+    return false;
+#else
+    int kind = rule & 0xF;
+    int dir_reg = ((rule >> 4) & 0xF) - 1;
+    int file_reg = (rule >> 8) & 0xF;
+    int flag_reg = ((rule >> 12) & 0xF) - 1;
+
+    const std::vector<const pt_fs_policy *> *policies = kind == PTBOX_FS_CHECK_WRITE ? &write_fs : &read_fs;
+    if (kind == PTBOX_FS_CHECK_OPEN) {
+        unsigned long flags = args[flag_reg];
+        for (int flag : open_write_flags) {
+            // Strict equality is necessary here, since e.g. O_TMPFILE has multiple bits set.
+            if ((flags & flag) == (unsigned long) flag) {
+                policies = &write_fs;
+                break;
+            }
+        }
+    }
+    if (policies->empty())
+        return false;
+
+    unsigned long address = args[file_reg];
+    if (abi == PTBOX_ABI_X86 || abi == PTBOX_ABI_X32 || abi == PTBOX_ABI_ARM)
+        address &= 0xFFFFFFFF;
+
+    char *buffer = readstr(address, PTBOX_FS_MAX_PATH + 1);
+    if (!buffer)
+        return false;
+    std::string file(buffer);
+    free(buffer);
+
+    if (file.empty())
+        return kind == PTBOX_FS_CHECK_FSTAT && (args[flag_reg] & PTBOX_AT_EMPTY_PATH);
+    if (file.size() > PTBOX_FS_MAX_PATH)
+        return false;
+    for (unsigned char c : file)
+        if (c >= 0x80)
+            return false;
+
+    std::string path;
+    if (file[0] == '/') {
+        path = std::move(file);
+    } else {
+        char link[64], dir[PATH_MAX];
+        int dirfd = dir_reg < 0 ? AT_FDCWD : (int) (unsigned int) args[dir_reg];
+        if (dirfd == AT_FDCWD)
+            snprintf(link, sizeof link, "/proc/%d/cwd", tid);
+        else
+            snprintf(link, sizeof link, "/proc/%d/fd/%d", tid, dirfd);
+
+        ssize_t size = readlink(link, dir, sizeof dir);
+        if (size <= 0 || (size_t) size >= sizeof dir || dir[0] != '/')
+            return false;
+        path.assign(dir, size);
+        path += '/';
+        path += file;
+    }
+
+    // Writable paths are never cached, since the submission could replace them with symlinks.
+    return pt_fs_check_path(*policies, path, policies == &read_fs);
+#endif
+}
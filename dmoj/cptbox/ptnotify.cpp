@@ -0,0 +1,236 @@
+#define _DEFAULT_SOURCE
+#define _BSD_SOURCE
+
+#include <dirent.h>
+#include <errno.h>
+#include <limits.h>
+#include <poll.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/ioctl.h>
+#include <sys/syscall.h>
+#include <sys/uio.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <system_error>
+
+#include "ptbox.h"
+
+#if !PTBOX_FREEBSD
+#include <linux/seccomp.h>
+#include <sys/eventfd.h>
+#endif
+
+#if !PTBOX_FREEBSD && defined(SECCOMP_IOCTL_NOTIF_RECV) && defined(SECCOMP_USER_NOTIF_FLAG_CONTINUE) &&                \
+    defined(SYS_pidfd_getfd)
+#define PTBOX_SECCOMP_NOTIFY 1
+#else
+#define PTBOX_SECCOMP_NOTIFY 0
+#endif
+
+// System calls with a native filesystem access check can be sent to a seccomp user notification listener instead
+// of trapping into the tracer. The supervisor thread answering them doesn't need to stop the process or read its
+// registers, and does the same native check, calling into Python only for what it can't allow. Everything else,
+// including the lifecycle of the process, is still handled by ptrace.
+
+void pt_process::set_notify_callback(pt_notify_callback callback, void *context) {
+    notify_callback = callback;
+    notify_context = context;
+}
+
+#if PTBOX_SECCOMP_NOTIFY
+// There is no other way to tell which file descriptor of the process is the listener.
+static int find_listener(pid_t tid) {
+    char path[64], fd_path[PATH_MAX], link[64];
+    struct dirent *entry;
+    int fd = -1;
+
+    snprintf(path, sizeof path, "/proc/%d/fd", tid);
+    DIR *dir = opendir(path);
+    if (!dir)
+        return -1;
+
+    while ((entry = readdir(dir))) {
+        snprintf(fd_path, sizeof fd_path, "%s/%s", path, entry->d_name);
+        ssize_t size = readlink(fd_path, link, sizeof link - 1);
+        if (size <= 0)
+            continue;
+        link[size] = '\0';
+        if (!strcmp(link, "anon_inode:seccomp notify")) {
+            fd = atoi(entry->d_name);
+            break;
+        }
+    }
+
+    closedir(dir);
+    if (fd < 0)
+        errno = ENOENT;
+    return fd;
+}
+#endif
+
+// Takes the listener from the process, which must be stopped before its first execve completes.
+bool pt_process::start_supervisor(pid_t tid) {
+#if PTBOX_SECCOMP_NOTIFY
+    int target, pidfd, err;
+
+    if ((target = find_listener(tid)) < 0 || (pidfd = syscall(SYS_pidfd_open, tid, 0)) < 0)
+        return false;
+    notify_fd = syscall(SYS_pidfd_getfd, pidfd, target, 0);
+    err = errno;
+    close(pidfd);
+    if (notify_fd < 0) {
+        errno = err;
+        return false;
+    }
+
+    if ((notify_stop_fd = eventfd(0, EFD_CLOEXEC)) < 0)
+        return false;
+
+    try {
+        supervisor = std::thread(&pt_process::supervise, this);
+    } catch (const std::system_error &e) {
+        errno = e.code().value();
+        return false;
+    }
+    return true;
+#else
+    (void) tid;
+    errno = ENOSYS;
+    return false;
+#endif
+}
+
+void pt_process::stop_supervisor() {
+#if PTBOX_SECCOMP_NOTIFY
+    if (supervisor.joinable()) {
+        uint64_t value = 1;
+        while (write(notify_stop_fd, &value, sizeof value) < 0 && errno == EINTR)
+            ;
+        supervisor.join();
+    }
+#endif
+    if (notify_stop_fd >= 0)
+        close(notify_stop_fd);
+    if (notify_fd >= 0)
+        close(notify_fd);
+    notify_fd = notify_stop_fd = -1;
+}
+
+void pt_process::supervise() {
+#if PTBOX_SECCOMP_NOTIFY
+    struct seccomp_notif_sizes sizes;
+    struct pollfd fds[2] = { { notify_fd, POLLIN, 0 }, { notify_stop_fd, POLLIN, 0 } };
+
+    if (!syscall(__NR_seccomp, SECCOMP_GET_NOTIF_SIZES, 0, &sizes)) {
+        // The kernel may use larger structures than we were compiled with.
+        std::vector<char> request_buffer(std::max<size_t>(sizes.seccomp_notif, sizeof(struct seccomp_notif)));
+        std::vector<char> response_buffer(
+            std::max<size_t>(sizes.seccomp_notif_resp, sizeof(struct seccomp_notif_resp)));
+        struct seccomp_notif *request = (struct seccomp_notif *) request_buffer.data();
+        struct seccomp_notif_resp *response = (struct seccomp_notif_resp *) response_buffer.data();
+
+        while (true) {
+            if (poll(fds, 2, -1) < 0) {
+                if (errno == EINTR)
+                    continue;
+                break;
+            }
+            // Either the process exited, or every process using the filter did.
+            if (fds[1].revents || fds[0].revents & (POLLHUP | POLLERR | POLLNVAL))
+                return;
+
+            memset(request, 0, request_buffer.size());
+            if (ioctl(notify_fd, SECCOMP_IOCTL_NOTIF_RECV, request)) {
+                // The system call was interrupted before we got to it.
+                if (errno == EINTR || errno == ENOENT)
+                    continue;
+                break;
+            }
+
+            pt_notification notification;
+            notification.id = request->id;
+            notification.tid = request->pid;
+            // Only system calls of the native ABI are sent here.
+            notification.abi =
+                request->data.arch == seccomp_arch_native() ? pt_debugger::native_abi : PTBOX_ABI_INVALID;
+            notification.syscall = request->data.nr;
+            for (int i = 0; i < 6; ++i)
+                notification.args[i] = request->data.args[i];
+
+            int verdict = handle_notification(&notification);
+            memset(response, 0, response_buffer.size());
+            response->id = request->id;
+            if (verdict == 0) {
+                response->flags = SECCOMP_USER_NOTIF_FLAG_CONTINUE;
+            } else if (verdict > 0) {
+                response->error = -verdict;
+            } else {
+                notify_fault = true;
+                killpg(pid, SIGKILL);
+                response->error = -EPERM;
+            }
+            // This fails if the system call was interrupted meanwhile, in which case there's nothing to do.
+            ioctl(notify_fd, SECCOMP_IOCTL_NOTIF_SEND, response);
+        }
+    }
+
+    // Without a supervisor, the process would wait on its next notification forever.
+    perror("seccomp notification");
+    notify_fault = true;
+    killpg(pid, SIGKILL);
+#endif
+}
+
+int pt_process::handle_notification(const pt_notification *notification) {
+    int abi = notification->abi, syscall = notification->syscall;
+    count_trap(abi, syscall);
+    if (abi != PTBOX_ABI_INVALID && syscall >= 0 && syscall < MAX_SYSCALL && fs_rule[abi][syscall] &&
+        check_fs_access(
+            fs_rule[abi][syscall], abi, notification->tid, notification->args,
+            [this, notification](unsigned long addr, size_t size) { return notify_readstr(notification, addr, size); }))
+        return 0;
+    return notify_callback ? notify_callback(notify_context, notification) : -1;
+}
+
+// Same as pt_debugger::readstr, for the thread that sent the notification.
+char *pt_process::notify_readstr(const pt_notification *notification, unsigned long addr, size_t max_size) {
+#if PTBOX_SECCOMP_NOTIFY
+    static unsigned long page_size = sysconf(_SC_PAGESIZE);
+    size_t read = 0;
+    char *buf;
+
+    if (!addr || !(buf = (char *) malloc(max_size + 1)))
+        return nullptr;
+
+    while (read < max_size) {
+        // A read can't span pages, since the next one may not be mapped.
+        size_t size = std::min<size_t>(page_size - (addr + read) % page_size, max_size - read);
+        struct iovec local = { buf + read, size }, remote = { (void *) (addr + read), size };
+        if (process_vm_readv(notification->tid, &local, 1, &remote, 1, 0) != (ssize_t) size) {
+            free(buf);
+            return nullptr;
+        }
+        if (memchr(buf + read, '\0', size))
+            break;
+        read += size;
+    }
+    buf[max_size] = '\0';
+
+    // The thread may have been killed, and its tid reused, before we read from it.
+    uint64_t id = notification->id;
+    if (ioctl(notify_fd, SECCOMP_IOCTL_NOTIF_ID_VALID, &id)) {
+        free(buf);
+        return nullptr;
+    }
+    return buf;
+#else
+    (void) notification;
+    (void) addr;
+    (void) max_size;
+    return nullptr;
+#endif
+}
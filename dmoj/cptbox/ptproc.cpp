@@ -2,10 +2,13 @@
 #define _BSD_SOURCE
 
 #include <errno.h>
+#include <pthread.h>
+#include <sched.h>
 #include <signal.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <sys/mman.h>
 #include <sys/ptrace.h>
 #include <sys/resource.h>
 #include <sys/time.h>
@@ -13,20 +16,30 @@
 #include <time.h>
 #include <unistd.h>
 
+#include <algorithm>
 #include <set>
 
 #include "ptbox.h"
 
+// Enough for everything the child does before it execs.
+#define PTBOX_SPAWN_STACK_SIZE (256 * 1024)
+
 pt_process::pt_process(pt_debugger *debugger)
-    : pid(0), callback(NULL), context(NULL), debugger(debugger), event_proc(NULL), event_context(NULL),
+    : pid(0), child_stack(NULL), arg_rules(NULL), callback(NULL), context(NULL), exec_time(0), wait_start(0),
+      _stop_time(0), debugger(debugger), event_proc(NULL), event_context(NULL), notify_callback(NULL),
+      notify_context(NULL), notify_fd(-1), notify_stop_fd(-1), notify_fault(false), _use_seccomp_notify(false),
       _trace_syscalls(true), _initialized(false) {
-    memset(&exec_time, 0, sizeof exec_time);
-    memset(&start_time, 0, sizeof exec_time);
-    memset(&end_time, 0, sizeof exec_time);
+    memset(&start_time, 0, sizeof start_time);
+    memset(&end_time, 0, sizeof end_time);
     memset(handler, 0, sizeof handler);
+    memset(fs_rule, 0, sizeof fs_rule);
     debugger->set_process(this);
 }
 
+pt_process::~pt_process() {
+    free_child_stack();
+}
+
 double pt_process::wall_clock_time() {
     struct timespec now, delta;
 
@@ -41,6 +54,33 @@ double pt_process::wall_clock_time() {
     return delta.tv_sec + delta.tv_nsec / 1000000000.0;
 }
 
+double pt_process::execution_time() {
+    // Read in the opposite order from which monitor updates them, so that no wait is counted twice.
+    double time = exec_time, since = wait_start;
+    if (since) {
+        struct timespec now;
+        clock_gettime(CLOCK_MONOTONIC, &now);
+        time += std::max(now.tv_sec + now.tv_nsec / 1000000000.0 - since, 0.0);
+    }
+    return time;
+}
+
+void pt_process::profile_traps() {
+    trap_counts.reset(new std::atomic<unsigned long>[PTBOX_ABI_COUNT * MAX_SYSCALL]());
+}
+
+unsigned long pt_process::trap_count(int abi, int syscall) {
+    if (!trap_counts || abi < 0 || abi >= PTBOX_ABI_COUNT || syscall < 0 || syscall >= MAX_SYSCALL)
+        return 0;
+    return trap_counts[abi * MAX_SYSCALL + syscall].load(std::memory_order_relaxed);
+}
+
+void pt_process::count_trap(int abi, int syscall) {
+    // Notifications are handled by the supervisor thread at the same time as traps.
+    if (trap_counts && abi >= 0 && abi < PTBOX_ABI_COUNT && syscall >= 0 && syscall < MAX_SYSCALL)
+        trap_counts[abi * MAX_SYSCALL + syscall].fetch_add(1, std::memory_order_relaxed);
+}
+
 void pt_process::set_callback(pt_handler_callback callback, void *context) {
     this->callback = callback;
     this->context = context;
@@ -58,13 +98,82 @@ int pt_process::set_handler(int abi, int syscall, int handler) {
     return 0;
 }
 
+void pt_process::set_handlers(const int *handlers, const int *fs_rules, const pt_arg_rule *const *arg_rules) {
+    memcpy(handler, handlers, sizeof handler);
+    memcpy(fs_rule, fs_rules, sizeof fs_rule);
+    this->arg_rules = arg_rules;
+}
+
+bool pt_process::check_arg_rule(const pt_arg_rule *rule) {
+    for (const pt_arg_condition &condition : rule->conditions) {
+        unsigned long value;
+        switch (condition.reg) {
+            case 0:
+                value = debugger->arg0();
+                break;
+            case 1:
+                value = debugger->arg1();
+                break;
+            case 2:
+                value = debugger->arg2();
+                break;
+            case 3:
+                value = debugger->arg3();
+                break;
+            case 4:
+                value = debugger->arg4();
+                break;
+            case 5:
+                value = debugger->arg5();
+                break;
+            default:
+                return false;
+        }
+        if (condition.match_pid && value == (unsigned long) pid)
+            continue;
+        if (std::find(condition.values.begin(), condition.values.end(), value) == condition.values.end())
+            return false;
+    }
+    return true;
+}
+
 int pt_process::dispatch(int event, unsigned long param) {
     if (event_proc != NULL)
         return event_proc(event_context, event, param);
     return -1;
 }
 
+#if !PTBOX_FREEBSD
+struct pt_spawn_args {
+    pt_fork_handler child;
+    void *context;
+    const sigset_t *mask;
+};
+
+static int pt_spawn_child(void *arg) {
+    pt_spawn_args *args = (pt_spawn_args *) arg;
+
+    // Like posix_spawn, reset the judge's handlers before unblocking signals, since they would run on its memory.
+    // Our handlers are our own copies, as the child doesn't share them (no CLONE_SIGHAND).
+    struct sigaction action;
+    for (int sig = 1; sig < _NSIG; ++sig) {
+        if (sig == SIGKILL || sig == SIGSTOP || sigaction(sig, NULL, &action))
+            continue;
+        if (action.sa_handler != SIG_DFL && action.sa_handler != SIG_IGN) {
+            memset(&action, 0, sizeof action);
+            action.sa_handler = SIG_DFL;
+            sigaction(sig, &action, NULL);
+        }
+    }
+    pthread_sigmask(SIG_SETMASK, args->mask, NULL);
+
+    setpgid(0, 0);
+    _exit(args->child(args->context));
+}
+#endif
+
 int pt_process::spawn(pt_fork_handler child, void *context) {
+#if PTBOX_FREEBSD
     pid_t pid = fork();
     if (pid == -1)
         return 1;
@@ -72,11 +181,57 @@ int pt_process::spawn(pt_fork_handler child, void *context) {
         setpgid(0, 0);
         _exit(child(context));
     }
+#else
+    // fork() copies the page tables of the whole judge, which takes longer the more memory it uses, only for the
+    // child to throw them away when it execs. Instead, the child shares our memory until then, on a stack of its
+    // own, so it must not allocate memory or return into anything of ours. CLONE_VFORK would suspend this thread,
+    // which has to attach to the child before it can exec.
+    if (!child_stack) {
+        child_stack =
+            mmap(NULL, PTBOX_SPAWN_STACK_SIZE, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS | MAP_STACK, -1, 0);
+        if (child_stack == MAP_FAILED) {
+            child_stack = NULL;
+            return 1;
+        }
+    }
+
+    // No signal handler of the judge may run in the child until it has reset them, so signals are blocked until
+    // then.
+    sigset_t all, mask;
+    sigfillset(&all);
+    pthread_sigmask(SIG_BLOCK, &all, &mask);
+
+    pt_spawn_args args = { child, context, &mask };
+    pid_t pid = clone(pt_spawn_child, (char *) child_stack + PTBOX_SPAWN_STACK_SIZE, CLONE_VM | SIGCHLD, &args);
+    if (pid == -1) {
+        pthread_sigmask(SIG_SETMASK, &mask, NULL);
+        free_child_stack();
+        return 1;
+    }
+
+    // The child reads args and runs on its stack until it stops for us to attach, so wait for that, leaving the
+    // stop to be picked up by monitor. With signals still blocked, this can't be interrupted.
+    //
+    // Without CLONE_SETTLS, the child keeps using this thread's TLS, including errno, until it execs, even after
+    // the stop, while this thread traces it. Its calls only write errno when they fail (e.g. closing a descriptor
+    // that isn't open), so a call of ours that fails at the same time may see the child's errno instead of its own.
+    // Giving the child a TLS of its own would depend on libc internals.
+    siginfo_t info;
+    waitid(P_PID, pid, &info, WSTOPPED | WEXITED | WNOWAIT | __WALL);
+    pthread_sigmask(SIG_SETMASK, &mask, NULL);
+#endif
     this->pid = pid;
     debugger->new_process();
     return 0;
 }
 
+void pt_process::free_child_stack() {
+    if (child_stack) {
+        munmap(child_stack, PTBOX_SPAWN_STACK_SIZE);
+        child_stack = NULL;
+    }
+}
+
 int pt_process::protection_fault(int syscall, int type) {
     dispatch(type, syscall);
     dispatch(PTBOX_EVENT_EXITING, PTBOX_EXIT_PROTECTION);
@@ -110,12 +265,18 @@ int pt_process::monitor() {
 
     while (true) {
         clock_gettime(CLOCK_MONOTONIC, &start);
+        if (!first) {
+            timespec_sub(&start, &end, &delta);
+            _stop_time += delta.tv_sec + delta.tv_nsec / 1000000000.0;
+        }
+        wait_start = start.tv_sec + start.tv_nsec / 1000000000.0;
 
         pid = wait4(-pgid, &status, __WALL, &_rusage);
 
         clock_gettime(CLOCK_MONOTONIC, &end);
         timespec_sub(&end, &start, &delta);
-        timespec_add(&exec_time, &delta, &exec_time);
+        wait_start = 0;
+        exec_time = exec_time + delta.tv_sec + delta.tv_nsec / 1000000000.0;
         int signal = 0;
         bool trap_next_syscall_event = _trace_syscalls && PTBOX_FREEBSD;
 
@@ -211,6 +372,12 @@ int pt_process::monitor() {
 
             // printf("%d: %s syscall %d\n", pid, in_syscall ? "Enter" : "Exit", syscall);
             if (!spawned) {
+                // The process only has the listener of a notifying filter until the first execve completes.
+                if (_use_seccomp_notify && notify_fd < 0 && in_syscall && !start_supervisor(pid)) {
+                    dispatch(PTBOX_EVENT_PTRACE_ERROR, errno);
+                    exit_reason = protection_fault(-1);
+                    continue;
+                }
                 if (debugger->is_end_of_first_execve()) {
                     spawned = this->_initialized = true;
                     dispatch(PTBOX_EVENT_INITIAL_EXEC, 0);
@@ -224,11 +391,20 @@ int pt_process::monitor() {
             }
 
             if (in_syscall) {
+                count_trap(debugger->abi(), syscall);
                 if (syscall >= 0 && syscall < MAX_SYSCALL) {
                     switch (handler[debugger->abi()][syscall]) {
                         case PTBOX_HANDLER_ALLOW:
                             break;
                         case PTBOX_HANDLER_CALLBACK:
+                            // Filesystem accesses that are certainly allowed don't need to call into Python, and
+                            // neither do calls whose arguments are. Anything else, including every denial, is left
+                            // to the callback.
+                            if (fs_rule[debugger->abi()][syscall] && check_fs_access(fs_rule[debugger->abi()][syscall]))
+                                break;
+                            if (arg_rules && arg_rules[debugger->abi() * MAX_SYSCALL + syscall] &&
+                                check_arg_rule(arg_rules[debugger->abi() * MAX_SYSCALL + syscall]))
+                                break;
                             if (callback(context, syscall))
                                 break;
                             // printf("Killed by callback: %d\n", syscall);
@@ -347,6 +523,24 @@ int pt_process::monitor() {
 #endif
     }
 
+#if !PTBOX_FREEBSD
+    // Reap everything this thread still traces, including children forked too late for us to hear about, or they
+    // would be stuck in the exit stop for as long as the thread lives. Only this thread's tracees are waited for,
+    // leaving processes traced by other threads alone.
+    int child_status;
+    while ((pid = wait4(-1, &child_status, __WALL | __WNOTHREAD, NULL)) > 0 || (pid < 0 && errno == EINTR)) {
+        if (pid > 0 && !WIFEXITED(child_status) && !WIFSIGNALED(child_status)) {
+            kill(pid, SIGKILL);
+            ptrace(PTRACE_CONT, pid, NULL, NULL);
+        }
+    }
+#endif
+
+    stop_supervisor();
+    free_child_stack();
+    if (notify_fault)
+        exit_reason = PTBOX_EXIT_PROTECTION;
+
     end_time = end;
     dispatch(PTBOX_EVENT_EXITED, exit_reason);
     return WIFEXITED(status) ? WEXITSTATUS(status) : -WTERMSIG(status);
@@ -0,0 +1,61 @@
+import threading
+from typing import Any, Dict, List
+
+
+class SyscallProfile:
+    """
+    Where a sandboxed process spent its time being traced: how often each system call trapped into the sandbox, how
+    long the handlers in Python took for each, and how long the process was stopped for us overall.
+    """
+
+    def __init__(self) -> None:
+        self.traps: Dict[str, int] = {}
+        self.handler_time: Dict[str, float] = {}
+        self.stop_time = 0.0
+        self.wall_time = 0.0
+        # Handlers run on the tracer thread, and on the supervisor thread for seccomp user notifications.
+        self._lock = threading.Lock()
+
+    def record_handler(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.handler_time[name] = self.handler_time.get(name, 0) + seconds
+
+    def record_traps(self, name: str, count: int) -> None:
+        self.traps[name] = self.traps.get(name, 0) + count
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        :return: the system calls that trapped the most, with how often they did and the time spent handling them in
+                 Python.
+        """
+        names = sorted(self.traps, key=lambda name: (-self.traps[name], name))[:limit]
+        return [
+            {
+                'syscall': name.replace('sys_', '', 1),
+                'count': self.traps[name],
+                'handler_time': self.handler_time.get(name, 0.0),
+            }
+            for name in names
+        ]
+
+    def summary(self, limit: int = 10) -> Dict[str, Any]:
+        return {
+            'traps': sum(self.traps.values()),
+            'wall_time': self.wall_time,
+            'stop_time': self.stop_time,
+            'handler_time': sum(self.handler_time.values()),
+            'top': self.top(limit),
+        }
+
+    def format(self, limit: int = 10) -> str:
+        summary = self.summary(limit)
+        top = ', '.join(
+            '%s x%d (%.3fs)' % (entry['syscall'], entry['count'], entry['handler_time']) for entry in summary['top']
+        )
+        return '%d traps, stopped for %.3fs of %.3fs, %.3fs in handlers; %s' % (
+            summary['traps'],
+            summary['stop_time'],
+            summary['wall_time'],
+            summary['handler_time'],
+            top or 'no traps',
+        )
@@ -1,15 +1,23 @@
 import errno
+import heapq
+import itertools
 import logging
 import os
+import queue
 import select
 import signal
 import subprocess
 import sys
 import threading
+import time
+import weakref
+from functools import lru_cache
 from typing import Callable, List, Mapping, Optional, Tuple, Type
 
 from dmoj.cptbox._cptbox import *
-from dmoj.cptbox.handlers import ALLOW, DISALLOW, ErrnoHandlerCallback, _CALLBACK
+from dmoj.cptbox.cgroup import Cgroup, prepare_cgroup
+from dmoj.cptbox.handlers import ALLOW, ArgumentRule, DISALLOW, ErrnoHandlerCallback, _CALLBACK
+from dmoj.cptbox.syscall_profile import SyscallProfile
 from dmoj.cptbox.syscalls import SYSCALL_COUNT, by_id, sys_execve, sys_exit, sys_exit_group, sys_getpid, translator
 from dmoj.utils.communicate import safe_communicate as _safe_communicate
 from dmoj.utils.os_ext import OOM_SCORE_ADJ_MAX, oom_score_adj
@@ -32,6 +40,23 @@ _SYSCALL_INDICIES[PTBOX_ABI_ARM] = 3
 _SYSCALL_INDICIES[PTBOX_ABI_FREEBSD_X64] = 4
 _SYSCALL_INDICIES[PTBOX_ABI_ARM64] = 5
 
+
+def _build_syscall_ids() -> List[List[Optional[int]]]:
+    # Maps the system call numbers of each supported ABI to their index in the translator. Where several calls
+    # share a number, the last one wins, as it does in the handler tables.
+    ids: List[List[Optional[int]]] = [[None] * MAX_SYSCALL_NUMBER for _ in range(PTBOX_ABI_COUNT)]
+    for abi in SUPPORTED_ABIS:
+        index = _SYSCALL_INDICIES[abi]
+        assert index is not None
+        for i in range(SYSCALL_COUNT):
+            for call in translator[i][index]:
+                if call is not None and call < MAX_SYSCALL_NUMBER:
+                    ids[abi][call] = i
+    return ids
+
+
+_SYSCALL_IDS = _build_syscall_ids()
+
 FREEBSD = sys.platform.startswith('freebsd')
 BAD_SECCOMP = sys.platform == 'linux' and tuple(map(int, os.uname().release.partition('-')[0].split('.'))) < (4, 8)
 
@@ -47,6 +72,74 @@ _address_bits = {
 HandlerCallback = Callable[[Debugger], bool]
 
 
+def _handler_kind(handler) -> int:
+    # Everything about a handler that the syscall table depends on: its code if it's not a callback, or the
+    # negated errno for callbacks that only fail the call, which seccomp can do without trapping.
+    if isinstance(handler, int):
+        return handler
+    if isinstance(handler, ErrnoHandlerCallback):
+        return -handler.errno
+    if not callable(handler):
+        raise ValueError('Handler not callable: ' + handler)
+    return _CALLBACK
+
+
+@lru_cache(maxsize=64)
+def _build_syscall_table(
+    kinds: Tuple[int, ...], rules: Tuple[int, ...], arg_rules: Tuple[Optional[ArgumentRule], ...], landlock: bool
+) -> SyscallTable:
+    handlers = [[DISALLOW] * MAX_SYSCALL_NUMBER for _ in range(PTBOX_ABI_COUNT)]
+    fs_rules = [[PTBOX_FS_CHECK_NONE] * MAX_SYSCALL_NUMBER for _ in range(PTBOX_ABI_COUNT)]
+    arg_rule_table: List[List[Optional[tuple]]] = [[None] * MAX_SYSCALL_NUMBER for _ in range(PTBOX_ABI_COUNT)]
+    for abi in SUPPORTED_ABIS:
+        index = _SYSCALL_INDICIES[abi]
+        assert index is not None
+        for i, kind in enumerate(kinds):
+            for call in translator[i][index]:
+                if call is not None and call < MAX_SYSCALL_NUMBER:
+                    handlers[abi][call] = _CALLBACK if kind < 0 else kind
+                    fs_rules[abi][call] = rules[i] if kind == _CALLBACK else PTBOX_FS_CHECK_NONE
+                    arg_rule = arg_rules[i]
+                    arg_rule_table[abi][call] = arg_rule.conditions if kind == _CALLBACK and arg_rule else None
+
+    seccomp_handlers = [-1] * MAX_SYSCALL_NUMBER
+    index = _SYSCALL_INDICIES[NATIVE_ABI]
+    assert index is not None
+    for i, kind in enumerate(kinds):
+        # Ensure at least one syscall traps, including the execve so we know the process started.
+        # Otherwise, a simple assembly program could terminate without ever trapping.
+        if i in (sys_execve, sys_exit, sys_exit_group):
+            continue
+        for call in translator[i][index]:
+            if call is None or call >= MAX_SYSCALL_NUMBER:
+                continue
+            if kind == ALLOW:
+                seccomp_handlers[call] = 0
+            elif kind < 0:
+                seccomp_handlers[call] = -kind
+            elif landlock and kind == _CALLBACK and rules[i] & 0xF == PTBOX_FS_CHECK_OPEN:
+                # Landlock checks these instead, see native_fs_rule for where the flags are.
+                seccomp_handlers[call] = PTBOX_SECCOMP_LANDLOCK_OPEN - ((rules[i] >> 12 & 0xF) - 1)
+    return SyscallTable(handlers, seccomp_handlers, fs_rules, arg_rule_table)
+
+
+def get_syscall_table(security, landlock: bool = False) -> SyscallTable:
+    """
+    Resolves a security profile into the handler of every system call, the native filesystem access checks and
+    argument rules for the calls that have them (see IsolateTracer), and the seccomp filter to spawn processes with.
+    These only depend on which kind of handler each call has, so profiles that only differ in their callbacks, like
+    those of every launch of the same executor, share a table that is built once.
+    :param landlock: whether processes are restricted with the profile's Landlock rules, in which case opening files
+                     doesn't trap.
+    """
+    native_fs_rules = getattr(security, 'native_fs_rules', {})
+    native_arg_rules = getattr(security, 'native_arg_rules', {})
+    kinds = tuple(_handler_kind(security.get(i, DISALLOW)) for i in range(SYSCALL_COUNT))
+    rules = tuple(native_fs_rules.get(i, PTBOX_FS_CHECK_NONE) for i in range(SYSCALL_COUNT))
+    arg_rules = tuple(native_arg_rules.get(i) for i in range(SYSCALL_COUNT))
+    return _build_syscall_table(kinds, rules, arg_rules, landlock)
+
+
 class MaxLengthExceeded(ValueError):
     pass
 
@@ -69,25 +162,195 @@ class AdvancedDebugger(Debugger):
         return translator[sys_getpid][_SYSCALL_INDICIES[self.abi]][0]
 
     def get_syscall_name(self, syscall):
-        if self.abi == PTBOX_ABI_INVALID:
-            return 'failed to read registers'
-        callname = 'unknown'
-        index = _SYSCALL_INDICIES[self.abi]
-        for id, call in enumerate(translator):
-            if syscall in call[index]:
-                callname = by_id[id]
-                break
-        return callname
+        return _get_syscall_name(self.abi, syscall)
 
     def readstr(self, address, max_size=4096):
         if self.address_bits == 32:
             address &= 0xFFFFFFFF
-        read = super().readstr(address, max_size + 1)
-        if read is None:
-            return None
-        if len(read) > max_size:
-            raise MaxLengthExceeded(read)
-        return utf8text(read)
+        return _decode_str(super().readstr(address, max_size + 1), max_size)
+
+
+def _get_syscall_name(abi, syscall):
+    if abi == PTBOX_ABI_INVALID:
+        return 'failed to read registers'
+    callname = 'unknown'
+    index = _SYSCALL_INDICIES[abi]
+    for id, call in enumerate(translator):
+        if syscall in call[index]:
+            callname = by_id[id]
+            break
+    return callname
+
+
+def _decode_str(read: Optional[bytes], max_size: int) -> Optional[str]:
+    if read is None:
+        return None
+    if len(read) > max_size:
+        raise MaxLengthExceeded(read)
+    return utf8text(read)
+
+
+def _notification_arg(index: int, signed: bool) -> property:
+    def getter(self: 'NotificationDebugger') -> int:
+        value = self.notification.args[index]
+        return value - (1 << 64) if signed and value >= 1 << 63 else value
+
+    return property(getter)
+
+
+class NotificationDebugger:
+    # Stands in for AdvancedDebugger when handling a system call sent to the supervisor. The process keeps running
+    # other threads meanwhile, and nothing can be changed but the result of the call: either it goes ahead as is,
+    # or it fails with an errno, in which case handlers must set syscall to -1 and errno in on_return, like
+    # ErrnoHandlerCallback does.
+
+    def __init__(self, process: 'TracedPopen', notification: SeccompNotification) -> None:
+        self.notification = notification
+        self.pid = process.pid
+        self.tid = notification.tid
+        self.abi = notification.abi
+        self.syscall = notification.syscall
+        self.errno = 0
+        self._on_return: Optional[Callable[[], None]] = None
+
+    arg0 = _notification_arg(0, True)
+    arg1 = _notification_arg(1, True)
+    arg2 = _notification_arg(2, True)
+    arg3 = _notification_arg(3, True)
+    arg4 = _notification_arg(4, True)
+    arg5 = _notification_arg(5, True)
+    uarg0 = _notification_arg(0, False)
+    uarg1 = _notification_arg(1, False)
+    uarg2 = _notification_arg(2, False)
+    uarg3 = _notification_arg(3, False)
+    uarg4 = _notification_arg(4, False)
+    uarg5 = _notification_arg(5, False)
+
+    @property
+    def syscall_name(self) -> str:
+        return self.get_syscall_name(self.syscall)
+
+    @property
+    def address_bits(self) -> Optional[int]:
+        return _address_bits.get(self.abi)
+
+    def get_syscall_name(self, syscall: int) -> str:
+        return _get_syscall_name(self.abi, syscall)
+
+    def readstr(self, address: int, max_size: int = 4096) -> Optional[str]:
+        if self.address_bits == 32:
+            address &= 0xFFFFFFFF
+        return _decode_str(self.notification.readstr(address, max_size + 1), max_size)
+
+    def on_return(self, callback: Callable[[], None]) -> None:
+        self._on_return = callback
+
+    def get_result(self) -> int:
+        """
+        :return: 0 to let the call go ahead, an errno to fail it with, or -1 if what the handler asked for can't be
+                 done with a seccomp user notification.
+        """
+        if self.syscall == self.notification.syscall:
+            return 0 if self._on_return is None else -1
+        if self.syscall != -1:
+            return -1
+        if self._on_return is not None:
+            self._on_return()
+        return self.errno if self.errno > 0 else errno.ENOSYS
+
+
+class TimeLimitSupervisor:
+    """
+    Kills processes once they run out of time. A single thread keeps a deadline for every live process, and wakes
+    up when the earliest of them is reached, instead of every process having a thread that polls it.
+    """
+
+    # Shortest time between checks of a process that is about to run out of time.
+    MIN_INTERVAL = 0.001
+
+    def __init__(self) -> None:
+        self._reset()
+        # The judge forks its workers, which have none of our threads and none of our processes to supervise.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._deadlines: List[Tuple[float, int, 'weakref.ReferenceType[TracedPopen]']] = []
+        self._counter = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, process: 'TracedPopen') -> None:
+        with self._cond:
+            self._schedule(process)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._supervise, name='cptbox-supervisor', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _schedule(self, process: 'TracedPopen') -> None:
+        # Neither clock can run faster than real time, so the process is checked again when it could first have run
+        # out of time.
+        deadline = time.monotonic() + max(process._get_time_left(), self.MIN_INTERVAL)
+        heapq.heappush(self._deadlines, (deadline, next(self._counter), weakref.ref(process)))
+
+    def _supervise(self) -> None:
+        while True:
+            with self._cond:
+                while not self._deadlines or self._deadlines[0][0] > time.monotonic():
+                    self._cond.wait(self._deadlines[0][0] - time.monotonic() if self._deadlines else None)
+                _, _, ref = heapq.heappop(self._deadlines)
+
+            process = ref()
+            if process is None or process._died.is_set():
+                continue
+            if process._get_time_left() < 0:
+                log.warning('Shocker activated and killed %d', process.pid)
+                process.kill()
+                process._is_tle = True
+            else:
+                with self._cond:
+                    self._schedule(process)
+
+
+_supervisor = TimeLimitSupervisor()
+
+
+class TracerThreads:
+    """
+    Threads that spawn and trace processes. A process can only be traced by the thread that spawned it, so it takes
+    a thread for as long as it runs, but threads are reused for later processes instead of being started for each.
+    """
+
+    def __init__(self) -> None:
+        self._reset()
+        # Idle threads aren't forked along with us, so jobs left for them would never run.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: 'queue.SimpleQueue[Callable[[], object]]' = queue.SimpleQueue()
+        self._idle = 0
+
+    def run(self, job: Callable[[], object]) -> None:
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+                self._jobs.put(job)
+                return
+        threading.Thread(target=self._work, args=(job,), name='cptbox-tracer', daemon=True).start()
+
+    def _work(self, job: Callable[[], object]) -> None:
+        while True:
+            try:
+                job()
+            except Exception:
+                log.exception('Unhandled exception while tracing process')
+            with self._lock:
+                self._idle += 1
+            job = self._jobs.get()
+
+
+_tracer_threads = TracerThreads()
 
 
 class TracedPopen(Process):
@@ -120,6 +383,10 @@ class TracedPopen(Process):
         cwd: bytes = b'',
         wall_time: Optional[float] = None,
         cpu_affinity: Optional[List[int]] = None,
+        seccomp_notify: bool = True,
+        landlock: bool = False,
+        cgroup: Optional[str] = None,
+        profile: bool = False,
     ) -> None:
         self._executable = executable
 
@@ -147,6 +414,20 @@ class TracedPopen(Process):
             for cpu in cpu_affinity:
                 self._cpu_affinity_mask |= 1 << cpu
 
+        # The process tree runs in a cgroup of its own in the delegated one, if given, for exact accounting.
+        self._cgroup: Optional[Cgroup] = None
+        self._cgroup_stats: Optional[Tuple[Optional[int], Optional[float], bool]] = None
+        if cgroup and prepare_cgroup(cgroup):
+            try:
+                self._cgroup = Cgroup(cgroup)
+            except OSError as e:
+                log.warning('Failed to create cgroup in %s: %s', cgroup, e.strerror)
+            else:
+                self._cgroup_fd = self._cgroup.procs_fd
+                self._cgroup_cpus = len(cpu_affinity) if cpu_affinity else len(os.sched_getaffinity(0))
+                if self._child_memory:
+                    self._cgroup.set_memory_limit(self._child_memory)
+
         self._is_tle = False
         self._is_ole = False
         self.__init_streams(stdin, stdout, stderr, child_stdin, child_stdout)
@@ -154,62 +435,46 @@ class TracedPopen(Process):
         self.protection_fault = None
 
         self._security = security
-        self._callbacks = [[None] * MAX_SYSCALL_NUMBER for _ in range(PTBOX_ABI_COUNT)]
         if security is None:
             self._trace_syscalls = False
-        else:
-            for abi in SUPPORTED_ABIS:
-                index = _SYSCALL_INDICIES[abi]
-                assert index is not None
-                for i in range(SYSCALL_COUNT):
-                    for call in translator[i][index]:
-                        if call is None:
-                            continue
-                        handler = security.get(i, DISALLOW)
-                        if not isinstance(handler, int):
-                            if not callable(handler):
-                                raise ValueError('Handler not callable: ' + handler)
-                            self._callbacks[abi][call] = handler
-                            handler = _CALLBACK
-                        self._handler(abi, call, handler)
+        # Only IsolateTracer has filesystem policies that Landlock can enforce.
+        landlock_rules = (
+            security.get_landlock_rules()
+            if landlock and LANDLOCK_SUPPORTED and hasattr(security, 'get_landlock_rules')
+            else None
+        )
+        if landlock_rules is not None:
+            self._set_landlock_rules([(utf8bytes(path), access) for path, access in landlock_rules])
+        self._set_syscall_table(
+            get_syscall_table(security if security is not None else {}, landlock=landlock_rules is not None)
+        )
+        # Only IsolateTracer has filesystem policies that can be checked natively.
+        fs_policies = security.get_native_fs_policies() if hasattr(security, 'get_native_fs_policies') else None
+        if fs_policies is not None:
+            self._set_fs_policies(*fs_policies)
+        # Filesystem access checks are done by a supervisor thread instead of through ptrace when possible.
+        self._use_seccomp_notify = seccomp_notify
+        # Counts trapped system calls and times their handlers, to find out why a process is slow in the sandbox.
+        self.profile: Optional[SyscallProfile] = None
+        if profile:
+            self.profile = SyscallProfile()
+            self._profile_traps()
 
         self._died = threading.Event()
         self._spawned_or_errored = threading.Event()
         self._spawn_error = None
 
-        if time:
-            # Spawn thread to kill process after it times out
-            self._shocker = threading.Thread(target=self._shocker_thread)
-            self._shocker.start()
-        self._worker = threading.Thread(target=self._run_process)
-        self._worker.start()
+        _tracer_threads.run(self._run_process)
 
         self._spawned_or_errored.wait()
         if self._spawn_error:
             raise self._spawn_error
+        if time:
+            _supervisor.watch(self)
 
     def create_debugger(self) -> AdvancedDebugger:
         return AdvancedDebugger(self)
 
-    def _get_seccomp_handlers(self) -> List[int]:
-        handlers = [-1] * MAX_SYSCALL_NUMBER
-        index = _SYSCALL_INDICIES[NATIVE_ABI]
-        assert index is not None
-        for i in range(SYSCALL_COUNT):
-            # Ensure at least one syscall traps, including the execve so we know the process started.
-            # Otherwise, a simple assembly program could terminate without ever trapping.
-            if i in (sys_execve, sys_exit, sys_exit_group):
-                continue
-            handler = self._security.get(i, DISALLOW)
-            for call in translator[i][index]:
-                if call is None:
-                    continue
-                if isinstance(handler, int) and handler == ALLOW:
-                    handlers[call] = 0
-                elif isinstance(handler, ErrnoHandlerCallback):
-                    handlers[call] = handler.errno
-        return handlers
-
     def wait(self) -> int:
         self._died.wait()
         assert self.returncode is not None
@@ -228,6 +493,10 @@ class TracedPopen(Process):
                 raise RuntimeError('failed to spawn child')
             elif self.returncode == PTBOX_SPAWN_FAIL_SETAFFINITY:
                 raise RuntimeError('failed to set child affinity')
+            elif self.returncode == PTBOX_SPAWN_FAIL_LANDLOCK:
+                raise RuntimeError('failed to set up Landlock ruleset')
+            elif self.returncode == PTBOX_SPAWN_FAIL_CGROUP:
+                raise RuntimeError('failed to move child into its cgroup')
             elif self.returncode >= 0:
                 raise RuntimeError('process failed to initialize with unknown exit code: %d' % self.returncode)
         return self.returncode
@@ -245,7 +514,7 @@ class TracedPopen(Process):
 
     @property
     def is_mle(self) -> bool:
-        return self._memory != 0 and self.max_memory > self._memory
+        return self._memory != 0 and (self.max_memory > self._memory or self._get_cgroup_stats()[2])
 
     @property
     def is_ole(self) -> bool:
@@ -259,12 +528,34 @@ class TracedPopen(Process):
     def is_tle(self) -> bool:
         return self._is_tle
 
+    @property
+    def execution_time(self) -> float:
+        # The CPU time of every process in the tree, rather than the time the process spent running between traps.
+        cpu_usage = self._get_cgroup_stats()[1]
+        return cpu_usage if cpu_usage is not None else super().execution_time
+
+    @property
+    def max_memory(self) -> int:
+        memory_peak = self._get_cgroup_stats()[0]
+        return memory_peak // 1024 if memory_peak is not None else super().max_memory
+
+    def _get_cgroup_stats(self) -> Tuple[Optional[int], Optional[float], bool]:
+        if self._cgroup_stats is not None:
+            return self._cgroup_stats
+        if self._cgroup is None:
+            return None, None, False
+        return self._cgroup.memory_peak, self._cgroup.cpu_usage, self._cgroup.oom_killed
+
     def kill(self) -> None:
         # FIXME(quantum): this is actually a race. The process may exit before we kill it.
         # Under very unlikely circumstances, the pid could be reused and we will end up
         # killing the wrong process.
         if self.returncode is None:
             log.warning('Request the killing of process: %s', self.pid)
+            if self._cgroup is not None:
+                # Also kills processes that left the process group.
+                self._cgroup.kill()
+                return
             try:
                 os.killpg(self.pid, signal.SIGKILL)
             except OSError:
@@ -275,21 +566,50 @@ class TracedPopen(Process):
             log.warning('Skipping the killing of process because it already exited: %s', self.pid)
 
     def _callback(self, syscall) -> bool:
-        if self.debugger.abi == PTBOX_ABI_INVALID:
+        return self._handle_syscall(self.debugger, syscall)
+
+    def _notify_callback(self, notification: SeccompNotification) -> int:
+        debugger = NotificationDebugger(self, notification)
+        result = -1
+        try:
+            if self._handle_syscall(debugger, notification.syscall):
+                result = debugger.get_result()
+        finally:
+            # The process is killed, as it would have been by the tracer.
+            if result < 0:
+                self.protection_fault = (
+                    notification.syscall,
+                    debugger.get_syscall_name(notification.syscall),
+                    list(notification.args),
+                    None,
+                )
+        return result
+
+    def _handle_syscall(self, debugger, syscall: int) -> bool:
+        if debugger.abi == PTBOX_ABI_INVALID:
             log.warning('Received invalid ABI when handling syscall %d', syscall)
             return False
 
         try:
-            callback = self._callbacks[self.debugger.abi][syscall]
+            id = _SYSCALL_IDS[debugger.abi][syscall]
         except IndexError:
-            if self.debugger.abi == PTBOX_ABI_ARM:
+            if debugger.abi == PTBOX_ABI_ARM:
                 # ARM-specific
                 return 0xF0000 < syscall < 0xF0006
             return False
 
-        if callback is not None:
-            return callback(self.debugger)
-        return False
+        # Only calls whose handler is a callback trap into here.
+        callback = self._security.get(id) if id is not None and self._security is not None else None
+        if not callable(callback):
+            return False
+        if self.profile is None:
+            return callback(debugger)
+
+        start = time.perf_counter()
+        try:
+            return callback(debugger)
+        finally:
+            self.profile.record_handler(debugger.get_syscall_name(syscall), time.perf_counter() - start)
 
     def _protection_fault(self, syscall: int, is_update: bool) -> None:
         # When signed, 0xFFFFFFFF is equal to -1, meaning that ptrace failed to read the syscall for some reason.
@@ -330,6 +650,7 @@ class TracedPopen(Process):
             self._spawn(self._executable, self._args, self._env, self._chdir)
         except:  # noqa: E722, need to catch absolutely everything
             self._spawn_error = sys.exc_info()[0]
+            self._remove_cgroup()
             self._died.set()
             return None
         finally:
@@ -361,32 +682,42 @@ class TracedPopen(Process):
         # TODO(tbrindus): this code should be the same as [self.returncode], so it shouldn't be duplicated
         code = self._monitor()
 
+        if self._cgroup is not None:
+            # Anything the process left behind dies with it, and the cgroup is gone once we are done with it.
+            self._cgroup.kill()
+            self._cgroup_stats = self._get_cgroup_stats()
+
         if self._time and self.execution_time > self._time:
             self._is_tle = True
+        if self.profile is not None:
+            self._finish_profile()
         self._died.set()
+        self._remove_cgroup()
 
         return code
 
-    def _shocker_thread(self) -> None:
-        # On Linux, ignored signals still cause a notification under ptrace.
-        # Hence, we use SIGWINCH, harmless and ignored signal to make wait4 return
-        # pt_process::monitor, causing time to be updated.
-        # On FreeBSD, a signal must not be ignored in order for wait4 to return.
-        # Hence, we swallow SIGSTOP, which should never be used anyway, and use it
-        # force an update.
-        wake_signal = signal.SIGSTOP if FREEBSD else signal.SIGWINCH
-        self._spawned_or_errored.wait()
-
-        while not self._died.wait(1):
-            if self.execution_time > self._time or self.wall_clock_time > self._wall_time:
-                log.warning('Shocker activated and killed %d', self.pid)
-                self.kill()
-                self._is_tle = True
-                break
-            try:
-                os.killpg(self.pid, wake_signal)
-            except OSError:
-                pass
+    def _finish_profile(self) -> None:
+        assert self.profile is not None
+        for abi, syscall, count in self._get_trap_counts():
+            self.profile.record_traps(_get_syscall_name(abi, syscall), count)
+        self.profile.stop_time = self._stop_time
+        self.profile.wall_time = self.wall_clock_time
+        log.info('Syscall profile of process %d: %s', self.pid, self.profile.format())
+
+    def _remove_cgroup(self) -> None:
+        if self._cgroup is not None:
+            self._cgroup.close()
+
+    def _get_time_left(self) -> float:
+        """
+        :return: how long the process can keep running for before it could run out of time, which is negative once
+                 it has.
+        """
+        cpu_time_left = self._time - self.execution_time
+        if self._cgroup is not None:
+            # The CPU time of a tree grows with every CPU it runs on at once.
+            cpu_time_left /= self._cgroup_cpus
+        return min(cpu_time_left, self._wall_time - self.wall_clock_time)
 
     def _get_devnull(self):
         if not hasattr(self, '_devnull'):
@@ -7,6 +7,7 @@ from dmoj.executors.compiled_executor import CompiledExecutor
 class Executor(CompiledExecutor):
     ext = 'a'
     command = 'a68g'
+    binary_cacheable = False
 
     test_program = """
 BEGIN
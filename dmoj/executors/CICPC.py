@@ -8,6 +8,7 @@ class Executor(GCCMixin, CExecutor):
     std = 'gnu11'
     command_paths = ['gcc']
 
+    supports_object_sources = False
     test_program = """
 #include <stdio.h>
 
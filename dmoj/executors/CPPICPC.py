@@ -7,6 +7,7 @@ class Executor(GCCMixin, CPPExecutor):
     command = 'g++'
     command_paths = ['g++-11', 'g++']
     std = 'gnu++20'
+    supports_object_sources = False
     test_program = """
 #include <iostream>
 
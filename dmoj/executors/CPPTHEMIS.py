@@ -7,6 +7,7 @@ class Executor(GCCMixin, CPPExecutor):
     command = 'g++-themis'
     command_paths = ['g++-8', 'g++']
     std = 'c++14'
+    supports_object_sources = False
     test_program = """
 #include <iostream>
 
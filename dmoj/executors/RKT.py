@@ -11,6 +11,7 @@ class Executor(CompiledExecutor):
     compiler_time_limit = 20
 
     command = 'racket'
+    binary_cacheable = False
 
     # Racket SIGABRTs under low-memory conditions before actually crossing the memory limit,
     # so give it a bit of headroom to be properly marked as MLE.
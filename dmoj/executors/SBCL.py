@@ -12,6 +12,7 @@ from dmoj.executors.mixins import NullStdoutMixin
 class Executor(NullStdoutMixin, CompiledExecutor):
     ext = 'cl'
     command = 'sbcl'
+    binary_cacheable = False
     syscalls = ['personality']
     test_program = '(write-line (read-line))'
     address_grace = 524288
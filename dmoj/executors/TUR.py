@@ -9,6 +9,7 @@ from dmoj.judgeenv import env
 class Executor(CompiledExecutor):
     ext = 't'
     command = 'tprolog'
+    binary_cacheable = False
     test_program = """\
 var echo : string
 get echo : *
@@ -1,4 +1,5 @@
 import errno
+import filecmp
 import os
 import re
 import shutil
@@ -6,11 +7,18 @@ import subprocess
 import sys
 import tempfile
 import traceback
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type, Union
 
 from dmoj.config import ConfigNode
 from dmoj.cptbox import FILE_IO_PIPE, IsolateTracer, TracedPopen, syscalls
-from dmoj.cptbox.filesystem_policies import ExactDir, ExactFile, FilesystemAccessRule, RecursiveDir
+from dmoj.cptbox.filesystem_policies import (
+    CombinedFilesystemPolicy,
+    ExactDir,
+    ExactFile,
+    FilesystemAccessRule,
+    FilesystemPolicy,
+    RecursiveDir,
+)
 from dmoj.cptbox.handlers import ALLOW
 from dmoj.cptbox.utils import MmapableIO
 from dmoj.error import InternalError
@@ -98,6 +106,30 @@ else:
 
 UTF8_LOCALE = 'C.UTF-8'
 
+
+class LaunchTemplate(NamedTuple):
+    read_fs_jail: FilesystemPolicy
+    write_fs_jail: FilesystemPolicy
+    syscalls: Dict[int, Any]
+    agent: str
+    env: Dict[str, str]
+
+
+def install_agent(path: str) -> None:
+    # Cached executor directories are shared between processes, which may be launching from them at this very
+    # moment, so never rewrite an agent in place.
+    if os.path.isfile(path) and filecmp.cmp(path, setbufsize_path, shallow=False):
+        return
+    fd, temp_path = tempfile.mkstemp(prefix='.setbufsize.', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        shutil.copyfile(setbufsize_path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
 if sys.platform.startswith('freebsd') and sys.platform < 'freebsd13':
     UTF8_LOCALE = 'en_US.UTF-8'
 
@@ -132,6 +164,7 @@ class BaseExecutor(metaclass=ExecutorMeta):
     syscalls: List[Union[str, Tuple[str, Any]]] = []
 
     _dir: Optional[str] = None
+    _launch_template: Optional[LaunchTemplate] = None
 
     def __init__(
         self,
@@ -205,6 +238,8 @@ class BaseExecutor(metaclass=ExecutorMeta):
         result.execution_time = process.execution_time or 0.0
         result.wall_clock_time = process.wall_clock_time or 0.0
         result.context_switches = process.context_switches or (0, 0)
+        if process.profile is not None:
+            result.syscall_profile = process.profile.summary()
         result.runtime_version = ', '.join(
             f'{runtime} {".".join(map(str, version))}' for runtime, version in self.get_runtime_versions()
         )
@@ -235,18 +270,43 @@ class BaseExecutor(metaclass=ExecutorMeta):
             sec[getattr(syscalls, f'sys_{name}')] = handler
         return sec
 
+    def get_launch_template(self) -> LaunchTemplate:
+        """
+        Computes the parts of launching this executor that are the same for every launch: filesystem policies
+        (whose rules are resolved against the filesystem), syscall handlers, the setbufsize agent and the
+        environment. Executors don't change once compiled, so this is only done on the first launch.
+        """
+        if self._launch_template is None:
+            syscall_handlers = {}
+            for item in self.get_allowed_syscalls():
+                name, handler = item if isinstance(item, tuple) else (item, ALLOW)
+                syscall_handlers[getattr(syscalls, f'sys_{name}')] = handler
+
+            agent = self._file('setbufsize.so')
+            install_agent(agent)
+            self._launch_template = LaunchTemplate(
+                read_fs_jail=FilesystemPolicy(self.get_fs()),
+                write_fs_jail=FilesystemPolicy(self.get_write_fs()),
+                syscalls=syscall_handlers,
+                agent=agent,
+                env=self.get_env(),
+            )
+        return self._launch_template
+
     def get_security(self, launch_kwargs=None, extra_fs=None) -> IsolateTracer:
         launch_kwargs = {} if launch_kwargs is None else launch_kwargs
-        read_fs = self.get_fs()
+        template = self.get_launch_template()
+        read_fs_jail = template.read_fs_jail
         if extra_fs:
-            read_fs += extra_fs
+            read_fs_jail = CombinedFilesystemPolicy([read_fs_jail, FilesystemPolicy(extra_fs)])
         sec = IsolateTracer(
-            read_fs=read_fs,
-            write_fs=self.get_write_fs(),
+            read_fs=read_fs_jail,
+            write_fs=template.write_fs_jail,
             path_case_fixes=launch_kwargs.get('path_case_fixes', []),
             path_whitelist=launch_kwargs.get('path_whitelist', []),
         )
-        return self._add_syscalls(sec, self.get_allowed_syscalls())
+        sec.update(template.syscalls)
+        return sec
 
     def get_fs(self) -> List[FilesystemAccessRule]:
         assert self._dir is not None
@@ -334,17 +394,16 @@ class BaseExecutor(metaclass=ExecutorMeta):
             src = os.path.abspath(os.path.join(self._dir, src))
             create_symlink(dst, src)
 
-        agent = self._file('setbufsize.so')
-        shutil.copyfile(setbufsize_path, agent)
+        template = self.get_launch_template()
         child_env = {
             # Forward LD_LIBRARY_PATH for systems (e.g. Android Termux) that require
             # it to find shared libraries
             'LD_LIBRARY_PATH': os.environ.get('LD_LIBRARY_PATH', ''),
-            'LD_PRELOAD': agent,
+            'LD_PRELOAD': template.agent,
             'CPTBOX_STDOUT_BUFFER_SIZE': kwargs.get('stdout_buffer_size'),
             'CPTBOX_STDERR_BUFFER_SIZE': kwargs.get('stderr_buffer_size'),
         }
-        child_env.update(self.get_env())
+        child_env.update(template.env)
 
         executable = self.get_executable()
         assert executable is not None
@@ -368,6 +427,9 @@ class BaseExecutor(metaclass=ExecutorMeta):
             nproc=self.get_nproc(),
             fsize=self.fsize,
             cpu_affinity=env.submission_cpu_affinity,
+            landlock=env.landlock,
+            cgroup=env.cgroup,
+            profile=env.profile_syscalls,
         )
 
     @classmethod
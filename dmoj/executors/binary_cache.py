@@ -0,0 +1,362 @@
+import base64
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from stat import S_ISDIR
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'index.lock'
+
+# Entries used more recently than this are never evicted, since another process may be about to launch them.
+EVICTION_GRACE_PERIOD = 60
+# Directories not in the index are removed once they are this old, which is far longer than any compile takes.
+ORPHAN_GRACE_PERIOD = 3600
+# Hits only rewrite the index to mark an entry used once it was last marked this long ago, which still keeps it within
+# the eviction grace period.
+LAST_USED_RESOLUTION = EVICTION_GRACE_PERIOD / 2
+
+
+class CacheEntry(NamedTuple):
+    executable: str
+    dir: str
+    warning: Optional[bytes] = None
+
+
+def _directory_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _file_digest(path: str) -> Optional[str]:
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1048576), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stat_fields(path: str) -> Dict[str, int]:
+    stat = os.stat(path)
+    return {'executable_size': stat.st_size, 'executable_mtime': stat.st_mtime_ns, 'executable_ino': stat.st_ino}
+
+
+def _is_private_dir(path: str) -> bool:
+    stat = os.lstat(path)
+    return S_ISDIR(stat.st_mode) and stat.st_uid == os.geteuid() and not stat.st_mode & 0o022
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _link_tree(src: str, dst: str) -> None:
+    # Like shutil.copytree(symlinks=True, copy_function=_link_or_copy), but into an existing directory, which it only
+    # supports from Python 3.8.
+    for root, dirs, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirs + files:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), os.path.join(target, name))
+            elif name in dirs:
+                os.mkdir(os.path.join(target, name))
+            else:
+                _link_or_copy(path, os.path.join(target, name))
+
+
+def _encode_warning(warning: Optional[bytes]) -> Optional[str]:
+    return None if warning is None else base64.b64encode(warning).decode('ascii')
+
+
+def _decode_warning(warning: Optional[str]) -> Optional[bytes]:
+    return None if warning is None else base64.b64decode(warning)
+
+
+def _remove_tree(path: str) -> None:
+    try:
+        shutil.rmtree(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            logger.warning('Failed to remove cached binary directory %s', path, exc_info=True)
+
+
+class CompiledBinaryCache:
+    """
+    A bounded LRU cache of compiled executor directories, shared by every process using the same root.
+
+    Each entry is a directory created by an executor under the cache root, along with the path of its executable.
+    The index lives in a JSON file that is only replaced (atomically) while holding an exclusive lock on a separate
+    lock file, so concurrent judges and workers never see it half-written. Hits only take a shared lock and check the
+    executable's stat, and counts of hits and misses are kept until the index is next written. A crash can at worst
+    leave a directory that is not in the index, which is cleaned up later.
+    """
+
+    def __init__(self, root: str, max_entries: Optional[int] = 100, max_bytes: Optional[int] = None) -> None:
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, INDEX_FILE)
+        self.lock_path = os.path.join(root, LOCK_FILE)
+        self._pending_stats = {'hits': 0, 'misses': 0}
+        os.makedirs(root, mode=0o700, exist_ok=True)
+        # Anything in the index is launched, so the root must not be one that someone else created or can write to.
+        if not _is_private_dir(root):
+            raise PermissionError(errno.EPERM, 'Not a directory private to the judge', root)
+
+    @contextmanager
+    def _locked_index(self, write: bool = True) -> Iterator[Dict[str, Any]]:
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+            try:
+                index = self._read_index()
+                yield index
+                if write:
+                    for name, count in self._pending_stats.items():
+                        index['stats'][name] += count
+                    self._write_index(index)
+                    self._pending_stats = dict.fromkeys(self._pending_stats, 0)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError):
+            logger.warning('Discarding corrupt compiled binary cache index: %s', self.index_path)
+        return {'version': INDEX_VERSION, 'entries': {}, 'stats': {'hits': 0, 'misses': 0, 'evictions': 0}}
+
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        fd, temp_path = tempfile.mkstemp(prefix='.index.', dir=self.root)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f)
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @staticmethod
+    def _stat_matches(entry: Dict[str, Any]) -> bool:
+        try:
+            fields = _stat_fields(entry['executable'])
+        except OSError:
+            return False
+        return all(entry[name] == value for name, value in fields.items())
+
+    def _is_intact(self, entry: Dict[str, Any]) -> bool:
+        """
+        Checks an entry's executable by its stat, and only hashes it if that changed. The entry is updated with the
+        new stat if the executable is still the same, so must be written back to the index.
+        """
+        if self._stat_matches(entry):
+            return True
+        if not os.path.isdir(entry['dir']) or _file_digest(entry['executable']) != entry['digest']:
+            return False
+        entry.update(_stat_fields(entry['executable']))
+        return True
+
+    @staticmethod
+    def _to_cache_entry(entry: Dict[str, Any]) -> CacheEntry:
+        return CacheEntry(entry['executable'], entry['dir'], _decode_warning(entry.get('warning')))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._locked_index(write=False) as index:
+            entry = index['entries'].get(key)
+            if entry is None:
+                self._pending_stats['misses'] += 1
+                return None
+            if self._stat_matches(entry) and time.time() - entry['last_used'] < LAST_USED_RESOLUTION:
+                self._pending_stats['hits'] += 1
+                return self._to_cache_entry(entry)
+
+        with self._locked_index() as index:
+            entry = index['entries'].get(key)
+            if entry is not None and not self._is_intact(entry):
+                logger.warning('Cached binary for %s failed integrity check, recompiling', key)
+                del index['entries'][key]
+                _remove_tree(entry['dir'])
+                entry = None
+
+            if entry is None:
+                self._pending_stats['misses'] += 1
+                return None
+
+            self._pending_stats['hits'] += 1
+            entry['last_used'] = time.time()
+            return self._to_cache_entry(entry)
+
+    def put(self, key: str, executable: str, dir: str, warning: Optional[bytes] = None) -> CacheEntry:
+        """
+        Adds a freshly compiled directory to the cache, evicting the least recently used entries if over capacity.
+        :return: the entry to use, which is an existing one if another process cached the same key meanwhile; in
+            that case, dir is removed.
+        """
+        entry = {
+            'executable': executable,
+            'dir': dir,
+            'size': _directory_size(dir),
+            **_stat_fields(executable),
+            'digest': _file_digest(executable),
+            'warning': _encode_warning(warning),
+            'last_used': time.time(),
+        }
+
+        with self._locked_index() as index:
+            existing = index['entries'].get(key)
+            if existing is not None and existing['dir'] != dir and self._is_intact(existing):
+                _remove_tree(dir)
+                existing['last_used'] = time.time()
+                return self._to_cache_entry(existing)
+
+            index['entries'][key] = entry
+            self._evict(index, keep=key)
+            return CacheEntry(executable, dir, warning)
+
+    @staticmethod
+    def checkout(entry: CacheEntry, tempdir: Optional[str] = None) -> CacheEntry:
+        """
+        Makes a private working copy of an entry, hard-linking files where possible. Launching an executor writes
+        into its directory (file IO symlinks, the setbufsize agent), so entries that may be run by several
+        submissions at once must not be used in place.
+        """
+        dir = tempfile.mkdtemp(dir=tempdir)
+        try:
+            _link_tree(entry.dir, dir)
+        except BaseException:
+            _remove_tree(dir)
+            raise
+        executable = os.path.join(dir, os.path.relpath(entry.executable, entry.dir))
+        return CacheEntry(executable, dir, entry.warning)
+
+    def discard(self, dir: str) -> None:
+        """
+        Removes a directory that was created under the cache root but will never be cached, e.g. after a failed
+        compile.
+        """
+        if os.path.dirname(os.path.abspath(dir)) == os.path.abspath(self.root):
+            _remove_tree(dir)
+
+    def _evict(self, index: Dict[str, Any], keep: str) -> None:
+        entries = index['entries']
+        now = time.time()
+        total_bytes = sum(entry['size'] for entry in entries.values())
+
+        for key in sorted(entries, key=lambda key: entries[key]['last_used']):
+            over_count = self.max_entries is not None and len(entries) > self.max_entries
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not over_count and not over_bytes:
+                break
+            entry = entries[key]
+            if key == keep or now - entry['last_used'] < EVICTION_GRACE_PERIOD:
+                continue
+
+            logger.info('Evicting cached binary: %s', entry['dir'])
+            del entries[key]
+            total_bytes -= entry['size']
+            index['stats']['evictions'] += 1
+            _remove_tree(entry['dir'])
+
+        self._remove_orphans(index)
+
+    def _remove_orphans(self, index: Dict[str, Any]) -> None:
+        known = {os.path.basename(entry['dir']) for entry in index['entries'].values()}
+        now = time.time()
+        with os.scandir(self.root) as it:
+            for dirent in it:
+                if dirent.name in known or not dirent.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    if now - dirent.stat(follow_symlinks=False).st_mtime < ORPHAN_GRACE_PERIOD:
+                        continue
+                except OSError:
+                    continue
+                _remove_tree(dirent.path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._locked_index(write=False) as index:
+            return {
+                **{name: count + self._pending_stats.get(name, 0) for name, count in index['stats'].items()},
+                'entries': len(index['entries']),
+                'bytes': sum(entry['size'] for entry in index['entries'].values()),
+            }
+
+
+_binary_cache: Optional[CompiledBinaryCache] = None
+_submission_binary_cache: Optional[CompiledBinaryCache] = None
+_precompiled_header_cache: Optional[CompiledBinaryCache] = None
+
+
+def _create_cache(name: str, max_entries: Optional[int], max_bytes: Optional[int]) -> CompiledBinaryCache:
+    from dmoj.judgeenv import env
+
+    # Always use a dedicated subdirectory, since everything in the root not in the index is eventually removed.
+    root = os.path.join(env.compiled_binary_cache_dir or tempfile.gettempdir(), name)
+    try:
+        return CompiledBinaryCache(root, max_entries=max_entries, max_bytes=max_bytes)
+    except OSError:
+        logger.warning(
+            'Cannot use %s for compiled binaries, using a new temporary directory instead', root, exc_info=True
+        )
+        return CompiledBinaryCache(tempfile.mkdtemp(prefix=name + '-'), max_entries=max_entries, max_bytes=max_bytes)
+
+
+def get_binary_cache() -> CompiledBinaryCache:
+    from dmoj.judgeenv import env
+
+    global _binary_cache
+    if _binary_cache is None:
+        _binary_cache = _create_cache(
+            'dmoj-binary-cache', max_entries=env.compiled_binary_cache_size, max_bytes=env.compiled_binary_cache_bytes
+        )
+    return _binary_cache
+
+
+def get_submission_binary_cache() -> CompiledBinaryCache:
+    from dmoj.judgeenv import env
+
+    global _submission_binary_cache
+    if _submission_binary_cache is None:
+        # Kept apart from auxiliary programs, so that a mass rejudge can't evict every checker and interactor.
+        _submission_binary_cache = _create_cache(
+            'dmoj-submission-cache', max_entries=None, max_bytes=env.submission_binary_cache_bytes
+        )
+    return _submission_binary_cache
+
+
+def get_precompiled_header_cache() -> CompiledBinaryCache:
+    from dmoj.judgeenv import env
+
+    global _precompiled_header_cache
+    if _precompiled_header_cache is None:
+        # A precompiled bits/stdc++.h is about 100 MB, so they are bounded on their own.
+        _precompiled_header_cache = _create_cache(
+            'dmoj-pch', max_entries=None, max_bytes=env.precompiled_header_cache_bytes
+        )
+    return _precompiled_header_cache
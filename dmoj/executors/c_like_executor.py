@@ -1,10 +1,18 @@
+import fcntl
+import hashlib
+import logging
 import os
 import re
+import shutil
+import tempfile
 from collections import deque
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Optional, Set, Type
 
 from dmoj.cptbox import TracedPopen
+from dmoj.cptbox.filesystem_policies import ExactFile, FilesystemAccessRule, RecursiveDir
+from dmoj.error import CompileError
 from dmoj.executors.base_executor import AutoConfigOutput, AutoConfigResult, VersionFlags
+from dmoj.executors.binary_cache import CacheEntry, CompiledBinaryCache, get_precompiled_header_cache
 from dmoj.executors.compiled_executor import CompiledExecutor
 from dmoj.executors.mixins import SingleDigitVersionMixin
 from dmoj.judgeenv import env
@@ -15,11 +23,30 @@ GCC_ENV = env.runtime.gcc_env or {}
 GCC_COMPILE = os.environ.copy()
 GCC_COMPILE.update(env.runtime.gcc_compile or {})
 MAX_ERRORS = 5
+PCH_HEADER = 'bits/stdc++.h'
+HEADER_EXTENSIONS = ('.h', '.hh', '.hpp', '.hxx')
+PCH_LOCK_FILE = 'pch.lock'
+
+# Keys of precompiled headers that failed to build in this process, so that compiles don't keep retrying them.
+_pch_failures: Set[str] = set()
 
 CLANG_VERSIONS: List[str] = ['3.9', '3.8', '3.7', '3.6', '3.5']
 
 recppexc = re.compile(br"terminate called after throwing an instance of \'([A-Za-z0-9_:]+)\'\r?$", re.M)
 
+logger = logging.getLogger(__name__)
+
+
+def reinclude_header(header: str) -> 're.Pattern[bytes]':
+    return re.compile(br'^[ \t]*#[ \t]*include[ \t]*<' + re.escape(utf8bytes(header)) + b'>', re.M)
+
+
+def reinclude_header_first(header: str) -> 're.Pattern[bytes]':
+    # Only whitespace and comments may come before the include.
+    return re.compile(
+        br'\A(?:\s+|//[^\n]*|/\*.*?\*/)*#[ \t]*include[ \t]*<' + re.escape(utf8bytes(header)) + b'>', re.S
+    )
+
 
 class CLikeExecutor(SingleDigitVersionMixin, CompiledExecutor):
     defines: List[str] = []
@@ -29,12 +56,28 @@ class CLikeExecutor(SingleDigitVersionMixin, CompiledExecutor):
     has_color = False
 
     source_dict: Dict[str, bytes] = {}
+    # Header that is worth precompiling when a submission includes it, if any.
+    pch_header: Optional[str] = None
+    pch_language: str
+    _pch_dir: Optional[str] = None
+    # Sources that don't depend on the submission, e.g. signature graders. They are compiled on their own into a
+    # cached object file, which is linked into every submission.
+    object_sources: Dict[str, bytes] = {}
+    # Executors with their own compile command line build object sources with the submission instead.
+    supports_object_sources = True
+    # Compile the sources into a single relocatable object rather than an executable.
+    object_only = False
+    _object_file: Optional[str] = None
 
     def __init__(self, problem_id: str, source_code: bytes, **kwargs) -> None:
         self.source_dict = kwargs.pop('aux_sources', {})
         if source_code:
             self.source_dict[problem_id + self.ext] = source_code
         self.defines = kwargs.pop('defines', [])
+        self.object_sources = kwargs.pop('object_sources', {})
+        if not self.supports_object_sources:
+            self.source_dict.update(self.object_sources)
+            self.object_sources = {}
 
         super().__init__(problem_id, source_code, **kwargs)
 
@@ -55,8 +98,13 @@ class CLikeExecutor(SingleDigitVersionMixin, CompiledExecutor):
             + self.get_defines()
             + self.get_flags()
             + self.get_ldflags()
+            + (['-r'] if self.object_only else [])
+        )
+        return (
+            utf8bytes(''.join(key_components))
+            + b''.join(self.source_dict.values())
+            + b''.join(self.object_sources.values())
         )
-        return utf8bytes(''.join(key_components)) + b''.join(self.source_dict.values())
 
     def get_ldflags(self) -> List[str]:
         return []
@@ -67,18 +115,135 @@ class CLikeExecutor(SingleDigitVersionMixin, CompiledExecutor):
     def get_defines(self) -> List[str]:
         return ['-DONLINE_JUDGE'] + self.defines
 
+    def get_pch_key(self) -> str:
+        key_components = (
+            [str(self.get_command()), repr(self.get_runtime_versions()), '-O2', self.get_march_flag()]
+            + self.get_defines()
+            + self.get_flags()
+        )
+        return hashlib.sha256(utf8bytes('\0'.join(key_components))).hexdigest()
+
+    def uses_precompiled_header(self) -> bool:
+        return False
+
+    def get_pch_args(self) -> List[str]:
+        return []
+
+    def get_precompiled_header_dir(self, filename: str) -> Optional[str]:
+        """
+        Finds the precompiled header matching this executor's compiler and flags, building it on first use.
+        :return: the directory containing it as filename, or None if it couldn't be built.
+        """
+        key = self.get_pch_key()
+        if key in _pch_failures:
+            return None
+
+        cache = get_precompiled_header_cache()
+        # Other workers compiling the same language wait for the header instead of building it again.
+        with open(os.path.join(cache.root, PCH_LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entry = cache.get(key)
+            if entry is None:
+                entry = self.build_precompiled_header(cache, key, filename)
+
+        if entry is None:
+            _pch_failures.add(key)
+            return None
+        self._pch_dir = entry.dir
+        return entry.dir
+
+    def build_precompiled_header(self, cache: CompiledBinaryCache, key: str, filename: str) -> Optional[CacheEntry]:
+        # The flags may come from the problem, so the header is built like any other compile.
+        command = self.get_command()
+        assert command is not None
+        build_dir = self._file('_pch')
+        try:
+            stub = os.path.join(build_dir, 'stub.h')
+            output = os.path.join(build_dir, filename)
+            os.makedirs(os.path.dirname(output))
+            with open(stub, 'w') as f:
+                f.write(f'#include <{self.pch_header}>\n')
+
+            args = (
+                [command, '-Wall', '-x', self.pch_language]
+                + self.get_defines()
+                + ['-O2', self.get_march_flag()]
+                + self.get_flags()
+                + [stub, '-o', output]
+            )
+            try:
+                self.get_compile_output(self.create_compile_process(args))
+            except CompileError as e:
+                logger.error('Failed to build precompiled header %s: %s', key, e.message)
+                return None
+
+            pch_dir = tempfile.mkdtemp(dir=cache.root)
+            try:
+                dest = os.path.join(pch_dir, filename)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                shutil.move(output, dest)
+                return cache.put(key, dest, pch_dir)
+            except BaseException:
+                cache.discard(pch_dir)
+                raise
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def get_compiler_read_fs(self) -> List[FilesystemAccessRule]:
+        fs = super().get_compiler_read_fs()
+        if self._pch_dir is not None:
+            fs.append(RecursiveDir(self._pch_dir))
+        if self._object_file is not None:
+            fs.append(ExactFile(self._object_file))
+        return fs
+
+    def compile_objects(self) -> str:
+        # The object sources get the same headers (e.g. the signature grader's) as the submission, but nothing else.
+        headers = {
+            name: source for name, source in self.source_dict.items() if os.path.splitext(name)[1] in HEADER_EXTENSIONS
+        }
+        objects = type(self)(
+            self.problem,
+            b'',
+            storage_namespace=self.storage_namespace,
+            aux_sources={**self.object_sources, **headers},
+            defines=self.defines,
+            flags=self.flags,
+            compiler_time_limit=self.compiler_time_limit,
+            object_only=True,
+            cached=True,
+        )
+        return objects.get_executable()
+
+    def compile(self) -> str:
+        if self.object_sources:
+            self._object_file = self.compile_objects()
+        return super().compile()
+
+    def get_compiled_file(self) -> str:
+        return self._file(self.problem + '.o' if self.object_only else self.problem)
+
     def get_compile_args(self) -> List[str]:
         command = self.get_command()
         assert command is not None
+        self._pch_dir = None
+        use_pch = env.precompiled_headers and self.pch_header is not None and self.uses_precompiled_header()
+        pch_args = self.get_pch_args() if use_pch else []
+        if self.object_only:
+            # Partially link into one object. Symbols must be kept, and the C runtime is added by the final link.
+            output_args = ['-r', '-nostdlib', '-o', self.get_compiled_file()]
+        else:
+            output_args = ['-lm'] + self.get_ldflags() + ['-s', '-o', self.get_compiled_file()]
         return (
             [command, '-Wall']
             + (['-fdiagnostics-color=always'] if self.has_color else [])
+            + pch_args
             + self.source_paths
+            + ([] if self._object_file is None else [self._object_file])
             + self.get_defines()
-            + ['-O2', '-lm', self.get_march_flag()]
+            + ['-O2', self.get_march_flag()]
             + self.get_flags()
-            + self.get_ldflags()
-            + ['-s', '-o', self.get_compiled_file()]
+            + output_args
         )
 
     def get_compile_env(self) -> Optional[Dict[str, str]]:
@@ -149,6 +314,17 @@ class GCCMixin(CLikeExecutor):
     def get_flags(self) -> List[str]:
         return super().get_flags() + [f'-fmax-errors={MAX_ERRORS}']
 
+    def get_pch_args(self) -> List[str]:
+        # GCC looks for <header>.gch in every include directory before the header itself, and silently ignores it
+        # if it was built with incompatible options or macros, so adding the directory can never change semantics.
+        assert self.pch_header is not None
+        pch_dir = self.get_precompiled_header_dir(self.pch_header + '.gch')
+        return [] if pch_dir is None else ['-I', pch_dir]
+
+    def uses_precompiled_header(self) -> bool:
+        assert self.pch_header is not None
+        return any(reinclude_header(self.pch_header).search(source) for source in self.source_dict.values())
+
     @classmethod
     def get_version_flags(cls, command: str) -> List[VersionFlags]:
         return ['-dumpfullversion']
@@ -160,6 +336,18 @@ class ClangMixin(CLikeExecutor):
     def get_flags(self) -> List[str]:
         return super().get_flags() + [f'-ferror-limit={MAX_ERRORS}']
 
+    def get_pch_args(self) -> List[str]:
+        assert self.pch_header is not None
+        filename = os.path.basename(self.pch_header) + '.pch'
+        pch_dir = self.get_precompiled_header_dir(filename)
+        return [] if pch_dir is None else ['-include-pch', os.path.join(pch_dir, filename)]
+
+    def uses_precompiled_header(self) -> bool:
+        # Clang includes the header before anything else in every source, which is only equivalent if each source
+        # starts by including it.
+        assert self.pch_header is not None
+        return all(reinclude_header_first(self.pch_header).match(source) for source in self.source_dict.values())
+
     @classmethod
     def get_version_flags(cls, command: str) -> List[VersionFlags]:
         return ['--version']
@@ -171,3 +359,5 @@ class CExecutor(CLikeExecutor):
 
 class CPPExecutor(CLikeExecutor):
     ext: str = 'cpp'
+    pch_header = PCH_HEADER
+    pch_language = 'c++-header'
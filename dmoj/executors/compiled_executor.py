@@ -3,7 +3,6 @@ import hashlib
 import os
 import pty
 import struct
-import tempfile
 import termios
 from typing import Any, Dict, IO, List, Optional, Tuple, Union
 
@@ -13,6 +12,7 @@ from dmoj.cptbox.compiler_isolate import CompilerIsolateTracer
 from dmoj.cptbox.filesystem_policies import FilesystemAccessRule
 from dmoj.error import CompileError, OutputLimitExceeded
 from dmoj.executors.base_executor import BaseExecutor, ExecutorMeta
+from dmoj.executors.binary_cache import CompiledBinaryCache, get_binary_cache, get_submission_binary_cache
 from dmoj.judgeenv import env
 from dmoj.utils.communicate import safe_communicate
 from dmoj.utils.error import print_protection_fault
@@ -26,40 +26,53 @@ from dmoj.utils.unicode import utf8bytes
 # a compromise, we use a metaclass to compile after all constructors have ran.
 #
 # Using a metaclass also allows us to handle caching executors transparently.
-# Contract: if cached=True is specified and an entry exists in the cache,
-# `create_files` and `compile` will not be run, and `_executable` will be loaded
-# from the cache.
+# Contract: if cached=True (or submission_cached=True) is specified and an entry
+# exists in the cache, `create_files` and `compile` will not be run, and
+# `_executable` and `warning` will be loaded from the cache.
 class _CompiledExecutorMeta(ExecutorMeta):
+    binary_cacheable: bool
+
     def __call__(cls, *args, **kwargs) -> 'CompiledExecutor':
-        is_cached: bool = kwargs.pop('cached', False)
+        # Executors that can't be cached are compiled in their own temporary directory instead, which cleanup()
+        # removes.
+        is_cached: bool = kwargs.pop('cached', False) and cls.binary_cacheable
+        is_submission_cached: bool = kwargs.pop('submission_cached', False) and cls.binary_cacheable
+        cache: Optional[CompiledBinaryCache] = None
         if is_cached:
-            kwargs['dest_dir'] = env.compiled_binary_cache_dir
+            cache = get_binary_cache()
+        elif is_submission_cached:
+            cache = get_submission_binary_cache()
+        if cache is not None:
+            kwargs['dest_dir'] = cache.root
 
         # Finish running all constructors before compiling.
         obj: 'CompiledExecutor' = super().__call__(*args, **kwargs)
         obj.is_cached = is_cached
-        # Before writing sources to disk, check if we have this executor in our cache.
-        if is_cached:
-            cache_key_material = utf8bytes(obj.__class__.__name__ + obj.__module__) + obj.get_binary_cache_key()
-            cache_key = hashlib.sha384(cache_key_material).hexdigest()
-
-            cache_file_path = os.path.join(tempfile.gettempdir(), cache_key + '.txt')
-            if os.path.isfile(cache_file_path):
-                executor = open(cache_file_path).read().strip().split('\n')
-                assert len(executor) == 2
-                # Minimal sanity checking: is the file still there? If not, we'll just recompile.
-                if os.path.isfile(executor[0]):
-                    obj._executable = executor[0]
-                    obj._dir = executor[1]
-                    return obj
-
-        obj.create_files(*args, **kwargs)
-        obj.compile()
-
-        if is_cached:
-            cache_file_path = os.path.join(tempfile.gettempdir(), cache_key + '.txt')
-            open(cache_file_path, 'w').write('\n'.join([str(obj._executable), str(obj._dir)]))
+        if cache is None:
+            obj.create_files(*args, **kwargs)
+            obj.compile()
+            return obj
 
+        # Before writing sources to disk, check if we have this executor in our cache.
+        cache_key = hashlib.sha384(obj.get_cache_key_material()).hexdigest()
+        entry = cache.get(cache_key)
+        if entry is None:
+            try:
+                obj.create_files(*args, **kwargs)
+                obj.compile()
+            except BaseException:
+                # Failed compiles are never cached, so don't leave them lying around in the cache.
+                if obj._dir:
+                    cache.discard(obj._dir)
+                raise
+
+            assert obj._executable is not None and obj._dir is not None
+            entry = cache.put(cache_key, obj._executable, obj._dir, obj.warning)
+
+        if not is_cached:
+            # The same submission may be running on several workers at once, so each gets its own copy.
+            entry = cache.checkout(entry, env.tempdir)
+        obj._executable, obj._dir, obj.warning = entry
         return obj
 
 
@@ -69,6 +82,9 @@ class CompiledExecutor(BaseExecutor, metaclass=_CompiledExecutorMeta):
     compile_output_index = 1
 
     is_cached = False
+    # Whether the executable and its directory are all that's needed to launch, so they can be restored from the
+    # binary cache. Executors that interpret their compiled files (e.g. Python) also need state set up by create_files.
+    binary_cacheable = True
     warning: Optional[bytes] = None
     _executable: Optional[str] = None
     _code: Optional[str] = None
@@ -135,12 +151,12 @@ class CompiledExecutor(BaseExecutor, metaclass=_CompiledExecutorMeta):
         fcntl.ioctl(_slave, termios.TIOCSWINSZ, struct.pack('HHHH', 1024, 1024, 0, 0))
 
         # Some runtimes *cough cough* Swift *cough cough* actually check the environment variables too.
-        env = self.get_compile_env() or os.environ.copy()
-        env['TERM'] = 'xterm'
+        compile_env = self.get_compile_env() or os.environ.copy()
+        compile_env['TERM'] = 'xterm'
         # Instruct compilers to put their temporary files into the submission directory,
         # so that we can allow it as writeable, rather than of all of /tmp.
         assert self._dir is not None
-        env['TMPDIR'] = self._dir
+        compile_env['TMPDIR'] = self._dir
 
         proc = TracedPopen(
             [utf8bytes(a) for a in args],
@@ -151,11 +167,13 @@ class CompiledExecutor(BaseExecutor, metaclass=_CompiledExecutorMeta):
                 'stdout': _slave,
                 'stdin': _slave,
                 'cwd': utf8bytes(self._dir),
-                'env': env,
+                'env': compile_env,
                 'nproc': -1,
                 'fsize': self.executable_size,
                 'time': self.compiler_time_limit or 0,
                 'memory': 0,
+                'landlock': env.landlock,
+                'cgroup': env.cgroup,
                 **self.get_compile_popen_kwargs(),
             },
         )
@@ -215,6 +233,11 @@ class CompiledExecutor(BaseExecutor, metaclass=_CompiledExecutorMeta):
     def get_binary_cache_key(self) -> bytes:
         return utf8bytes(self.storage_namespace) + utf8bytes(self.problem) + self.source
 
+    def get_cache_key_material(self) -> bytes:
+        # Compiler upgrades must not reuse binaries built by the old compiler.
+        compiler = f'{self.__class__.__name__}{self.__module__}{self.get_command()}{self.get_runtime_versions()!r}'
+        return utf8bytes(compiler) + self.get_binary_cache_key()
+
     def compile(self) -> str:
         process = self.create_compile_process(self.get_compile_args())
         self.warning = self.get_compile_output(process)
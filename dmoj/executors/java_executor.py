@@ -10,6 +10,7 @@ from typing import Any, Dict, List, Optional, Tuple, Type
 
 from dmoj.cptbox import Debugger, TracedPopen
 from dmoj.cptbox.filesystem_policies import ExactDir, ExactFile, FilesystemAccessRule, RecursiveDir
+from dmoj.cptbox.handlers import PID, argument_rule
 from dmoj.error import CompileError, InternalError
 from dmoj.executors.base_executor import AutoConfigOutput, VersionFlags
 from dmoj.executors.compiled_executor import CompiledExecutor
@@ -41,10 +42,13 @@ def find_class(source: str) -> str:
     return class_name.group(1)
 
 
+P_PID = 0
+PROC_STACKGAP_CTL = 17
+PROC_STACKGAP_STATUS = 18
+
+
+@argument_rule(arg0={P_PID}, arg1={PID}, arg2={PROC_STACKGAP_CTL, PROC_STACKGAP_STATUS})
 def handle_procctl(debugger: Debugger) -> bool:
-    P_PID = 0
-    PROC_STACKGAP_CTL = 17
-    PROC_STACKGAP_STATUS = 18
     return (
         debugger.arg0 == P_PID
         and debugger.arg1 == debugger.pid
@@ -54,6 +58,7 @@ def handle_procctl(debugger: Debugger) -> bool:
 
 class JavaExecutor(SingleDigitVersionMixin, CompiledExecutor):
     ext = 'java'
+    binary_cacheable = False
 
     vm: str
     compiler: str
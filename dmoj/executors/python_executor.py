@@ -33,6 +33,7 @@ runpy.run_path(sys.argv[0], run_name='__main__')
     address_grace = 131072
     data_grace = 2048
     ext = 'py'
+    binary_cacheable = False
     pygments_traceback_lexer: Optional[str] = None
 
     def get_compile_args(self) -> List[str]:
@@ -14,7 +14,7 @@ from dmoj.graders.standard import StandardGrader
 from dmoj.judgeenv import env, get_problem_root
 from dmoj.problem import Problem, TestCase
 from dmoj.result import Result
-from dmoj.utils.helper_files import compile_with_auxiliary_files, mktemp
+from dmoj.utils.helper_files import compile_with_auxiliary_files
 from dmoj.utils.unicode import utf8text
 
 if TYPE_CHECKING:
@@ -84,7 +84,6 @@ class BridgedInteractiveGrader(StandardGrader):
         assert self._current_proc is not None
         assert self._current_proc.stderr is not None
 
-        judge_output = case.output_data()
         # Give TL + 2s by default, so we do not race (and incorrectly throw IE) if submission gets TLE
         self._interactor_time_limit = (self.handler_data.preprocessing_time or 2) + self.problem.time_limit
         self._interactor_memory_limit = self.handler_data.memory_limit or env['generator_memory_limit']
@@ -93,56 +92,60 @@ class BridgedInteractiveGrader(StandardGrader):
             or contrib_modules[self.contrib_type].ContribModule.get_interactor_args_format_string()
         )
 
-        with mktemp(judge_output) as answer_file:
-            input_path = case.input_data_io().to_path()
+        input_path = case.input_data_io().to_path()
+        answer_path = case.output_data_io().to_path()
 
-            # Take advantage of File IO to support log file (required by testlib).
-            # Collision is not a concern here because the log file, which is just a symlink to /dev/fd/4,
-            # is created inside a temporary directory.
-            interactor_log_file = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789_', k=8))
+        # Take advantage of File IO to support log file (required by testlib).
+        # Collision is not a concern here because the log file, which is just a symlink to /dev/fd/4,
+        # is created inside a temporary directory.
+        interactor_log_file = ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789_', k=8))
 
-            interactor_args = shlex.split(
-                args_format_string.format(
-                    input_file=shlex.quote(input_path),
-                    output_file=shlex.quote(interactor_log_file),
-                    answer_file=shlex.quote(answer_file.name),
-                )
-            )
-            self._interactor = self.interactor_binary.launch(
-                *interactor_args,
-                time=self._interactor_time_limit,
-                memory=self._interactor_memory_limit,
-                stdin=self._interactor_stdin_pipe,
-                stdout=self._interactor_stdout_pipe,
-                stderr=subprocess.PIPE,
-                file_io=ConfigNode({'output': interactor_log_file}),
-                extra_fs=[ExactFile(input_path)],
+        interactor_args = shlex.split(
+            args_format_string.format(
+                input_file=shlex.quote(input_path),
+                output_file=shlex.quote(interactor_log_file),
+                answer_file=shlex.quote(answer_path),
             )
+        )
+        self._interactor = self.interactor_binary.launch(
+            *interactor_args,
+            time=self._interactor_time_limit,
+            memory=self._interactor_memory_limit,
+            stdin=self._interactor_stdin_pipe,
+            stdout=self._interactor_stdout_pipe,
+            stderr=subprocess.PIPE,
+            file_io=ConfigNode({'output': interactor_log_file}),
+            extra_fs=[ExactFile(input_path), ExactFile(answer_path)],
+        )
 
-            os.close(self._interactor_stdin_pipe)
-            os.close(self._interactor_stdout_pipe)
+        os.close(self._interactor_stdin_pipe)
+        os.close(self._interactor_stdout_pipe)
 
-            result.proc_output, self._interactor_stderr = self._interactor.communicate()
-            self._current_proc.wait()
+        result.proc_output, self._interactor_stderr = self._interactor.communicate()
+        self._current_proc.wait()
 
-            return self._current_proc.stderr.read()
+        return self._current_proc.stderr.read()
 
     def _generate_interactor_binary(self) -> BaseExecutor:
-        files = self.handler_data.files
-        if isinstance(files, str):
-            filenames = [files]
-        elif isinstance(files.unwrap(), list):
-            filenames = list(files.unwrap())
-        problem_root = get_problem_root(self.problem.id, self.problem.storage_namespace)
-        assert problem_root is not None
-        filenames = [os.path.join(problem_root, f) for f in filenames]
-        flags = self.handler_data.get('flags', [])
-        unbuffered = self.handler_data.get('unbuffered', True)
-        return compile_with_auxiliary_files(
-            self.problem.storage_namespace,
-            filenames,
-            flags,
-            self.handler_data.lang,
-            self.handler_data.compiler_time_limit,
-            unbuffered,
-        )
+        return compile_interactor(self.problem, self.handler_data)
+
+
+def compile_interactor(problem: Problem, handler_data: ConfigNode) -> BaseExecutor:
+    files = handler_data.files
+    if isinstance(files, str):
+        filenames = [files]
+    elif isinstance(files.unwrap(), list):
+        filenames = list(files.unwrap())
+    problem_root = get_problem_root(problem.id, problem.storage_namespace)
+    assert problem_root is not None
+    filenames = [os.path.join(problem_root, f) for f in filenames]
+    flags = handler_data.get('flags', [])
+    unbuffered = handler_data.get('unbuffered', True)
+    return compile_with_auxiliary_files(
+        problem.storage_namespace,
+        filenames,
+        flags,
+        handler_data.lang,
+        handler_data.compiler_time_limit,
+        unbuffered,
+    )
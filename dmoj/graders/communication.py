@@ -8,6 +8,7 @@ import uuid
 from typing import List, TYPE_CHECKING
 
 from dmoj.checkers import CheckerOutput
+from dmoj.config import ConfigNode
 from dmoj.contrib import contrib_modules
 from dmoj.cptbox import TracedPopen
 from dmoj.cptbox.filesystem_policies import RecursiveDir
@@ -201,12 +202,13 @@ class CommunicationGrader(StandardGrader):
             aux_sources[self.problem.id + '_submission'] = utf8bytes(submission_prefix) + self.source
 
             aux_sources[signature_data['header']] = header
-            entry = entry_point
+            # The entry point is the same for every submission, so it is compiled once and cached.
             return executors[self.language].Executor(
                 self.problem.id,
-                entry,
+                b'',
                 storage_namespace=self.problem.storage_namespace,
                 aux_sources=aux_sources,
+                object_sources={self.problem.id + '_entry': entry_point},
                 defines=['-DSIGNATURE_GRADER'],
             )
         elif self.language in java_siggraders:
@@ -229,23 +231,27 @@ class CommunicationGrader(StandardGrader):
             raise InternalError('no valid runtime for signature grading %s found' % self.language)
 
     def _generate_manager_binary(self) -> BaseExecutor:
-        files = self.handler_data.manager.files
-        if isinstance(files, str):
-            filenames = [files]
-        elif isinstance(files.unwrap(), list):
-            filenames = list(files.unwrap())
-        problem_root = get_problem_root(self.problem.id, self.problem.storage_namespace)
-        assert problem_root is not None
-        filenames = [os.path.join(problem_root, f) for f in filenames]
-        flags = self.handler_data.manager.get('flags', [])
-        unbuffered = self.handler_data.manager.get('unbuffered', True)
-        lang = self.handler_data.manager.lang
-        compiler_time_limit = self.handler_data.manager.compiler_time_limit
-        return compile_with_auxiliary_files(
-            self.problem.storage_namespace,
-            filenames,
-            flags,
-            lang,
-            compiler_time_limit,
-            unbuffered,
-        )
+        return compile_manager(self.problem, self.handler_data.manager)
+
+
+def compile_manager(problem: Problem, manager_data: ConfigNode) -> BaseExecutor:
+    files = manager_data.files
+    if isinstance(files, str):
+        filenames = [files]
+    elif isinstance(files.unwrap(), list):
+        filenames = list(files.unwrap())
+    problem_root = get_problem_root(problem.id, problem.storage_namespace)
+    assert problem_root is not None
+    filenames = [os.path.join(problem_root, f) for f in filenames]
+    flags = manager_data.get('flags', [])
+    unbuffered = manager_data.get('unbuffered', True)
+    lang = manager_data.lang
+    compiler_time_limit = manager_data.compiler_time_limit
+    return compile_with_auxiliary_files(
+        problem.storage_namespace,
+        filenames,
+        flags,
+        lang,
+        compiler_time_limit,
+        unbuffered,
+    )
@@ -26,12 +26,13 @@ class SignatureGrader(StandardGrader):
             aux_sources[self.problem.id + '_submission'] = utf8bytes(submission_prefix) + self.source
 
             aux_sources[handler_data['header']] = header
-            entry = entry_point
+            # The entry point is the same for every submission, so it is compiled once and cached.
             return executors[self.language].Executor(
                 self.problem.id,
-                entry,
+                b'',
                 storage_namespace=self.problem.storage_namespace,
                 aux_sources=aux_sources,
+                object_sources={self.problem.id + '_entry': entry_point},
                 defines=['-DSIGNATURE_GRADER'],
             )
         elif self.language in java_siggraders:
@@ -7,7 +7,9 @@ from dmoj.cptbox.lazy_bytes import LazyBytes
 from dmoj.error import OutputLimitExceeded
 from dmoj.executors import executors
 from dmoj.executors.base_executor import BaseExecutor
+from dmoj.executors.compiled_executor import CompiledExecutor
 from dmoj.graders.base import BaseGrader
+from dmoj.judgeenv import env
 from dmoj.problem import TestCase
 from dmoj.result import CheckerResult, Result
 
@@ -109,11 +111,17 @@ class StandardGrader(BaseGrader):
         return error
 
     def _generate_binary(self) -> BaseExecutor:
-        return executors[self.language].Executor(
+        executor = executors[self.language].Executor
+        kwargs = {}
+        if env.submission_binary_cache and issubclass(executor, CompiledExecutor):
+            kwargs['submission_cached'] = True
+
+        return executor(
             self.problem.id,
             self.source,
             storage_namespace=self.problem.storage_namespace,
             hints=self.problem.config.hints or [],
             unbuffered=self.problem.config.unbuffered,
             meta=self.problem.config.meta or {},
+            **kwargs,
         )
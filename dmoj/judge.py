@@ -11,18 +11,25 @@ from enum import Enum
 from http.server import HTTPServer
 from itertools import groupby
 from operator import itemgetter
-from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Generator, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 from dmoj import packet
 from dmoj.control import JudgeControlRequestHandler
 from dmoj.error import CompileError
-from dmoj.judgeenv import env, get_supported_problems_and_mtimes, startup_warnings
+from dmoj.judgeenv import (
+    env,
+    get_problems_containing,
+    get_supported_problems_and_mtimes,
+    startup_warnings,
+    update_supported_problems,
+)
 from dmoj.monitor import Monitor
 from dmoj.problem import BaseTestCase, BatchedTestCase, Problem, TestCase
 from dmoj.result import Result
 from dmoj.utils import builtin_int_patch
 from dmoj.utils.ansi import ansi_style, print_ansi, strip_ansi
 from dmoj.utils.unicode import unicode_stdout_stderr, utf8bytes, utf8text
+from dmoj.warmup import WarmupWorker, build_precompiled_headers
 
 try:
     from setproctitle import setproctitle
@@ -81,6 +88,10 @@ class Judge:
         self.updater_exit = False
         self.updater_signal = threading.Event()
         self.updater = threading.Thread(target=self._updater_thread)
+        self._updater_lock = threading.Lock()
+        self._updated_paths: Set[str] = set()
+        self._full_update = False
+        self.warmup = WarmupWorker() if env.warm_up_problems else None
 
     @property
     def current_submission(self):
@@ -90,11 +101,18 @@ class Judge:
     def _updater_thread(self) -> None:
         log = logging.getLogger('dmoj.updater')
         while True:
-            self.updater_signal.wait()
+            # Periodically rescan everything, in case the incremental updates missed something.
+            triggered = self.updater_signal.wait(env.problem_rescan_interval or None)
             self.updater_signal.clear()
             if self.updater_exit:
                 return
 
+            with self._updater_lock:
+                full_update = self._full_update or not triggered
+                updated_paths = self._updated_paths
+                self._full_update = False
+                self._updated_paths = set()
+
             # Prevent problem updates while grading.
             # Capture the value so it can't change.
             # FIXME(tbrindus): this is broken.
@@ -103,7 +121,17 @@ class Judge:
             #    thread.join()
 
             try:
-                self.packet_manager.supported_problems_packet(get_supported_problems_and_mtimes(force_update=True))
+                old_problems = dict(get_supported_problems_and_mtimes())
+                if full_update:
+                    problems = get_supported_problems_and_mtimes(force_update=True)
+                else:
+                    problems = update_supported_problems(updated_paths)
+                self.packet_manager.supported_problems_packet(problems)
+
+                if self.warmup is not None:
+                    changed = {problem for problem, mtime in problems if old_problems.get(problem) != mtime}
+                    changed |= get_problems_containing(updated_paths)
+                    self.warmup.warm_up(changed)
 
                 # When copying large test file, updater_signal can be set multiple times in very short burst
                 # (e.g. 10 times during 0.2s). Meanwhile, bridged can take up to 1 seconds to process updates.
@@ -112,10 +140,17 @@ class Judge:
             except Exception:
                 log.exception('Failed to update problems.')
 
-    def update_problems(self) -> None:
+    def update_problems(self, paths: Optional[Iterable[str]] = None) -> None:
         """
         Pushes current problem set to server.
+        :param paths: if given, only the problems containing these changed paths are re-indexed; otherwise all
+            problem directories are rescanned.
         """
+        with self._updater_lock:
+            if paths is None:
+                self._full_update = True
+            else:
+                self._updated_paths.update(paths)
         self.updater_signal.set()
 
     def begin_grading(self, submission: Submission, report=logger.info, blocking=False) -> None:
@@ -270,6 +305,10 @@ class Judge:
         Attempts to connect to the handler server specified in command line.
         """
         self.updater.start()
+        if self.warmup is not None:
+            self.warmup.start()
+        if env.precompiled_headers:
+            threading.Thread(target=build_precompiled_headers, daemon=True).start()
         self.packet_manager.run()
 
     def murder(self) -> None:
@@ -279,6 +318,8 @@ class Judge:
         self.abort_grading()
         self.updater_exit = True
         self.updater_signal.set()
+        if self.warmup is not None:
+            self.warmup.stop()
         if self.packet_manager:
             self.packet_manager.close()
 
@@ -1,5 +1,4 @@
 import argparse
-import glob
 import logging
 import os
 import ssl
@@ -14,6 +13,7 @@ from dmoj.config import ConfigNode
 from dmoj.utils import pyyaml_patch  # noqa: F401, imported for side effect
 from dmoj.utils.ansi import print_ansi
 from dmoj.utils.glob_ext import find_glob_root
+from dmoj.utils.problem_scanner import ProblemScanner, ScanResult, load_snapshot, matches_glob, save_snapshot
 from dmoj.utils.unicode import utf8text
 
 storage_namespaces: Dict[Optional[str], List[str]] = {}
@@ -34,6 +34,11 @@ env: ConfigNode = ConfigNode(
         'compiler_output_character_limit': 65536,  # Number of characters allowed in compile output
         'compiled_binary_cache_dir': None,  # Location to store cached binaries, defaults to tempdir
         'compiled_binary_cache_size': 100,  # Maximum number of executables to cache (LRU order)
+        'compiled_binary_cache_bytes': None,  # Maximum total size of cached executables in bytes, unlimited if None
+        'submission_binary_cache': False,  # Cache compiled submissions too, for rejudges and duplicate submissions
+        'submission_binary_cache_bytes': 1073741824,  # Maximum total size of cached submissions in bytes
+        'precompiled_headers': False,  # Precompile bits/stdc++.h for C++ submissions that include it
+        'precompiled_header_cache_bytes': 1073741824,  # Maximum total size of precompiled headers in bytes
         'test_size_limit': 262144,  # Maximum allowable test size, 256mb
         'runtime': {},
         # Map of executor: fs_config, used to configure
@@ -59,6 +64,27 @@ env: ConfigNode = ConfigNode(
         'tempdir': None,
         # CPU affinity (as a list of 0-indexed CPU IDs) to run submissions on
         'submission_cpu_affinity': None,
+        # Enforce the filesystem sandbox on opening files with Landlock (Linux 5.13+), instead of checking every
+        # open in the tracer. Directories that are only allowed exactly (exact_dir) can't be listed under Landlock.
+        'landlock': False,
+        # Delegated cgroup v2 directory (e.g. from systemd's Delegate=yes) to run every submission and compiler in a
+        # cgroup of its own in, which accounts for memory and CPU time of all their processes exactly, limits their
+        # memory as a whole, and kills them together. Needs the memory and cpu controllers to be delegated.
+        'cgroup': None,
+        # Count the system calls every submission traps into the sandbox with and time their handlers, to find out
+        # why a submission is slow in the sandbox. The summary is logged, and sent along with each test case result.
+        'profile_syscalls': False,
+        # Interval in seconds between full rescans of the problem directories, to reconcile
+        # the incrementally updated problem list with what is on disk. 0 disables it.
+        'problem_rescan_interval': 3600,
+        # Number of threads used to list problem directories in parallel, which helps on networked filesystems.
+        'problem_scan_threads': 8,
+        # File to save the results of problem scans to. If set, the first scan on startup only checks that
+        # the directories seen in the last scan are unchanged, instead of listing them again.
+        'problem_scan_snapshot': None,
+        # Compile the checkers, interactors, managers and generators of problems in the background
+        # as soon as their data changes, instead of when the first submission needs them.
+        'warm_up_problems': False,
     },
     dynamic=False,
 )
@@ -81,6 +107,8 @@ class StorageNamespaceCache:
     problem_root_cache: Dict[str, str] = {}
     problem_roots_cache: Optional[List[str]] = None
     supported_problems_cache: Optional[List[Tuple[str, float]]] = None
+    # problem id -> (problem directory, mtime), in the same order as supported_problems_cache
+    supported_problem_dirs: Dict[str, Tuple[str, float]] = {}
 
 
 _storage_namespace_cache: Dict[Optional[str], StorageNamespaceCache] = defaultdict(StorageNamespaceCache)
@@ -251,7 +279,7 @@ def load_env(cli: bool = False, testsuite: bool = False) -> None:  # pragma: no
     skip_first_scan = False if cli else args.skip_first_scan
     if not skip_first_scan:
         # Populate cache and send warnings
-        get_supported_problems_and_mtimes()
+        get_supported_problems_and_mtimes(use_snapshot=True)
     else:
         for namespace, globs in storage_namespaces.items():
             cache = _storage_namespace_cache[namespace]
@@ -289,9 +317,30 @@ def get_problem_roots(namespace=None) -> List[str]:
     return cache.problem_roots_cache
 
 
-def get_supported_problems_and_mtimes(warnings: bool = True, force_update: bool = False) -> List[Tuple[str, float]]:
+def _scan_problem_dirs(use_snapshot: bool) -> ScanResult:
+    scanner = ProblemScanner(env.problem_scan_threads)
+    snapshot_file = env.problem_scan_snapshot
+
+    result = None
+    if use_snapshot and snapshot_file:
+        snapshot = load_snapshot(snapshot_file)
+        if snapshot is not None:
+            result = scanner.validate(problem_globs, snapshot)
+
+    if result is None:
+        result = scanner.scan(problem_globs)
+
+    if snapshot_file:
+        save_snapshot(snapshot_file, problem_globs, result)
+    return result
+
+
+def get_supported_problems_and_mtimes(
+    warnings: bool = True, force_update: bool = False, use_snapshot: bool = False
+) -> List[Tuple[str, float]]:
     """
     Fetches a list of all problems supported by this judge and their mtimes.
+    :param use_snapshot: if a snapshot of the last scan is configured and still valid, use it instead of scanning.
     :return:
         A list of all problems in tuple format: (problem id, mtime)
     """
@@ -305,31 +354,138 @@ def get_supported_problems_and_mtimes(warnings: bool = True, force_update: bool
     root_dirs = []
     root_dirs_set = set()
     problem_dirs: Dict[str, str] = {}
-    for dir_glob in problem_globs:
-        for problem_config in glob.iglob(os.path.join(dir_glob, 'init.yml'), recursive=True):
-            if os.access(problem_config, os.R_OK):
-                problem_dir = os.path.dirname(problem_config)
-                problem = utf8text(os.path.basename(problem_dir))
-
-                root_dir = os.path.dirname(problem_dir)
-                if root_dir not in root_dirs_set:
-                    # earlier-listed problem root takes priority
-                    root_dirs.append(root_dir)
-                    root_dirs_set.add(root_dir)
-
-                if problem in problem_dirs:
-                    if warnings:
-                        print_ansi(
-                            f'#ansi[Warning: duplicate problem {problem} found at {problem_dir},'
-                            f' ignoring in favour of {problem_dirs[problem]}](yellow)'
-                        )
-                else:
-                    problem_dirs[problem] = problem_dir
-                    problems.append((problem, os.path.getmtime(problem_dir)))
+    for problem_dir, mtime in _scan_problem_dirs(use_snapshot).problems:
+        problem = utf8text(os.path.basename(problem_dir))
+
+        root_dir = os.path.dirname(problem_dir)
+        if root_dir not in root_dirs_set:
+            # earlier-listed problem root takes priority
+            root_dirs.append(root_dir)
+            root_dirs_set.add(root_dir)
+
+        if problem in problem_dirs:
+            if warnings:
+                print_ansi(
+                    f'#ansi[Warning: duplicate problem {problem} found at {problem_dir},'
+                    f' ignoring in favour of {problem_dirs[problem]}](yellow)'
+                )
+        else:
+            problem_dirs[problem] = problem_dir
+            problems.append((problem, mtime))
 
     cache.problem_roots_cache = root_dirs
     cache.supported_problems_cache = problems
+    cache.supported_problem_dirs = {problem: (problem_dirs[problem], mtime) for problem, mtime in problems}
+
+    return problems
 
+
+def _is_problem_dir(problem_dir: str) -> bool:
+    problem_config = os.path.join(problem_dir, 'init.yml')
+    return any(matches_glob(problem_dir, problem_glob) for problem_glob in problem_globs) and os.access(
+        problem_config, os.R_OK
+    )
+
+
+def _find_owning_problem_dir(path: str, known_dirs: Set[str]) -> Optional[str]:
+    glob_roots = [str(find_glob_root(problem_glob)) for problem_glob in problem_globs]
+    path = os.path.normpath(path)
+    while any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in glob_roots):
+        if path in known_dirs or _is_problem_dir(path):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return None
+
+
+def _has_subdirectories(path: str) -> bool:
+    try:
+        with os.scandir(path) as entries:
+            return any(entry.is_dir() for entry in entries)
+    except OSError:
+        return True
+
+
+def _reindex_problem_dir(cache: StorageNamespaceCache, problem_dir: str, warnings: bool) -> None:
+    problem = utf8text(os.path.basename(problem_dir))
+    current = cache.supported_problem_dirs.get(problem)
+
+    if _is_problem_dir(problem_dir):
+        if current is not None and current[0] != problem_dir and _is_problem_dir(current[0]):
+            if warnings:
+                print_ansi(
+                    f'#ansi[Warning: duplicate problem {problem} found at {problem_dir},'
+                    f' ignoring in favour of {current[0]}](yellow)'
+                )
+            return
+
+        cache.supported_problem_dirs[problem] = (problem_dir, os.path.getmtime(problem_dir))
+        cache.problem_root_cache[problem] = problem_dir
+        assert cache.problem_roots_cache is not None
+        root_dir = os.path.dirname(problem_dir)
+        if root_dir not in cache.problem_roots_cache:
+            cache.problem_roots_cache.append(root_dir)
+    elif current is not None and current[0] == problem_dir:
+        del cache.supported_problem_dirs[problem]
+        cache.problem_root_cache.pop(problem, None)
+
+        # A duplicate that was previously shadowed by this problem may take its place.
+        assert cache.problem_roots_cache is not None
+        for root_dir in cache.problem_roots_cache:
+            duplicate_dir = os.path.join(root_dir, problem)
+            if duplicate_dir != problem_dir and _is_problem_dir(duplicate_dir):
+                cache.supported_problem_dirs[problem] = (duplicate_dir, os.path.getmtime(duplicate_dir))
+                break
+
+
+def get_problems_containing(paths: Iterable[str]) -> Set[str]:
+    """
+    Maps paths to the ids of the supported problems whose directories contain them.
+    """
+    cache = _storage_namespace_cache[None]
+    dir_problems = {problem_dir: problem for problem, (problem_dir, _) in cache.supported_problem_dirs.items()}
+    problems = set()
+    for path in paths:
+        problem_dir = _find_owning_problem_dir(path, set(dir_problems))
+        if problem_dir in dir_problems:
+            problems.add(dir_problems[problem_dir])
+    return problems
+
+
+def update_supported_problems(paths: Iterable[str], warnings: bool = True) -> List[Tuple[str, float]]:
+    """
+    Updates the list of supported problems given paths that changed on disk, re-indexing only the problem
+    directories containing them. Falls back to a full rescan if a change can't be attributed to a problem,
+    e.g. when a directory holding several problems is moved.
+    :return:
+        A list of all problems in tuple format: (problem id, mtime)
+    """
+
+    cache = _storage_namespace_cache[None]
+    if cache.supported_problems_cache is None or cache.problem_roots_cache is None:
+        return get_supported_problems_and_mtimes(warnings=warnings, force_update=True)
+
+    known_dirs = {problem_dir for problem_dir, _ in cache.supported_problem_dirs.values()}
+    problem_dirs = set()
+    for path in paths:
+        problem_dir = _find_owning_problem_dir(path, known_dirs)
+        if problem_dir is not None:
+            problem_dirs.add(problem_dir)
+        elif not os.path.exists(path):
+            # A directory holding entire problems may have been removed or moved away.
+            prefix = os.path.normpath(path) + os.sep
+            problem_dirs.update(known_dir for known_dir in known_dirs if known_dir.startswith(prefix))
+        elif os.path.isdir(path) and _has_subdirectories(path):
+            # A directory holding entire problems may have been moved in, so look for them everywhere.
+            return get_supported_problems_and_mtimes(warnings=warnings, force_update=True)
+
+    for problem_dir in problem_dirs:
+        _reindex_problem_dir(cache, problem_dir, warnings)
+
+    problems = [(problem, mtime) for problem, (_, mtime) in cache.supported_problem_dirs.items()]
+    cache.supported_problems_cache = problems
     return problems
 
 
@@ -73,7 +73,10 @@ class SendProblemsHandler(FileSystemEventHandler):
         if event.event_type not in self.ALLOWED_EVENT_TYPES:
             return
         if self.callback is not None:
-            self.callback()
+            paths = [event.src_path]
+            if event.event_type == EVENT_TYPE_MOVED:
+                paths.append(event.dest_path)
+            self.callback(paths)
         if self.refresher is not None:
             self.refresher.refresh()
 
@@ -209,6 +209,7 @@ class PacketManager:
                             'voluntary-context-switches': result.context_switches[0],
                             'involuntary-context-switches': result.context_switches[1],
                             'runtime-version': result.runtime_version,
+                            'syscall-profile': result.syscall_profile,
                         }
                         for position, result in self._testcase_queue
                     ],
@@ -3,7 +3,6 @@ import os
 import re
 import shutil
 import subprocess
-import zipfile
 from collections import defaultdict
 from functools import partial
 from typing import (
@@ -33,11 +32,13 @@ from dmoj.config import ConfigNode, InvalidInitException
 from dmoj.cptbox.utils import MemoryIO, MmapableIO
 from dmoj.error import InternalError
 from dmoj.judgeenv import env, get_problem_root
+from dmoj.utils.archive import BadArchiveError, ProblemArchive, open_archive
 from dmoj.utils.helper_files import compile_with_auxiliary_files, parse_helper_file_error
 from dmoj.utils.module import load_module_from_file
-from dmoj.utils.normalize import normalized_file_copy
+from dmoj.utils.normalize import normalized_bytes, normalized_file_copy
 
 if TYPE_CHECKING:
+    from dmoj.executors.base_executor import BaseExecutor
     from dmoj.graders.base import BaseGrader
 
 DEFAULT_TEST_CASE_INPUT_PATTERN = r'^(?=.*?\.in|in).*?(?:(?:^|\W)(?P<batch>\d+)[^\d\s]+)?(?P<case>\d+)[^\d\s]*$'
@@ -221,14 +222,14 @@ class Problem:
         else:
             return graders.StandardGrader
 
-    def _resolve_archive_files(self) -> Optional[zipfile.ZipFile]:
+    def _resolve_archive_files(self) -> Optional[ProblemArchive]:
         if self.config.archive:
             archive_path = os.path.join(self.root_dir, self.config.archive)
             if not os.path.exists(archive_path):
                 raise InvalidInitException('archive file "%s" does not exist' % archive_path)
             try:
-                archive = zipfile.ZipFile(archive_path, 'r')
-            except zipfile.BadZipfile:
+                archive = open_archive(archive_path)
+            except BadArchiveError:
                 raise InvalidInitException('bad archive: "%s"' % archive_path)
             return archive
         return None
@@ -271,7 +272,7 @@ class Problem:
 
 class ProblemDataManager(dict):
     problem_root_dir: str
-    archive: Optional[zipfile.ZipFile]
+    archive: Optional[ProblemArchive]
 
     def __init__(self, problem_root_dir: str, **kwargs):
         super().__init__(**kwargs)
@@ -287,7 +288,7 @@ class ProblemDataManager(dict):
                 zipinfo = self.archive.getinfo(key)
                 if zipinfo.file_size > self.test_size_limit * 1024:
                     raise InternalError('test file is too large: %s' % key)
-                return self.archive.open(zipinfo)
+                return self.archive.open(key)
             raise KeyError('file "%s" could not be found in "%s"' % (key, self.problem_root_dir))
 
     def as_fd(self, key: str, normalize: bool = False) -> MmapableIO:
@@ -360,6 +361,7 @@ class TestCase(BaseTestCase):
     output_prefix_length: int
     has_binary_data: bool
     _input_data_io: Optional[MmapableIO]
+    _output_data_io: Optional[MmapableIO]
     _generated: Optional[Tuple[MmapableIO, bytes]]
 
     def __init__(self, count: int, batch_no: int, config: ConfigNode, problem: Problem):
@@ -372,6 +374,7 @@ class TestCase(BaseTestCase):
         self.has_binary_data = config.binary_data
         self._generated = None
         self._input_data_io = None
+        self._output_data_io = None
 
     def _normalize(self, data: bytes) -> bytes:
         # Perhaps the correct answer may be 'no output', in which case it'll be
@@ -385,17 +388,13 @@ class TestCase(BaseTestCase):
 
         # Normalize all newline formats (\r\n, \r, \n) to \n, otherwise we have
         # problems with people creating data on Macs (\r newline) when judged
-        # programs assume \n.
-        data = data.replace(b'\r\n', b'\r').replace(b'\r', b'\n')
+        # programs assume \n. Some data might also be missing a trailing newline,
+        # which makes the last line in the file not-a-line.
+        return normalized_bytes(data)
 
-        # Some data might be missing a trailing newline, which makes the last
-        # line in the file not-a-line.
-        if not data.endswith(b'\n'):
-            data += b'\n'
-
-        return data
-
-    def _run_generator(self, gen: Union[str, ConfigNode], args: Optional[Iterable[str]] = None) -> None:
+    def _compile_generator(
+        self, gen: Union[str, ConfigNode], args: Optional[Iterable[str]] = None
+    ) -> Tuple['BaseExecutor', Iterable[str], float, int]:
         flags = []
         args = args or []
 
@@ -437,6 +436,10 @@ class TestCase(BaseTestCase):
         executor = compile_with_auxiliary_files(
             self.problem.storage_namespace, filenames, flags, lang, compiler_time_limit
         )
+        return executor, args, time_limit, memory_limit
+
+    def _run_generator(self, gen: Union[str, ConfigNode], args: Optional[Iterable[str]] = None) -> None:
+        executor, args, time_limit, memory_limit = self._compile_generator(gen, args)
 
         # convert all args to str before launching; allows for smoother int passing
         assert args is not None
@@ -509,6 +512,20 @@ class TestCase(BaseTestCase):
             return self._generated[1]
         return b''
 
+    def output_data_io(self) -> MmapableIO:
+        """
+        :return: the expected output in a sealed file that helper programs can open by path, like input_data_io.
+        """
+        if self._output_data_io:
+            return self._output_data_io
+
+        if self.config.out:
+            result = self.problem.problem_data.as_fd(self.config.out, normalize=not self.has_binary_data)
+        else:
+            result = MemoryIO(prefill=self.output_data(), seal=True)
+        self._output_data_io = result
+        return result
+
     def checker(self) -> partial:
         try:
             name = self.config['checker'] or 'standard'
@@ -543,13 +560,16 @@ class TestCase(BaseTestCase):
         self._generated = None
         if self._input_data_io:
             self._input_data_io.close()
+        if self._output_data_io:
+            self._output_data_io.close()
+            self._output_data_io = None
 
     def __str__(self) -> str:
         return f'TestCase(in={self.config["in"]},out={self.config["out"]},points={self.config["points"]})'
 
     # FIXME(tbrindus): this is a hack working around the fact we can't pickle these fields, but we do need parts of
     # TestCase itself on the other end of the IPC.
-    _pickle_blacklist = ('_generated', 'config', 'problem', '_input_data_io')
+    _pickle_blacklist = ('_generated', 'config', 'problem', '_input_data_io', '_output_data_io')
 
     def __getstate__(self) -> dict:
         k = {k: v for k, v in self.__dict__.items() if k not in self._pickle_blacklist}
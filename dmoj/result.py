@@ -1,4 +1,4 @@
-from typing import List, Optional, TYPE_CHECKING, Tuple
+from typing import Any, Dict, List, Optional, TYPE_CHECKING, Tuple
 
 from dmoj.utils.error import print_protection_fault
 from dmoj.utils.os_ext import strsignal
@@ -58,6 +58,8 @@ class Result:
         self.feedback: str = feedback
         self.extended_feedback: str = extended_feedback
         self.points: float = points
+        # Where the submission spent its time in the sandbox, if profiling is enabled, for admins to look into.
+        self.syscall_profile: Optional[Dict[str, Any]] = None
 
     def get_main_code(self) -> int:
         for flag in Result.CODE_DISPLAY_ORDER:
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+from dmoj.utils import archive
+from dmoj.utils.archive import BadArchiveError, MappedZipFile, ZstdArchive, convert_archive, open_archive
+
+MEMBERS = {
+    'stored.in': b'1 2\n',
+    'deflated.out': b'3\n' * 1000,
+    'empty.in': b'',
+}
+
+
+class ArchiveTestMixin:
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+        with zipfile.ZipFile(self.path, 'w') as zip:
+            zip.writestr('stored.in', MEMBERS['stored.in'], compress_type=zipfile.ZIP_STORED)
+            zip.writestr('deflated.out', MEMBERS['deflated.out'], compress_type=zipfile.ZIP_DEFLATED)
+            zip.writestr('empty.in', MEMBERS['empty.in'], compress_type=zipfile.ZIP_STORED)
+
+    def assertArchiveContents(self, archive):
+        self.assertEqual(sorted(archive.namelist()), sorted(MEMBERS))
+        for name, data in MEMBERS.items():
+            self.assertEqual(archive.getinfo(name).file_size, len(data))
+            with archive.open(name) as f:
+                self.assertEqual(f.read(), data)
+        with self.assertRaises(KeyError):
+            archive.getinfo('missing.in')
+
+
+class TestMappedZipFile(ArchiveTestMixin, unittest.TestCase):
+    def test_read(self):
+        with open_archive(self.path) as archive:
+            self.assertIsInstance(archive, MappedZipFile)
+            self.assertArchiveContents(archive)
+
+    def test_bad_crc(self):
+        with open(self.path, 'r+b') as f:
+            data = f.read()
+            f.seek(data.index(MEMBERS['stored.in']))
+            f.write(b'9')
+
+        with open_archive(self.path) as archive, self.assertRaisesRegex(BadArchiveError, 'CRC'):
+            archive.open('stored.in')
+
+    def test_bad_archive(self):
+        with self.assertRaises(BadArchiveError):
+            open_archive(os.devnull)
+
+    def test_convert_stored(self):
+        convert_archive(self.path, 'stored')
+        with open_archive(self.path) as archive:
+            self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()))
+            self.assertArchiveContents(archive)
+
+
+@unittest.skipIf(archive.zstandard is None, 'zstandard module not installed')
+class TestZstdArchive(ArchiveTestMixin, unittest.TestCase):
+    def test_convert(self):
+        convert_archive(self.path, 'zstd')
+        with open_archive(self.path) as archive:
+            self.assertIsInstance(archive, ZstdArchive)
+            self.assertArchiveContents(archive)
+
+        convert_archive(self.path, 'zip')
+        with open_archive(self.path) as archive:
+            self.assertIsInstance(archive, MappedZipFile)
+            self.assertArchiveContents(archive)
+
+    def test_truncated(self):
+        convert_archive(self.path, 'zstd')
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+
+        with self.assertRaises(BadArchiveError):
+            open_archive(self.path)
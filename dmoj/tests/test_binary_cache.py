@@ -0,0 +1,307 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dmoj.error import CompileError
+from dmoj.executors import binary_cache
+from dmoj.executors.binary_cache import CacheEntry, CompiledBinaryCache
+
+
+class CompiledBinaryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.clock = 1000.0
+        time_patch = mock.patch('dmoj.executors.binary_cache.time.time', side_effect=lambda: self.clock)
+        time_patch.start()
+        self.addCleanup(time_patch.stop)
+
+    def compile(self, cache, content=b'binary'):
+        dir = tempfile.mkdtemp(dir=cache.root)
+        executable = os.path.join(dir, 'main')
+        with open(executable, 'wb') as f:
+            f.write(content)
+        return executable, dir
+
+    def put(self, cache, key, content=b'binary'):
+        entry = cache.put(key, *self.compile(cache, content))
+        self.clock += binary_cache.EVICTION_GRACE_PERIOD
+        return entry
+
+    def test_hit_and_miss(self):
+        cache = CompiledBinaryCache(self.root)
+        self.assertIsNone(cache.get('a'))
+
+        executable, dir = self.compile(cache)
+        self.assertEqual(cache.put('a', executable, dir), CacheEntry(executable, dir))
+        self.assertEqual(cache.get('a'), CacheEntry(executable, dir))
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], len(b'binary'))
+
+        # The index is shared with every other cache on the same root, but hits are only counted in it with the next
+        # write.
+        other = CompiledBinaryCache(self.root)
+        self.assertEqual(other.stats()['hits'], 0)
+        self.assertEqual(other.stats()['misses'], 1)
+        cache.put('b', *self.compile(cache))
+        self.assertEqual(other.stats()['hits'], 1)
+
+    def test_evict_by_count(self):
+        cache = CompiledBinaryCache(self.root, max_entries=2)
+        first = self.put(cache, 'a')
+        self.put(cache, 'b')
+        cache.get('a')
+        self.clock += binary_cache.EVICTION_GRACE_PERIOD
+        self.put(cache, 'c')
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertTrue(os.path.isdir(first.dir))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_evict_by_bytes(self):
+        cache = CompiledBinaryCache(self.root, max_bytes=10)
+        first = self.put(cache, 'a', b'x' * 6)
+        self.put(cache, 'b', b'x' * 6)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertFalse(os.path.exists(first.dir))
+        self.assertIsNotNone(cache.get('b'))
+
+    def test_recently_used_not_evicted(self):
+        cache = CompiledBinaryCache(self.root, max_entries=1)
+        cache.put('a', *self.compile(cache))
+        cache.put('b', *self.compile(cache))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+        self.clock += binary_cache.EVICTION_GRACE_PERIOD
+        cache.put('c', *self.compile(cache))
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_integrity(self):
+        cache = CompiledBinaryCache(self.root)
+        entry = self.put(cache, 'a')
+        with open(entry.executable, 'r+b') as f:
+            f.write(b'B')
+        # Corruption is only looked for once the stat changes, which a write this fast may not do by itself.
+        os.utime(entry.executable, ns=(0, 0))
+
+        with self.assertLogs('dmoj.executors.binary_cache', 'WARNING'):
+            self.assertIsNone(cache.get('a'))
+        self.assertFalse(os.path.exists(entry.dir))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_hit_without_write(self):
+        cache = CompiledBinaryCache(self.root)
+        self.put(cache, 'a')
+        cache.get('a')
+        index = os.stat(cache.index_path)
+
+        with mock.patch('dmoj.executors.binary_cache._file_digest') as digest:
+            self.clock += binary_cache.LAST_USED_RESOLUTION - 1
+            self.assertIsNotNone(cache.get('a'))
+            self.assertEqual(os.stat(cache.index_path).st_ino, index.st_ino)
+            digest.assert_not_called()
+
+        # Used for long enough since last marked, so the entry is marked again, which keeps it from being evicted.
+        self.clock += 1
+        self.assertIsNotNone(cache.get('a'))
+        self.assertNotEqual(os.stat(cache.index_path).st_ino, index.st_ino)
+
+    def test_touched(self):
+        cache = CompiledBinaryCache(self.root)
+        entry = self.put(cache, 'a')
+        os.utime(entry.executable, ns=(0, 0))
+
+        self.assertEqual(cache.get('a'), entry)
+        with mock.patch('dmoj.executors.binary_cache._file_digest') as digest:
+            self.assertEqual(cache.get('a'), entry)
+            digest.assert_not_called()
+
+    def test_concurrent_put(self):
+        cache = CompiledBinaryCache(self.root)
+        existing = self.put(cache, 'a')
+        executable, dir = self.compile(cache)
+
+        self.assertEqual(cache.put('a', executable, dir), existing)
+        self.assertFalse(os.path.exists(dir))
+
+    def test_corrupt_index(self):
+        cache = CompiledBinaryCache(self.root)
+        self.put(cache, 'a')
+        with open(cache.index_path, 'w') as f:
+            f.write('{')
+
+        with self.assertLogs('dmoj.executors.binary_cache', 'WARNING'):
+            self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(self.put(cache, 'a'))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_orphans(self):
+        cache = CompiledBinaryCache(self.root)
+        _, orphan = self.compile(cache)
+        _, failed = self.compile(cache)
+        cache.discard(failed)
+        self.assertFalse(os.path.exists(failed))
+
+        self.put(cache, 'a')
+        self.assertTrue(os.path.isdir(orphan))
+
+        self.clock = os.stat(orphan).st_mtime + binary_cache.ORPHAN_GRACE_PERIOD
+        entry = self.put(cache, 'b')
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.isdir(entry.dir))
+        self.assertIsNotNone(cache.get('a'))
+
+    def test_discard_outside_root(self):
+        cache = CompiledBinaryCache(self.root)
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        cache.discard(outside)
+        self.assertTrue(os.path.isdir(outside))
+
+    def test_shared_root(self):
+        shared = os.path.join(self.root, 'shared')
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        link = os.path.join(self.root, 'link')
+        os.symlink(self.root, link)
+        for root in (shared, link):
+            with self.subTest(root=root), self.assertRaises(PermissionError):
+                CompiledBinaryCache(root)
+
+        created = CompiledBinaryCache(os.path.join(self.root, 'created'))
+        self.assertEqual(os.stat(created.root).st_mode & 0o777, 0o700)
+
+        with mock.patch('dmoj.judgeenv.env', compiled_binary_cache_dir=self.root):
+            cache = binary_cache._create_cache('shared', max_entries=None, max_bytes=None)
+        self.addCleanup(shutil.rmtree, cache.root)
+        self.assertNotEqual(cache.root, shared)
+        self.assertFalse(os.listdir(shared))
+
+    def test_warning(self):
+        cache = CompiledBinaryCache(self.root)
+        cache.put('a', *self.compile(cache), warning=b'\xff warning')
+        self.assertEqual(cache.get('a').warning, b'\xff warning')
+
+    def test_checkout(self):
+        cache = CompiledBinaryCache(self.root, max_entries=None)
+        entry = self.put(cache, 'a')
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+
+        copy = cache.checkout(entry, tempdir)
+        self.assertEqual(os.path.dirname(copy.dir), tempdir)
+        self.assertEqual(copy.executable, os.path.join(copy.dir, 'main'))
+        self.assertTrue(os.path.samefile(copy.executable, entry.executable))
+
+    def test_checkout_tree(self):
+        cache = CompiledBinaryCache(self.root, max_entries=None)
+        executable, dir = self.compile(cache)
+        os.makedirs(os.path.join(dir, 'lib', 'nested'))
+        with open(os.path.join(dir, 'lib', 'nested', 'data'), 'wb') as f:
+            f.write(b'data')
+        os.symlink('main', os.path.join(dir, 'link'))
+        os.symlink('lib', os.path.join(dir, 'lib-link'))
+        entry = cache.put('a', executable, dir)
+
+        copy = cache.checkout(entry, self.root)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(copy.dir, 'lib', 'nested', 'data'), os.path.join(dir, 'lib', 'nested', 'data')
+            )
+        )
+        self.assertEqual(os.readlink(os.path.join(copy.dir, 'link')), 'main')
+        self.assertEqual(os.readlink(os.path.join(copy.dir, 'lib-link')), 'lib')
+
+
+class SubmissionCacheTest(unittest.TestCase):
+    def setUp(self):
+        from dmoj.executors.compiled_executor import CompiledExecutor
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache = CompiledBinaryCache(os.path.join(self.root, 'cache'), max_entries=None)
+        self.compiles = 0
+        test = self
+
+        class Executor(CompiledExecutor):
+            ext = 'txt'
+            command = 'cat'
+
+            def get_compile_args(self):
+                return []
+
+            def compile(self):
+                test.compiles += 1
+                if self.source == b'error':
+                    raise CompileError(b'error')
+                with open(self._file(self.problem), 'wb') as f:
+                    f.write(self.source)
+                self.warning = b'warning %d' % test.compiles
+                self._executable = self._file(self.problem)
+                return self._executable
+
+            @classmethod
+            def get_runtime_versions(cls):
+                return [('cat', (1, 0))]
+
+        self.Executor = Executor
+        patches = [
+            mock.patch('dmoj.executors.compiled_executor.get_submission_binary_cache', return_value=self.cache),
+            mock.patch('dmoj.executors.compiled_executor.env', tempdir=self.root),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_reuse(self):
+        first = self.Executor('aplusb', b'source', submission_cached=True)
+        second = self.Executor('aplusb', b'source', submission_cached=True)
+        self.assertEqual(self.compiles, 1)
+        self.assertEqual(second.warning, b'warning 1')
+        self.assertNotEqual(first._dir, second._dir)
+        self.assertEqual(os.path.dirname(second._dir), self.root)
+
+        # Private copies are cleaned up like any other submission.
+        dir = second._dir
+        second.cleanup()
+        self.assertFalse(os.path.exists(dir))
+        self.assertIsNotNone(self.cache.get(hashlib.sha384(first.get_cache_key_material()).hexdigest()))
+
+        self.Executor('aplusb', b'other', submission_cached=True)
+        self.Executor('other', b'source', submission_cached=True)
+        self.assertEqual(self.compiles, 3)
+
+    def test_compile_error(self):
+        for _ in range(2):
+            with self.assertRaises(CompileError):
+                self.Executor('aplusb', b'error', submission_cached=True)
+        self.assertEqual(self.compiles, 2)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertFalse(set(os.listdir(self.cache.root)) - {'index.json', 'index.lock'})
+
+    def test_not_cacheable(self):
+        class Executor(self.Executor):
+            binary_cacheable = False
+
+        for _ in range(2):
+            executor = Executor('aplusb', b'source', submission_cached=True)
+            self.assertFalse(executor.is_cached)
+            self.assertNotEqual(os.path.dirname(executor._dir), self.cache.root)
+
+            dir = executor._dir
+            executor.cleanup()
+            self.assertFalse(os.path.exists(dir))
+        self.assertEqual(self.compiles, 2)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertFalse(set(os.listdir(self.cache.root)) - {'index.json', 'index.lock'})
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from typing import List, Optional
+
+from dmoj.cptbox import PIPE, TracedPopen
+from dmoj.cptbox.cgroup import Cgroup, prepare_cgroup
+from dmoj.cptbox.handlers import ALLOW
+from dmoj.cptbox.isolate import IsolateTracer
+from dmoj.cptbox.syscalls import sys_clock_nanosleep
+from dmoj.executors.base_executor import BASE_FILESYSTEM, BASE_WRITE_FILESYSTEM
+
+
+def find_cgroup_root() -> Optional[str]:
+    try:
+        with open('/proc/self/mounts') as f:
+            mounts = [line.split()[1] for line in f if line.split()[2] == 'cgroup2']
+        with open('/proc/self/cgroup') as f:
+            (own,) = [line.strip()[3:] for line in f if line.startswith('0::')]
+    except (OSError, ValueError):
+        return None
+
+    for mount in mounts:
+        path = os.path.join(mount, own.lstrip('/'))
+        if os.access(path, os.W_OK):
+            return path
+    return None
+
+
+class CgroupTest(unittest.TestCase):
+    def setUp(self):
+        parent = find_cgroup_root()
+        if parent is None:
+            self.skipTest('no writable cgroup v2 directory')
+        self.root = tempfile.mkdtemp(prefix='dmoj-test-', dir=parent)
+        self.addCleanup(os.rmdir, self.root)
+        self.assertTrue(prepare_cgroup(self.root))
+
+    def popen(self, args) -> TracedPopen:
+        executable = shutil.which(args[0])
+        assert executable is not None
+        security = IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM)
+        security[sys_clock_nanosleep] = ALLOW
+        return TracedPopen(
+            [os.fsencode(arg) for arg in args],
+            executable=os.fsencode(executable),
+            security=security,
+            time=10,
+            memory=262144,
+            stdout=PIPE,
+            stderr=PIPE,
+            cgroup=self.root,
+        )
+
+    def read_procs(self, cgroup: Cgroup) -> List[str]:
+        with open(os.path.join(cgroup.path, 'cgroup.procs')) as f:
+            return f.read().split()
+
+    def wait_removed(self, cgroup: Cgroup) -> None:
+        deadline = time.monotonic() + 5
+        while os.path.exists(cgroup.path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(os.path.exists(cgroup.path))
+
+    def test_accounting(self):
+        process = self.popen(['sleep', '0.2'])
+        cgroup = process._cgroup
+        assert cgroup is not None
+        # The child moves itself into the cgroup once it starts running.
+        deadline = time.monotonic() + 5
+        while not self.read_procs(cgroup) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.read_procs(cgroup), [str(process.pid)])
+
+        process.communicate()
+        self.assertEqual(process.returncode, 0)
+        self.assertLess(process.execution_time, 0.2)
+        self.assertGreater(process.max_memory, 0)
+        self.wait_removed(cgroup)
+
+    def test_kill(self):
+        process = self.popen(['sleep', '10'])
+        cgroup = process._cgroup
+        assert cgroup is not None
+
+        start = time.monotonic()
+        process.kill()
+        process.wait()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(process.is_rte)
+        self.wait_removed(cgroup)
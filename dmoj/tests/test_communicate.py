@@ -0,0 +1,46 @@
+import subprocess
+import unittest
+from unittest import mock
+
+from dmoj.error import OutputLimitExceeded
+from dmoj.utils.communicate import safe_communicate
+
+
+def popen(*args):
+    return subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+class SafeCommunicateTest(unittest.TestCase):
+    def test_input(self):
+        # More than fits in a pipe, so that it has to be written while reading the output.
+        input = bytes(range(256)) * 32768
+        proc = popen('head', '-c', '%d' % len(input))
+        stdout, stderr = safe_communicate(proc, input, outlimit=len(input))
+        self.assertEqual(stdout, input)
+        self.assertEqual(stderr, b'')
+        self.assertEqual(proc.returncode, 0)
+
+    def test_no_input(self):
+        proc = popen('sh', '-c', 'cat; echo error >&2')
+        self.assertEqual(safe_communicate(proc), (b'', b'error\n'))
+
+    def test_stdin_closed_early(self):
+        proc = popen('head', '-c', '1')
+        stdout, _ = safe_communicate(proc, b'x' * 4194304)
+        self.assertEqual(stdout, b'x')
+
+    def test_output_limit(self):
+        proc = popen('sh', '-c', 'head -c 1000000 /dev/zero >&2')
+        proc.mark_ole = mock.Mock()
+        with self.assertRaises(OutputLimitExceeded) as context:
+            safe_communicate(proc, outlimit=65536, errlimit=1000)
+        proc.mark_ole.assert_called_once_with()
+        # Only one byte past the limit is read.
+        self.assertIn('exceeded 1000-byte limit on stderr stream.\nFirst 1001 bytes', str(context.exception))
+        proc.kill()
+        proc.wait()
+
+    def test_exact_limit(self):
+        proc = popen('head', '-c', '100000', '/dev/zero')
+        stdout, _ = safe_communicate(proc, outlimit=100000)
+        self.assertEqual(len(stdout), 100000)
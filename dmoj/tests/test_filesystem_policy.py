@@ -1,6 +1,12 @@
 import unittest
 
-from dmoj.cptbox.filesystem_policies import ExactDir, ExactFile, FilesystemPolicy, RecursiveDir
+from dmoj.cptbox.filesystem_policies import (
+    CombinedFilesystemPolicy,
+    ExactDir,
+    ExactFile,
+    FilesystemPolicy,
+    RecursiveDir,
+)
 
 
 class CheckerTest(unittest.TestCase):
@@ -35,6 +41,18 @@ class CheckerTest(unittest.TestCase):
         self.checkFalse('/etc/p')
         self.checkFalse('/etc/passwd2')
 
+    def test_combined(self):
+        self.fs = CombinedFilesystemPolicy(
+            [FilesystemPolicy([ExactDir('/etc'), RecursiveDir('/usr')]), FilesystemPolicy([ExactFile('/etc/passwd')])]
+        )
+
+        self.checkTrue('/etc')
+        self.checkTrue('/etc/passwd')
+        self.checkTrue('/usr/lib')
+
+        self.checkFalse('/')
+        self.checkFalse('/etc/shadow')
+
     def test_path_checks(self):
         self.fs = FilesystemPolicy([])
 
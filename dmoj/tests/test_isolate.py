@@ -0,0 +1,317 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dmoj.cptbox import LANDLOCK_SUPPORTED, PIPE, TracedPopen
+from dmoj.cptbox._cptbox import PTBOX_FS_EXACT
+from dmoj.cptbox.filesystem_policies import (
+    CombinedFilesystemPolicy,
+    ExactDir,
+    ExactFile,
+    FilesystemPolicy,
+    RecursiveDir,
+)
+from dmoj.cptbox.handlers import ALLOW, ArgumentRule, PID
+from dmoj.cptbox.isolate import (
+    ALLOWED_PRCTL_OPTIONS,
+    IsolateTracer,
+    NativeFilesystemPolicy,
+    PTBOX_FS_CHECK_FSTAT,
+    PTBOX_FS_CHECK_OPEN,
+    PTBOX_FS_CHECK_READ,
+    PTBOX_FS_IMMUTABLE,
+    PTBOX_FS_RECURSIVE,
+    PTBOX_LANDLOCK_READ_DIR,
+    PTBOX_LANDLOCK_READ_FILE,
+    PTBOX_LANDLOCK_WRITE_DIR,
+    PTBOX_LANDLOCK_WRITE_FILE,
+    get_landlock_rules,
+    get_native_fs_policies,
+    is_immutable_dir,
+    native_fs_rule,
+)
+from dmoj.cptbox.syscalls import sys_fstatat, sys_kill, sys_openat, sys_prctl, sys_prlimit64, sys_read, sys_stat
+from dmoj.executors.base_executor import BASE_FILESYSTEM, BASE_WRITE_FILESYSTEM
+
+
+class NativeFilesystemPolicyTest(unittest.TestCase):
+    def test_same_as_policy(self):
+        policy = FilesystemPolicy([ExactDir('/etc'), ExactFile('/etc/passwd'), RecursiveDir('/usr'), ExactDir('/dev')])
+        (native,) = get_native_fs_policies(policy)
+
+        for path in [
+            '/',
+            '/etc',
+            '/etc/passwd',
+            '/etc/passwd/x',
+            '/etc/shadow',
+            '/usr',
+            '/usr/lib/a/b',
+            '/us',
+            '/usr2',
+            '/dev',
+            '/dev/null',
+        ]:
+            self.assertEqual(native.check(path), policy.check(path), path)
+
+    def test_root(self):
+        (native,) = get_native_fs_policies(FilesystemPolicy([RecursiveDir('/')]))
+        self.assertTrue(native.check('/'))
+        self.assertTrue(native.check('/etc/passwd'))
+
+    def test_cached(self):
+        first = FilesystemPolicy([RecursiveDir('/usr')])
+        second = FilesystemPolicy([ExactDir('/etc')])
+        self.assertIs(get_native_fs_policies(first)[0], get_native_fs_policies(first)[0])
+        self.assertEqual(
+            get_native_fs_policies(CombinedFilesystemPolicy([first, second])),
+            get_native_fs_policies(first) + get_native_fs_policies(second),
+        )
+
+    def test_subclass(self):
+        class Policy(FilesystemPolicy):
+            def check(self, path):
+                return True
+
+        self.assertIsNone(get_native_fs_policies(Policy([])))
+        self.assertIsNone(get_native_fs_policies(CombinedFilesystemPolicy([FilesystemPolicy([]), Policy([])])))
+
+
+class NativeFilesystemRuleTest(unittest.TestCase):
+    def test_rules(self):
+        tracer = IsolateTracer(read_fs=[], write_fs=[])
+        self.assertEqual(
+            tracer.native_fs_rules[sys_openat],
+            native_fs_rule(PTBOX_FS_CHECK_OPEN, dir_reg=0, file_reg=1, flag_reg=2),
+        )
+        self.assertEqual(tracer.native_fs_rules[sys_stat], native_fs_rule(PTBOX_FS_CHECK_READ, file_reg=0))
+        self.assertEqual(
+            tracer.native_fs_rules[sys_fstatat],
+            native_fs_rule(PTBOX_FS_CHECK_FSTAT, dir_reg=0, file_reg=1, flag_reg=3),
+        )
+        self.assertNotIn(sys_read, tracer.native_fs_rules)
+
+    def test_override(self):
+        tracer = IsolateTracer(read_fs=[], write_fs=[])
+        tracer[sys_openat] = ALLOW
+        self.assertNotIn(sys_openat, tracer.native_fs_rules)
+
+        tracer[sys_stat] = lambda debugger: None
+        self.assertNotIn(sys_stat, tracer.native_fs_rules)
+
+    def test_encoding(self):
+        self.assertEqual(native_fs_rule(PTBOX_FS_CHECK_READ, file_reg=0), PTBOX_FS_CHECK_READ)
+        self.assertEqual(
+            native_fs_rule(PTBOX_FS_CHECK_OPEN, dir_reg=0, file_reg=1, flag_reg=2),
+            PTBOX_FS_CHECK_OPEN | 1 << 4 | 1 << 8 | 3 << 12,
+        )
+
+    def test_policies(self):
+        tracer = IsolateTracer(read_fs=[RecursiveDir('/usr')], write_fs=[])
+        read_fs, write_fs = tracer.get_native_fs_policies()
+        self.assertTrue(any(policy.check('/usr/lib') for policy in read_fs))
+        self.assertFalse(any(policy.check('/usr/lib') for policy in write_fs))
+
+        # Paths that need their case fixed must go through Python.
+        tracer = IsolateTracer(read_fs=[], write_fs=[], path_case_fixes=['/tmp/input.txt'])
+        self.assertIsNone(tracer.get_native_fs_policies())
+
+
+class NativeArgumentRuleTest(unittest.TestCase):
+    def test_rules(self):
+        tracer = IsolateTracer(read_fs=[], write_fs=[])
+        self.assertEqual(tracer.native_arg_rules[sys_kill], ArgumentRule(arg0={PID}))
+        self.assertEqual(tracer.native_arg_rules[sys_prlimit64], ArgumentRule(arg0={0, PID}))
+        self.assertEqual(tracer.native_arg_rules[sys_prctl], ArgumentRule(arg0=ALLOWED_PRCTL_OPTIONS))
+
+        tracer[sys_kill] = lambda debugger: None
+        self.assertNotIn(sys_kill, tracer.native_arg_rules)
+
+    def test_kill(self):
+        sh = shutil.which('sh')
+        assert sh is not None
+        # The shell's own pid is allowed natively, while anything else is still denied by the handler.
+        process = TracedPopen(
+            [b'sh', b'-c', b'kill -0 $$ && echo self; kill -0 1 || echo other'],
+            executable=os.fsencode(sh),
+            security=IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM),
+            time=10,
+            memory=262144,
+            stdout=PIPE,
+            stderr=PIPE,
+        )
+        stdout, _ = process.communicate()
+        self.assertIsNone(process.protection_fault)
+        self.assertEqual(stdout, b'self\nother\n')
+
+
+class NativeFilesystemCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.ro, self.rw, self.secret = (os.path.join(self.root, name) for name in ('ro', 'rw', 'secret'))
+        for dir in (self.ro, self.rw, self.secret, os.path.join(self.ro, 'lib')):
+            os.mkdir(dir)
+        for file in (os.path.join(self.ro, 'lib', 'a.so'), os.path.join(self.secret, 'key')):
+            open(file, 'w').close()
+
+        self.policy = NativeFilesystemPolicy(
+            [(self.ro, PTBOX_FS_RECURSIVE | PTBOX_FS_IMMUTABLE), (self.rw, PTBOX_FS_RECURSIVE)]
+        )
+
+    def symlink(self, target, path):
+        if os.path.lexists(path):
+            os.unlink(path)
+        os.symlink(target, path)
+
+    def test_cached(self):
+        path = os.path.join(self.ro, 'lib', 'a.so')
+        self.assertTrue(self.policy.check_path(path))
+        self.assertTrue(self.policy.check_path(path))
+        self.assertTrue(self.policy.check_path(os.path.join(self.ro, 'lib', 'missing.so')))
+        self.assertEqual(self.policy.cache_size, 2)
+
+        self.assertFalse(self.policy.check_path(os.path.join(self.secret, 'key')))
+        self.assertFalse(self.policy.check_path('/proc/self/maps'))
+        self.assertEqual(self.policy.cache_size, 2)
+
+    def test_not_cached(self):
+        # Writable directories, and paths that aren't normalized.
+        self.symlink(os.path.join(self.ro, 'lib', 'a.so'), os.path.join(self.rw, 'a.so'))
+        self.assertTrue(self.policy.check_path(os.path.join(self.rw, 'a.so')))
+        self.assertTrue(self.policy.check_path(os.path.join(self.ro, 'lib', '..', 'lib', 'a.so')))
+
+        # Symlinks that leave the immutable directories, even if they come back.
+        self.symlink(os.path.join(self.rw, 'a.so'), os.path.join(self.ro, 'a.so'))
+        self.assertTrue(self.policy.check_path(os.path.join(self.ro, 'a.so')))
+        self.assertEqual(self.policy.cache_size, 0)
+
+    def test_cached_on_granting_policy(self):
+        # The parents of an immutable directory are immutable too, but the base policy doesn't allow them, so must not
+        # remember them as allowed for processes that only have the base policy.
+        base = NativeFilesystemPolicy([(os.path.join(self.ro, 'lib'), PTBOX_FS_RECURSIVE | PTBOX_FS_IMMUTABLE)])
+        extra = NativeFilesystemPolicy([(self.ro, PTBOX_FS_EXACT)])
+        self.assertTrue(base.check_path(self.ro, extra))
+        self.assertFalse(base.check_path(self.ro))
+        self.assertEqual(base.cache_size, 0)
+
+    def test_symlink_swapped(self):
+        link = os.path.join(self.ro, 'link.so')
+        self.symlink(os.path.join(self.ro, 'lib', 'a.so'), link)
+        self.assertTrue(self.policy.check_path(link))
+        self.assertEqual(self.policy.cache_size, 1)
+
+        self.symlink(os.path.join(self.secret, 'key'), link)
+        self.assertFalse(self.policy.check_path(link))
+
+    def test_missing_created(self):
+        path = os.path.join(self.ro, 'lib', 'b.so')
+        self.assertTrue(self.policy.check_path(path))
+        self.symlink(os.path.join(self.secret, 'key'), path)
+        self.assertFalse(self.policy.check_path(path))
+
+    def test_replaced(self):
+        path = os.path.join(self.ro, 'lib', 'a.so')
+        self.assertTrue(self.policy.check_path(path))
+        os.unlink(path)
+        os.mkdir(path)
+        self.assertTrue(self.policy.check_path(path))
+        self.assertEqual(self.policy.cache_size, 1)
+
+    def test_immutable_dirs(self):
+        with mock.patch('dmoj.cptbox.isolate.IMMUTABLE_DIRS', ['/usr', '/opt']), mock.patch(
+            'dmoj.judgeenv.env', tempdir='/opt/judge/tmp', compiled_binary_cache_dir=None
+        ):
+            self.assertTrue(is_immutable_dir('/usr'))
+            self.assertTrue(is_immutable_dir('/usr/lib'))
+            self.assertTrue(is_immutable_dir('/opt/java'))
+            self.assertFalse(is_immutable_dir('/usr2'))
+            self.assertFalse(is_immutable_dir('/etc'))
+            self.assertFalse(is_immutable_dir('/opt'))
+            self.assertFalse(is_immutable_dir('/opt/judge/tmp/submission'))
+
+    def test_policies(self):
+        policy = FilesystemPolicy([RecursiveDir(self.ro), RecursiveDir(self.rw)])
+        with mock.patch('dmoj.cptbox.isolate.is_immutable_dir', side_effect=lambda path: path == self.ro):
+            (native,) = get_native_fs_policies(policy)
+
+        self.assertTrue(native.check_path(os.path.join(self.ro, 'lib', 'a.so')))
+        self.assertTrue(native.check_path(os.path.join(self.rw, 'a.so')))
+        self.assertEqual(native.cache_size, 1)
+
+
+class LandlockRuleTest(unittest.TestCase):
+    def test_rules(self):
+        policy = FilesystemPolicy([ExactFile('/etc/passwd'), RecursiveDir('/usr'), ExactDir('/dev')])
+        self.assertCountEqual(
+            get_landlock_rules(policy, write=False),
+            [('/etc/passwd', PTBOX_LANDLOCK_READ_FILE), ('/usr', PTBOX_LANDLOCK_READ_DIR)],
+        )
+        self.assertCountEqual(
+            get_landlock_rules(policy, write=True),
+            [('/etc/passwd', PTBOX_LANDLOCK_WRITE_FILE), ('/usr', PTBOX_LANDLOCK_WRITE_DIR)],
+        )
+
+    def test_proc_pid(self):
+        # /proc/self is resolved to the judge's own pid, which the submission must not get.
+        policy = FilesystemPolicy([RecursiveDir('/proc/%d/fd' % os.getpid()), ExactFile('/proc/meminfo')])
+        self.assertEqual(get_landlock_rules(policy, write=False), [('/proc/meminfo', PTBOX_LANDLOCK_READ_FILE)])
+
+    def test_combined(self):
+        first = FilesystemPolicy([RecursiveDir('/usr')])
+        second = FilesystemPolicy([ExactFile('/etc/passwd')])
+        self.assertEqual(
+            get_landlock_rules(CombinedFilesystemPolicy([first, second]), write=False),
+            get_landlock_rules(first, write=False) + get_landlock_rules(second, write=False),
+        )
+
+        class Policy(FilesystemPolicy):
+            def check(self, path):
+                return True
+
+        self.assertIsNone(get_landlock_rules(CombinedFilesystemPolicy([first, Policy([])]), write=False))
+
+    def test_tracer(self):
+        tracer = IsolateTracer(read_fs=[RecursiveDir('/usr')], write_fs=[ExactFile('/dev/null')])
+        self.assertCountEqual(
+            tracer.get_landlock_rules(),
+            [('/usr', PTBOX_LANDLOCK_READ_DIR), ('/dev/null', PTBOX_LANDLOCK_WRITE_FILE)],
+        )
+
+        tracer = IsolateTracer(read_fs=[], write_fs=[], path_case_fixes=['/tmp/input.txt'])
+        self.assertIsNone(tracer.get_landlock_rules())
+
+
+@unittest.skipUnless(LANDLOCK_SUPPORTED, 'Landlock is not supported')
+class LandlockTest(unittest.TestCase):
+    def test_same_as_ptrace(self):
+        head = shutil.which('head')
+        assert head is not None
+        allowed = os.path.realpath(head)
+        with tempfile.TemporaryDirectory() as dir:
+            denied = os.path.join(dir, 'denied')
+            with open(denied, 'w') as f:
+                f.write('secret')
+
+            results = []
+            for landlock in (False, True):
+                process = TracedPopen(
+                    [b'head', b'-c', b'4', os.fsencode(allowed), os.fsencode(denied)],
+                    executable=os.fsencode(head),
+                    security=IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM),
+                    time=10,
+                    memory=262144,
+                    stdout=PIPE,
+                    stderr=PIPE,
+                    landlock=landlock,
+                )
+                stdout, stderr = process.communicate()
+                self.assertEqual(process.uses_landlock, landlock)
+                self.assertEqual(process.returncode, 1)
+                self.assertIn(os.strerror(errno.EACCES).encode(), stderr)
+                self.assertNotIn(b'secret', stdout)
+                results.append((stdout, stderr))
+            self.assertEqual(results[0], results[1])
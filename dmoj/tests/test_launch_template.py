@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dmoj.cptbox.filesystem_policies import CombinedFilesystemPolicy, ExactFile
+from dmoj.cptbox.handlers import ALLOW
+from dmoj.cptbox.syscalls import sys_fork, sys_wait4
+from dmoj.executors.base_executor import BaseExecutor, install_agent
+
+
+class Executor(BaseExecutor):
+    ext = 'txt'
+    syscalls = ['fork', ('wait4', ALLOW)]
+
+    def create_files(self, problem_id, source_code, *args, **kwargs):
+        self._file('main')
+
+
+class LaunchTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        # setbufsize.so is only built by setup.py, so use a stand-in.
+        self.setbufsize_path = os.path.join(self.root, 'setbufsize.so')
+        with open(self.setbufsize_path, 'wb') as f:
+            f.write(b'agent')
+        patch = mock.patch('dmoj.executors.base_executor.setbufsize_path', self.setbufsize_path)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.executor = Executor('test', b'', dest_dir=self.root)
+        self.executor.create_files('test', b'')
+
+    def test_template_reused(self):
+        first = self.executor.get_security()
+        second = self.executor.get_security(launch_kwargs={'path_whitelist': ['/dev/fd/3']})
+        self.assertIsNot(first, second)
+        self.assertIs(first.read_fs_jail, second.read_fs_jail)
+        self.assertIs(first.write_fs_jail, second.write_fs_jail)
+        self.assertEqual(second[sys_fork], ALLOW)
+        self.assertEqual(second[sys_wait4], ALLOW)
+
+        self.assertTrue(first.read_fs_jail.check(self.executor._dir))
+        self.assertFalse(first.read_fs_jail.check('/etc/passwd'))
+
+    def test_extra_fs(self):
+        extra = os.path.join(self.root, 'input')
+        open(extra, 'w').close()
+
+        template = self.executor.get_launch_template()
+        sec = self.executor.get_security(extra_fs=[ExactFile(extra)])
+        self.assertIsInstance(sec.read_fs_jail, CombinedFilesystemPolicy)
+        self.assertTrue(sec.read_fs_jail.check(extra))
+        self.assertFalse(template.read_fs_jail.check(extra))
+        self.assertIs(self.executor.get_launch_template(), template)
+
+    def test_agent(self):
+        agent = self.executor.get_launch_template().agent
+        self.assertEqual(os.path.dirname(agent), self.executor._dir)
+        with open(agent, 'rb') as f, open(self.setbufsize_path, 'rb') as expected:
+            self.assertEqual(f.read(), expected.read())
+
+        # An up-to-date agent is left alone, and anything else is replaced rather than rewritten.
+        inode = os.stat(agent).st_ino
+        install_agent(agent)
+        self.assertEqual(os.stat(agent).st_ino, inode)
+
+        with open(agent, 'wb') as f:
+            f.write(b'stale')
+        install_agent(agent)
+        self.assertNotEqual(os.stat(agent).st_ino, inode)
+        self.assertEqual(os.path.getsize(agent), os.path.getsize(self.setbufsize_path))
@@ -1,18 +1,25 @@
 import unittest
 from io import BytesIO
+from unittest import mock
 
-from dmoj.utils.normalize import normalized_file_copy
+from dmoj.utils import normalize
+from dmoj.utils.normalize import normalized_bytes, normalized_file_copy
 
 TEST_CASE = b'a\r\n\r\r\nb\r\r\nc\nd\n'
 TEST_CASE_NO_NEWLINE = b'a\r\n\r\r\nb\r\r\nc\nd'
 TEST_CASE_TRAILING_R = b'a\r\n\r\r\nb\r\r\nc\nd\r'
 RESULT = b'a\n\n\nb\n\nc\nd\n'
 
+try:
+    from dmoj.utils._normalize import normalize_newlines as native_normalize_newlines
+except ImportError:
+    native_normalize_newlines = None
+
 
 class TestNormalizedCopy(unittest.TestCase):
     def test_simple(self):
         with BytesIO(TEST_CASE) as src, BytesIO() as dst:
-            normalized_file_copy(src, dst)
+            self.assertFalse(normalized_file_copy(src, dst))
             self.assertEqual(dst.getvalue(), RESULT)
 
     def test_newline_add(self):
@@ -54,3 +61,66 @@ class TestNormalizedCopy(unittest.TestCase):
         with BytesIO(TEST_CASE_TRAILING_R) as src, BytesIO() as dst:
             normalized_file_copy(src, dst, block_size=len(TEST_CASE_TRAILING_R))
             self.assertEqual(dst.getvalue(), RESULT)
+
+    def test_every_block_size(self):
+        for block_size in range(1, len(TEST_CASE) + 1):
+            with BytesIO(TEST_CASE) as src, BytesIO() as dst:
+                normalized_file_copy(src, dst, block_size=block_size)
+                self.assertEqual(dst.getvalue(), RESULT, f'block_size={block_size}')
+
+    def test_already_normalized(self):
+        with BytesIO(RESULT) as src, BytesIO() as dst:
+            self.assertTrue(normalized_file_copy(src, dst, block_size=3))
+            self.assertEqual(dst.getvalue(), RESULT)
+
+    def test_empty(self):
+        with BytesIO(b'') as src, BytesIO() as dst:
+            self.assertTrue(normalized_file_copy(src, dst))
+            self.assertEqual(dst.getvalue(), b'')
+
+
+class TestNormalizedBytes(unittest.TestCase):
+    def test_simple(self):
+        self.assertEqual(normalized_bytes(TEST_CASE), RESULT)
+        self.assertEqual(normalized_bytes(TEST_CASE_NO_NEWLINE), RESULT)
+        self.assertEqual(normalized_bytes(TEST_CASE_TRAILING_R), RESULT)
+
+    def test_no_copy(self):
+        self.assertIs(normalized_bytes(RESULT), RESULT)
+
+
+class NormalizeNewlinesTestMixin:
+    def test_no_cr(self):
+        self.assertEqual(self.normalize_newlines(b'a\nb'), (b'a\nb', False, False))
+
+    def test_crlf(self):
+        self.assertEqual(self.normalize_newlines(b'a\r\nb\rc\r'), (b'a\nb\nc\n', True, True))
+
+    def test_skip_lf(self):
+        self.assertEqual(self.normalize_newlines(b'\na', skip_lf=True), (b'a', False, True))
+        self.assertEqual(self.normalize_newlines(b'a\n', skip_lf=True), (b'a\n', False, False))
+
+    def test_final(self):
+        self.assertEqual(self.normalize_newlines(b'a', final=True), (b'a\n', False, True))
+        self.assertEqual(self.normalize_newlines(b'a\r', final=True), (b'a\n', True, True))
+        self.assertEqual(self.normalize_newlines(b'', final=True), (b'', False, False))
+
+    def test_buffer_types(self):
+        self.assertEqual(self.normalize_newlines(bytearray(b'a\r\n'))[0], b'a\n')
+        self.assertEqual(self.normalize_newlines(memoryview(b'a\n'))[0], b'a\n')
+
+
+class TestPythonNormalizeNewlines(NormalizeNewlinesTestMixin, unittest.TestCase):
+    normalize_newlines = staticmethod(normalize._normalize_newlines)
+
+
+@unittest.skipIf(native_normalize_newlines is None, 'native _normalize module not compiled')
+class TestNativeNormalizeNewlines(NormalizeNewlinesTestMixin, unittest.TestCase):
+    normalize_newlines = staticmethod(native_normalize_newlines)
+
+
+class TestPythonNormalizedCopy(TestNormalizedCopy):
+    def setUp(self):
+        patcher = mock.patch('dmoj.utils.normalize.normalize_newlines', normalize._normalize_newlines)
+        patcher.start()
+        self.addCleanup(patcher.stop)
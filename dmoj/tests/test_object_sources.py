@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dmoj.executors.binary_cache import CompiledBinaryCache
+
+
+class ObjectSourcesTest(unittest.TestCase):
+    def setUp(self):
+        from dmoj.executors.CPP17 import Executor
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache = CompiledBinaryCache(os.path.join(self.root, 'cache'))
+        self.compiles = []
+
+        def create_compile_process(executor, args):
+            self.compiles.append((args, executor.get_compiler_read_fs()))
+            with open(args[-1], 'wb') as f:
+                f.write(b'binary')
+            return None
+
+        self.Executor = type('Executor', (Executor,), {'runtime_dict': {'g++17': '/usr/bin/g++'}})
+        self.Executor.__module__ = Executor.__module__
+        patches = [
+            mock.patch('dmoj.executors.compiled_executor.get_binary_cache', return_value=self.cache),
+            mock.patch('dmoj.executors.compiled_executor.env', tempdir=self.root),
+            mock.patch.object(self.Executor, 'create_compile_process', create_compile_process),
+            mock.patch.object(self.Executor, 'get_compile_output', return_value=b''),
+            mock.patch.object(self.Executor, 'get_runtime_versions', return_value=[('g++17', (12, 2))]),
+            mock.patch.object(self.Executor, 'get_precompiled_header_dir', return_value=None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def compile(self, submission, entry=b'int main() { solve(); }'):
+        return self.Executor(
+            'siggrade',
+            b'',
+            aux_sources={'siggrade_submission': submission, 'grader.h': b'void solve();'},
+            object_sources={'siggrade_entry': entry},
+            defines=['-DSIGNATURE_GRADER'],
+        )
+
+    def test_object_compiled_once(self):
+        self.compile(b'void solve() {}')
+        self.compile(b'void solve() { return; }')
+        self.assertEqual(len(self.compiles), 3)
+
+        (object_args, _), (link_args, link_fs), _ = self.compiles
+        self.assertEqual(object_args[2:4], ['siggrade_entry.cpp', 'grader.h'])
+        self.assertIn('-DSIGNATURE_GRADER', object_args)
+        self.assertEqual(object_args[-4:-1], ['-r', '-nostdlib', '-o'])
+
+        object_file = object_args[-1]
+        self.assertEqual(os.path.dirname(os.path.dirname(object_file)), self.cache.root)
+        self.assertEqual(link_args[2:5], ['siggrade_submission.cpp', 'grader.h', object_file])
+        self.assertIn('-s', link_args)
+        self.assertIn(object_file, [rule.path for rule in link_fs])
+
+    def test_entry_change(self):
+        self.compile(b'void solve() {}')
+        self.compile(b'void solve() {}', entry=b'int main() { solve(); solve(); }')
+        self.assertEqual(len(self.compiles), 4)
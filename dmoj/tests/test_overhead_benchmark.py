@@ -0,0 +1,24 @@
+import unittest
+
+from dmoj.benchmarks.overhead import find_regressions
+
+
+def result(benchmark, overhead_ms, status='ok'):
+    return {'language': 'C', 'benchmark': benchmark, 'status': status, 'overhead_ms': overhead_ms}
+
+
+class FindRegressionsTest(unittest.TestCase):
+    def test_overhead(self):
+        baseline = [result('open', 10), result('io', 0.2)]
+        self.assertEqual(find_regressions([result('open', 12), result('io', 1)], baseline, 0.25, 1), [])
+        self.assertEqual(len(find_regressions([result('open', 14), result('io', 1)], baseline, 0.25, 1)), 1)
+        self.assertEqual(len(find_regressions([result('open', 10), result('io', 2)], baseline, 0.25, 1)), 1)
+
+    def test_status(self):
+        baseline = [result('fork', 1, 'protection fault: sys_wait4'), result('thread', 1)]
+        current = [result('fork', 1, 'protection fault: sys_wait4'), result('thread', 1, 'returncode 1')]
+        self.assertEqual(find_regressions(current, baseline, 0.25, 1), ['C thread: returncode 1'])
+
+    def test_new_benchmark(self):
+        unavailable = {'language': 'JAVA', 'benchmark': 'startup', 'status': 'unavailable: Could not find JVM'}
+        self.assertEqual(find_regressions([result('open', 100)], [unavailable], 0.25, 1), [])
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from dmoj.error import CompileError
+from dmoj.executors.binary_cache import CompiledBinaryCache
+from dmoj.executors.c_like_executor import ClangMixin, GCCMixin, PCH_HEADER
+
+
+def uses_precompiled_header(mixin, *sources):
+    executor = SimpleNamespace(pch_header=PCH_HEADER, source_dict={str(i): source for i, source in enumerate(sources)})
+    return mixin.uses_precompiled_header(executor)
+
+
+class PrecompiledHeaderTest(unittest.TestCase):
+    def test_gcc_detection(self):
+        self.assertTrue(uses_precompiled_header(GCCMixin, b'#include <bits/stdc++.h>\nint main() {}'))
+        self.assertTrue(uses_precompiled_header(GCCMixin, b'#define int long long\n  # include<bits/stdc++.h>\n'))
+        self.assertTrue(uses_precompiled_header(GCCMixin, b'#include "grader.h"\n', b'#include <bits/stdc++.h>\n'))
+        self.assertFalse(uses_precompiled_header(GCCMixin, b'#include <iostream>\nint main() {}'))
+        self.assertFalse(uses_precompiled_header(GCCMixin, b'// #include <bits/stdc++.h>\n'))
+        self.assertFalse(uses_precompiled_header(GCCMixin, b'#include <bits/stdc++.hpp>\n'))
+
+    def test_clang_detection(self):
+        self.assertTrue(uses_precompiled_header(ClangMixin, b'#include <bits/stdc++.h>\nint main() {}'))
+        self.assertTrue(uses_precompiled_header(ClangMixin, b'// header\n/* multi\nline */\n#include <bits/stdc++.h>'))
+        self.assertFalse(uses_precompiled_header(ClangMixin, b'#define int long long\n#include <bits/stdc++.h>\n'))
+        self.assertFalse(uses_precompiled_header(ClangMixin, b'#pragma GCC optimize("O3")\n#include <bits/stdc++.h>'))
+        self.assertFalse(uses_precompiled_header(ClangMixin, b'#include <bits/stdc++.h>\n', b'#include "grader.h"\n'))
+
+
+class BuildPrecompiledHeaderTest(unittest.TestCase):
+    def setUp(self):
+        from dmoj.executors.CPP17 import Executor
+
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.cache = CompiledBinaryCache(os.path.join(self.root, 'pch'))
+        self.compiles = []
+        self.fail_build = False
+
+        def create_compile_process(executor, args):
+            self.compiles.append((args, executor.get_compiler_read_fs()))
+            with open(args[-1], 'wb') as f:
+                f.write(b'binary')
+            return None
+
+        def get_compile_output(executor, process):
+            if self.fail_build and '-x' in self.compiles[-1][0]:
+                raise CompileError(b'broken')
+            return b''
+
+        self.Executor = type('Executor', (Executor,), {'runtime_dict': {'g++17': '/usr/bin/g++'}})
+        self.Executor.__module__ = Executor.__module__
+        patches = [
+            mock.patch('dmoj.executors.c_like_executor.get_precompiled_header_cache', return_value=self.cache),
+            mock.patch('dmoj.executors.c_like_executor._pch_failures', set()),
+            mock.patch('dmoj.executors.c_like_executor.env', precompiled_headers=True),
+            mock.patch.object(self.Executor, 'create_compile_process', create_compile_process),
+            mock.patch.object(self.Executor, 'get_compile_output', get_compile_output),
+            mock.patch.object(self.Executor, 'get_runtime_versions', return_value=[('g++17', (12, 2))]),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def compile(self, source=b'#include <bits/stdc++.h>\nint main() {}'):
+        executor = self.Executor('aplusb', source)
+        self.addCleanup(executor.cleanup)
+        return executor
+
+    def test_build(self):
+        first = self.compile()
+        second = self.compile()
+        self.assertEqual(len(self.compiles), 3)
+        (build_args, _), (first_args, _), (second_args, second_fs) = self.compiles
+
+        self.assertEqual(build_args[2:4], ['-x', 'c++-header'])
+        self.assertTrue(build_args[-3].startswith(first._dir))
+        self.assertEqual(sorted(os.listdir(first._dir)), sorted(first.source_paths + ['aplusb']))
+
+        pch_dir = second_args[second_args.index('-I') + 1]
+        self.assertEqual(first_args, [arg.replace(second._dir, first._dir) for arg in second_args])
+        self.assertEqual(os.path.dirname(pch_dir), self.cache.root)
+        self.assertTrue(os.path.isfile(os.path.join(pch_dir, 'bits', 'stdc++.h.gch')))
+        self.assertIn(pch_dir, [rule.path for rule in second_fs])
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_build_failure(self):
+        self.fail_build = True
+        with self.assertLogs('dmoj.executors.c_like_executor', 'ERROR'):
+            first = self.compile()
+        self.compile()
+        self.assertEqual(len(self.compiles), 3)
+        self.assertNotIn('-I', self.compiles[2][0])
+        self.assertEqual(sorted(os.listdir(first._dir)), sorted(first.source_paths + ['aplusb']))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_unused(self):
+        self.compile(b'#include <iostream>\nint main() {}')
+        with mock.patch('dmoj.executors.c_like_executor.env', precompiled_headers=False):
+            self.compile()
+        self.assertEqual(len(self.compiles), 2)
+        self.assertFalse(any('-I' in args for args, _ in self.compiles))
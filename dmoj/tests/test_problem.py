@@ -1,4 +1,5 @@
 import os
+import tempfile
 import unittest
 from unittest import mock
 
@@ -111,5 +112,25 @@ class ProblemTest(unittest.TestCase):
             with self.assertRaisesRegex(InvalidInitException, 'No test cases'):
                 MockProblem('test', 2, 16384, {})
 
+    def test_output_data_io(self):
+        with tempfile.TemporaryDirectory() as root, mock.patch('dmoj.problem.get_problem_root', return_value=root):
+            for name, data in (('1.in', b'1 2\n'), ('1.out', b'3\r\n4')):
+                with open(os.path.join(root, name), 'wb') as f:
+                    f.write(data)
+            self.problem_data = ProblemDataManager(root)
+            self.problem_data.update({'init.yml': 'test_cases: [{in: 1.in, out: 1.out, points: 1}]'})
+            case = Problem('test', 2, 16384, {}).cases()[0]
+
+            output = case.output_data_io()
+            self.assertEqual(output.to_bytes(), case.output_data())
+            self.assertEqual(output.to_bytes(), b'3\n4\n')
+            self.assertIs(case.output_data_io(), output)
+            with open(output.to_path(), 'rb') as f:
+                self.assertEqual(f.read(), b'3\n4\n')
+
+            case.free_data()
+            self.assertTrue(output.closed)
+            self.assertIsNot(case.output_data_io(), output)
+
     def tearDown(self):
         self.data_patch.stop()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dmoj import judgeenv
+
+
+class ProblemIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.first = os.path.join(self.root, 'first')
+        self.second = os.path.join(self.root, 'second')
+        os.mkdir(self.first)
+        os.mkdir(self.second)
+
+        globs = [os.path.join(self.first, '*'), os.path.join(self.second, '**/')]
+        cache = judgeenv.StorageNamespaceCache()
+        cache.problem_root_cache = {}
+        patchers = [
+            mock.patch.object(judgeenv, 'problem_globs', globs),
+            mock.patch.dict(judgeenv._storage_namespace_cache, {None: cache}),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_problem(self, root, problem):
+        problem_dir = os.path.join(root, problem)
+        os.makedirs(problem_dir, exist_ok=True)
+        with open(os.path.join(problem_dir, 'init.yml'), 'w'):
+            pass
+        return problem_dir
+
+    def problem_ids(self, problems):
+        return sorted(problem for problem, _ in problems)
+
+    def full_scan(self):
+        return judgeenv.get_supported_problems_and_mtimes(warnings=False, force_update=True)
+
+    def update(self, *paths):
+        with mock.patch.object(
+            judgeenv, 'get_supported_problems_and_mtimes', wraps=judgeenv.get_supported_problems_and_mtimes
+        ) as full_scan:
+            problems = judgeenv.update_supported_problems(paths, warnings=False)
+        self.assertEqual(self.problem_ids(problems), self.problem_ids(self.full_scan()))
+        return problems, full_scan.called
+
+    def test_add_and_remove(self):
+        self.make_problem(self.first, 'a')
+        self.full_scan()
+
+        b = self.make_problem(self.first, 'b')
+        problems, full_scan = self.update(os.path.join(b, 'init.yml'))
+        self.assertEqual(self.problem_ids(problems), ['a', 'b'])
+        self.assertFalse(full_scan)
+        self.assertEqual(judgeenv.get_problem_root('b'), b)
+
+        shutil.rmtree(b)
+        problems, full_scan = self.update(b, os.path.join(b, 'init.yml'))
+        self.assertEqual(self.problem_ids(problems), ['a'])
+        self.assertFalse(full_scan)
+
+    def test_change_inside_problem(self):
+        a = self.make_problem(self.second, 'a')
+        os.mkdir(os.path.join(a, 'tests'))
+        self.full_scan()
+
+        problems, full_scan = self.update(os.path.join(a, 'tests', '1.in'))
+        self.assertEqual(self.problem_ids(problems), ['a'])
+        self.assertFalse(full_scan)
+
+    def test_nested_problem(self):
+        self.full_scan()
+        nested = self.make_problem(os.path.join(self.second, 'group'), 'nested')
+        problems, full_scan = self.update(nested)
+        self.assertEqual(self.problem_ids(problems), ['nested'])
+        self.assertFalse(full_scan)
+
+    def test_config_inside_problem(self):
+        problem = self.make_problem(self.first, 'problem')
+        self.full_scan()
+        # `*` doesn't match across directories, so this isn't a problem of its own.
+        nested = self.make_problem(problem, 'sub')
+        problems, _ = self.update(nested)
+        self.assertEqual(self.problem_ids(problems), ['problem'])
+
+    def test_duplicate(self):
+        first_a = self.make_problem(self.first, 'a')
+        self.full_scan()
+
+        second_a = self.make_problem(self.second, 'a')
+        problems, _ = self.update(second_a)
+        self.assertEqual(judgeenv.get_problem_root('a'), first_a)
+
+        shutil.rmtree(first_a)
+        problems, full_scan = self.update(first_a)
+        self.assertEqual(self.problem_ids(problems), ['a'])
+        self.assertFalse(full_scan)
+        self.assertEqual(judgeenv.get_problem_root('a'), second_a)
+
+    def test_directory_moved_away(self):
+        group = os.path.join(self.second, 'group')
+        self.make_problem(group, 'a')
+        self.make_problem(group, 'b')
+        self.make_problem(self.second, 'c')
+        self.full_scan()
+
+        shutil.move(group, os.path.join(self.root, 'elsewhere'))
+        problems, full_scan = self.update(group)
+        self.assertEqual(self.problem_ids(problems), ['c'])
+        self.assertFalse(full_scan)
+
+    def test_directory_moved_in(self):
+        self.full_scan()
+        staging = os.path.join(self.root, 'staging')
+        self.make_problem(staging, 'a')
+        self.make_problem(staging, 'b')
+
+        group = os.path.join(self.second, 'group')
+        shutil.move(staging, group)
+        problems, full_scan = self.update(group)
+        self.assertEqual(self.problem_ids(problems), ['a', 'b'])
+        self.assertTrue(full_scan)
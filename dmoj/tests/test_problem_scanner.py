@@ -0,0 +1,89 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from dmoj.utils.problem_scanner import ProblemScanner, load_snapshot, matches_glob, save_snapshot
+
+
+class ProblemScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.scanner = ProblemScanner(threads=4)
+
+        for problem in ('a', 'b', 'group/c', 'group/deeper/d', '.hidden/e', 'a/tests/f'):
+            self.make_problem(problem)
+        os.makedirs(os.path.join(self.root, 'empty', 'dir'))
+        os.makedirs(os.path.join(self.root, 'unreadable'))
+        open(os.path.join(self.root, 'unreadable', 'init.yml'), 'w').close()
+        os.chmod(os.path.join(self.root, 'unreadable', 'init.yml'), 0)
+
+    def make_problem(self, problem):
+        problem_dir = os.path.join(self.root, problem)
+        os.makedirs(problem_dir, exist_ok=True)
+        open(os.path.join(problem_dir, 'init.yml'), 'w').close()
+        return problem_dir
+
+    def glob_problems(self, problem_glob):
+        return sorted(
+            os.path.dirname(config)
+            for config in glob.iglob(os.path.join(problem_glob, 'init.yml'), recursive=True)
+            if os.access(config, os.R_OK)
+        )
+
+    def scan_problems(self, problem_globs):
+        return [problem_dir for problem_dir, _ in self.scanner.scan(problem_globs).problems]
+
+    def test_matches_glob(self):
+        for pattern in ('*', '**/', 'group/*', 'gr*/**', '*/deeper/*', 'a', '.hidden/*', 'missing/*'):
+            with self.subTest(pattern=pattern):
+                problem_glob = os.path.join(self.root, pattern)
+                self.assertEqual(self.scan_problems([problem_glob]), self.glob_problems(problem_glob))
+
+    def test_matches_glob_path(self):
+        problem_dirs = [
+            dir for dir, _, files in os.walk(self.root) if 'init.yml' in files and os.access(dir + '/init.yml', os.R_OK)
+        ]
+        for pattern in ('*', '**/', 'group/*', 'gr*/**', '*/deeper/*', 'a', '.hidden/*', 'missing/*'):
+            with self.subTest(pattern=pattern):
+                problem_glob = os.path.join(self.root, pattern)
+                matched = sorted(dir for dir in problem_dirs if matches_glob(dir, problem_glob))
+                self.assertEqual(matched, self.glob_problems(problem_glob))
+
+    def test_glob_order(self):
+        first, second = os.path.join(self.root, 'group/*'), os.path.join(self.root, '*')
+        self.assertEqual(self.scan_problems([first, second]), self.glob_problems(first) + self.glob_problems(second))
+
+    def test_mtimes(self):
+        for problem_dir, mtime in self.scanner.scan([os.path.join(self.root, '**/')]).problems:
+            self.assertEqual(mtime, os.path.getmtime(problem_dir))
+
+    def test_snapshot(self):
+        problem_globs = [os.path.join(self.root, '*'), os.path.join(self.root, 'group/**/')]
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        snapshot_file = os.path.join(snapshot_dir, 'snapshot.json')
+        result = self.scanner.scan(problem_globs)
+        save_snapshot(snapshot_file, problem_globs, result)
+        snapshot = load_snapshot(snapshot_file)
+
+        self.assertEqual(self.scanner.validate(problem_globs, snapshot), result)
+        self.assertIsNone(self.scanner.validate(problem_globs[:1], snapshot))
+
+        # Changes inside problems don't invalidate the snapshot, but are reflected in it.
+        os.remove(os.path.join(self.root, 'b', 'init.yml'))
+        os.mkdir(os.path.join(self.root, 'a', 'data'))
+        validated = self.scanner.validate(problem_globs, snapshot)
+        self.assertEqual([problem for problem, _ in validated.problems], self.scan_problems(problem_globs))
+        self.assertNotEqual(validated.problems, result.problems)
+
+        self.make_problem('group/deeper/new')
+        self.assertIsNone(self.scanner.validate(problem_globs, snapshot))
+
+    def test_bad_snapshot(self):
+        self.assertIsNone(load_snapshot(os.path.join(self.root, 'missing.json')))
+        with open(os.path.join(self.root, 'bad.json'), 'w') as f:
+            f.write('{')
+        self.assertIsNone(load_snapshot(os.path.join(self.root, 'bad.json')))
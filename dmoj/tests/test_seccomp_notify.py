@@ -0,0 +1,22 @@
+import errno
+import os
+import unittest
+
+from dmoj.benchmarks.seccomp_notify import run
+from dmoj.cptbox import SECCOMP_NOTIFY_SUPPORTED
+
+
+@unittest.skipUnless(SECCOMP_NOTIFY_SUPPORTED, 'seccomp user notifications are not supported')
+class SeccompNotifyTest(unittest.TestCase):
+    def test_same_as_ptrace(self):
+        ptrace, notify = run(count=100, runs=1)
+        self.assertFalse(ptrace['uses_seccomp_notify'])
+        self.assertTrue(notify['uses_seccomp_notify'])
+
+        for result in (ptrace, notify):
+            self.assertEqual(result['returncode'], 1)
+            self.assertIsNone(result['protection_fault'])
+            self.assertEqual(len(result['stdout'].split()), 100)
+            self.assertIn(os.strerror(errno.EACCES).encode(), result['stderr'])
+        self.assertEqual(ptrace['stdout'], notify['stdout'])
+        self.assertEqual(ptrace['stderr'], notify['stderr'])
@@ -0,0 +1,64 @@
+import os
+import shutil
+import unittest
+
+from dmoj.cptbox import PIPE, TracedPopen
+from dmoj.cptbox.isolate import IsolateTracer
+from dmoj.cptbox.syscall_profile import SyscallProfile
+from dmoj.executors.base_executor import BASE_FILESYSTEM, BASE_WRITE_FILESYSTEM
+
+
+class SyscallProfileTest(unittest.TestCase):
+    def test_summary(self):
+        profile = SyscallProfile()
+        profile.record_traps('sys_stat', 10)
+        profile.record_traps('sys_openat', 3)
+        profile.record_traps('sys_stat', 5)
+        profile.record_handler('sys_stat', 0.5)
+        profile.stop_time = 1
+        profile.wall_time = 2
+
+        summary = profile.summary(limit=1)
+        self.assertEqual(summary['traps'], 18)
+        self.assertEqual(summary['handler_time'], 0.5)
+        self.assertEqual(summary['top'], [{'syscall': 'stat', 'count': 15, 'handler_time': 0.5}])
+        self.assertIn('stat x15', profile.format())
+
+    def test_process(self):
+        head = shutil.which('head')
+        assert head is not None
+        process = TracedPopen(
+            [b'head', b'/dev/null', b'/dev/null', b'/dev/null'],
+            executable=os.fsencode(head),
+            security=IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM),
+            time=10,
+            memory=65536,
+            stdout=PIPE,
+            stderr=PIPE,
+            seccomp_notify=False,
+            profile=True,
+        )
+        process.communicate()
+        self.assertEqual(process.returncode, 0)
+
+        profile = process.profile
+        assert profile is not None
+        # Every file opened, including the libraries, is checked against the filesystem policy.
+        self.assertGreaterEqual(profile.traps.get('sys_openat', 0) + profile.traps.get('sys_open', 0), 3)
+        self.assertGreater(profile.stop_time, 0)
+        self.assertLessEqual(profile.stop_time, profile.wall_time)
+
+    def test_disabled(self):
+        head = shutil.which('head')
+        assert head is not None
+        process = TracedPopen(
+            [b'head', b'/dev/null'],
+            executable=os.fsencode(head),
+            security=IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM),
+            time=10,
+            memory=65536,
+            stdout=PIPE,
+            stderr=PIPE,
+        )
+        process.communicate()
+        self.assertIsNone(process.profile)
@@ -0,0 +1,117 @@
+import errno
+import unittest
+from unittest import mock
+
+from dmoj.cptbox import tracer
+from dmoj.cptbox.handlers import ACCESS_EPERM, ALLOW, ArgumentRule, DISALLOW, PID, _CALLBACK
+from dmoj.cptbox.isolate import native_fs_rule
+from dmoj.cptbox.syscalls import sys_execve, sys_openat, sys_read, sys_write, translator
+from dmoj.cptbox.tracer import (
+    NATIVE_ABI,
+    PTBOX_FS_CHECK_NONE,
+    PTBOX_FS_CHECK_OPEN,
+    PTBOX_SECCOMP_LANDLOCK_OPEN,
+    get_syscall_table,
+)
+
+
+class SyscallTableTest(unittest.TestCase):
+    def setUp(self):
+        tracer._build_syscall_table.cache_clear()
+        self.addCleanup(tracer._build_syscall_table.cache_clear)
+        patch = mock.patch('dmoj.cptbox.tracer.SyscallTable', side_effect=lambda *args: args)
+        self.table = patch.start()
+        self.addCleanup(patch.stop)
+
+    def native_calls(self, syscall):
+        index = tracer._SYSCALL_INDICIES[NATIVE_ABI]
+        return [call for call in translator[syscall][index] if call is not None]
+
+    def test_shared(self):
+        first = get_syscall_table({sys_read: ALLOW, sys_openat: lambda debugger: True})
+        second = get_syscall_table({sys_read: ALLOW, sys_openat: lambda debugger: False})
+        self.assertIs(first, second)
+        self.assertEqual(self.table.call_count, 1)
+
+        get_syscall_table({sys_read: ALLOW, sys_openat: ACCESS_EPERM})
+        self.assertEqual(self.table.call_count, 2)
+
+    def test_handlers(self):
+        handlers, seccomp_handlers, _, _ = get_syscall_table(
+            {sys_read: ALLOW, sys_write: ACCESS_EPERM, sys_openat: lambda debugger: True, sys_execve: ALLOW}
+        )
+
+        for syscall, handler, seccomp in [
+            (sys_read, ALLOW, 0),
+            (sys_write, _CALLBACK, errno.EPERM),
+            (sys_openat, _CALLBACK, -1),
+            # execve must always trap, so that we know when the process started.
+            (sys_execve, ALLOW, -1),
+        ]:
+            for call in self.native_calls(syscall):
+                self.assertEqual(handlers[NATIVE_ABI][call], handler)
+                self.assertEqual(seccomp_handlers[call], seccomp)
+
+        self.assertEqual(
+            handlers[NATIVE_ABI].count(DISALLOW),
+            len(handlers[NATIVE_ABI])
+            - sum(len(self.native_calls(syscall)) for syscall in (sys_read, sys_write, sys_openat, sys_execve)),
+        )
+
+    def test_fs_rules(self):
+        class Security(dict):
+            native_fs_rules = {sys_openat: 0x1234, sys_read: 0x5678}
+
+        _, _, fs_rules, _ = get_syscall_table(Security({sys_read: ALLOW, sys_openat: lambda debugger: True}))
+        for call in self.native_calls(sys_openat):
+            self.assertEqual(fs_rules[NATIVE_ABI][call], 0x1234)
+        # Only callbacks can be checked natively.
+        for call in self.native_calls(sys_read):
+            self.assertEqual(fs_rules[NATIVE_ABI][call], PTBOX_FS_CHECK_NONE)
+
+    def test_arg_rules(self):
+        class Security(dict):
+            native_arg_rules = {sys_openat: ArgumentRule(arg0={PID}), sys_read: ArgumentRule(arg0={0})}
+
+        _, _, _, arg_rules = get_syscall_table(Security({sys_read: ALLOW, sys_openat: lambda debugger: True}))
+        for call in self.native_calls(sys_openat):
+            self.assertEqual(arg_rules[NATIVE_ABI][call], ((0, (), True),))
+        # Only callbacks can be checked natively.
+        for call in self.native_calls(sys_read):
+            self.assertIsNone(arg_rules[NATIVE_ABI][call])
+
+    def test_landlock(self):
+        class Security(dict):
+            native_fs_rules = {sys_openat: native_fs_rule(PTBOX_FS_CHECK_OPEN, dir_reg=0, file_reg=1, flag_reg=2)}
+
+        security = Security({sys_openat: lambda debugger: True})
+        _, seccomp_handlers, _, _ = get_syscall_table(security)
+        for call in self.native_calls(sys_openat):
+            self.assertEqual(seccomp_handlers[call], -1)
+
+        # Landlock checks the open, unless its flags in the third argument ask for more than Landlock can check.
+        _, seccomp_handlers, _, _ = get_syscall_table(security, landlock=True)
+        for call in self.native_calls(sys_openat):
+            self.assertEqual(seccomp_handlers[call], PTBOX_SECCOMP_LANDLOCK_OPEN - 2)
+
+    def test_syscall_ids(self):
+        for syscall in (sys_read, sys_write, sys_openat):
+            for call in self.native_calls(syscall):
+                self.assertEqual(tracer._SYSCALL_IDS[NATIVE_ABI][call], syscall)
+
+    def test_argument_rule(self):
+        rule = ArgumentRule(arg2={3, 1, PID}, arg0={0})
+        self.assertEqual(rule.conditions, ((0, (0,), False), (2, (1, 3), True)))
+        self.assertEqual(rule, ArgumentRule(arg0={0}, arg2={PID, 1, 3}))
+        self.assertEqual(hash(rule), hash(ArgumentRule(arg0={0}, arg2={PID, 1, 3})))
+
+        with self.assertRaises(TypeError):
+            ArgumentRule(arg6={0})
+        with self.assertRaises(ValueError):
+            ArgumentRule(arg0={-1})
+        with self.assertRaises(ValueError):
+            ArgumentRule(arg0=set())
+
+    def test_not_callable(self):
+        with self.assertRaises(ValueError):
+            get_syscall_table({sys_read: 'allow'})
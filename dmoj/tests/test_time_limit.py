@@ -0,0 +1,44 @@
+import os
+import shutil
+import unittest
+
+from dmoj.cptbox import PIPE, TracedPopen
+from dmoj.cptbox.handlers import ALLOW
+from dmoj.cptbox.isolate import IsolateTracer
+from dmoj.cptbox.syscalls import sys_clock_nanosleep
+from dmoj.executors.base_executor import BASE_FILESYSTEM, BASE_WRITE_FILESYSTEM
+
+
+class TimeLimitTest(unittest.TestCase):
+    def popen(self, args, **kwargs) -> TracedPopen:
+        executable = shutil.which(args[0])
+        assert executable is not None
+        security = IsolateTracer(read_fs=BASE_FILESYSTEM, write_fs=BASE_WRITE_FILESYSTEM)
+        security[sys_clock_nanosleep] = ALLOW
+        process = TracedPopen(
+            [os.fsencode(arg) for arg in args],
+            executable=os.fsencode(executable),
+            security=security,
+            memory=262144,
+            stdout=PIPE,
+            stderr=PIPE,
+            **kwargs,
+        )
+        process.communicate()
+        return process
+
+    def test_cpu_time(self):
+        # A busy loop never traps, so its time must be known without waking it up.
+        process = self.popen(['sh', '-c', 'while :; do :; done'], time=0.2)
+        self.assertTrue(process.is_tle)
+        self.assertLess(process.wall_clock_time, 0.5)
+
+    def test_wall_time(self):
+        process = self.popen(['sleep', '10'], time=1, wall_time=0.2)
+        self.assertTrue(process.is_tle)
+        self.assertLess(process.wall_clock_time, 0.5)
+
+    def test_in_time(self):
+        process = self.popen(['sleep', '0.1'], time=1)
+        self.assertFalse(process.is_tle)
+        self.assertEqual(process.returncode, 0)
@@ -0,0 +1,55 @@
+import os
+import threading
+import unittest
+
+from dmoj.cptbox.tracer import TracerThreads
+
+
+class TracerThreadsTest(unittest.TestCase):
+    def test_reuse(self):
+        threads = TracerThreads()
+        ran = []
+        done = threading.Semaphore(0)
+
+        def job():
+            ran.append(threading.current_thread())
+            done.release()
+
+        for _ in range(5):
+            threads.run(job)
+            done.acquire()
+        self.assertEqual(len(ran), 5)
+        self.assertEqual(len(set(ran)), 1)
+
+    def test_concurrent(self):
+        threads = TracerThreads()
+        ran = []
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def job():
+            ran.append(threading.current_thread())
+            started.release()
+            # A traced process keeps its thread until it exits, so others can't wait for it.
+            release.wait()
+
+        for _ in range(3):
+            threads.run(job)
+        for _ in range(3):
+            started.acquire()
+        release.set()
+        self.assertEqual(len(set(ran)), 3)
+
+    def test_fork(self):
+        threads = TracerThreads()
+        done = threading.Semaphore(0)
+        threads.run(done.release)
+        done.acquire()
+
+        pid = os.fork()
+        if not pid:
+            # The idle thread is left behind in the parent, so the child has to start its own.
+            threads.run(done.release)
+            os._exit(0 if done.acquire(timeout=10) else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+from dmoj.error import CompileError
+from dmoj.problem import Problem, ProblemDataManager
+from dmoj.warmup import get_auxiliary_programs, warm_up_problem
+
+INIT = """
+interactive:
+  files: interactor.cpp
+  lang: CPP17
+checker:
+  name: bridged
+  args:
+    files: checker.cpp
+    type: testlib
+test_cases:
+- {in: 1.in, out: 1.out, points: 1}
+- {in: 2.in, out: 2.out, points: 1}
+- {generator: gen.cpp, generator_args: [1], points: 1}
+- batched:
+  - {generator: gen.cpp, generator_args: [2]}
+  - in: 3.in
+    out: 3.out
+    checker: {name: bridged, args: {files: other.cpp}}
+  points: 1
+"""
+
+
+class WarmupTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch('dmoj.problem.ProblemDataManager', side_effect=self.make_problem_data),
+            mock.patch('dmoj.problem.get_problem_root', return_value='/proc'),
+            mock.patch('dmoj.problem.compile_with_auxiliary_files'),
+            mock.patch('dmoj.checkers.bridged.get_executor'),
+            mock.patch('dmoj.graders.bridged.compile_with_auxiliary_files'),
+            mock.patch('dmoj.graders.bridged.get_problem_root', return_value='/proc'),
+        ]
+        self.mocks = [patch.start() for patch in patches]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+        _, _, self.compile_generator, self.compile_checker, self.compile_interactor, _ = self.mocks
+
+    def make_problem_data(self, root):
+        problem_data = ProblemDataManager(root)
+        problem_data.update({'init.yml': INIT})
+        return problem_data
+
+    def test_programs(self):
+        problem = Problem('test', 2, 16384, {})
+        programs = get_auxiliary_programs(problem)
+        # Test cases sharing a program only compile it once.
+        self.assertEqual(len(programs), 4)
+        self.assertEqual(sum(name.startswith('generator') for name in programs), 1)
+
+        for compile in programs.values():
+            compile()
+        self.assertEqual(self.compile_interactor.call_count, 1)
+        self.assertEqual(self.compile_checker.call_count, 2)
+        self.assertEqual(self.compile_generator.call_count, 1)
+
+    def test_failures(self):
+        self.compile_checker.side_effect = CompileError('checker.cpp: error')
+        failures = warm_up_problem('test')
+        self.assertEqual(len(failures), 2)
+        self.assertTrue(all(name.startswith('checker') for name, _ in failures))
+        self.assertIn('checker.cpp: error', failures[0][1])
@@ -0,0 +1,114 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <string.h>
+
+#define UNREFERENCED_PARAMETER(p)
+#if defined(_MSC_VER)
+#define inline __declspec(inline)
+#pragma warning(disable : 4127)
+#undef UNREFERENCED_PARAMETER
+#define UNREFERENCED_PARAMETER(p) (p)
+#elif !defined(__GNUC__)
+#define inline
+#endif
+
+/* Copies src to dst, translating \r\n and lone \r into \n. dst must be at least len bytes long.
+ * Sets *ends_cr if the last byte of src was a \r, in which case a \n at the start of the next
+ * block belongs to the same line break and must be dropped. Returns the number of bytes written. */
+static size_t normalize_block(const char *src, size_t len, char *dst, int *ends_cr) {
+    const char *end = src + len;
+    const char *cr;
+    char *out = dst;
+    size_t run;
+
+    *ends_cr = 0;
+    while ((cr = (const char *) memchr(src, '\r', end - src))) {
+        run = cr - src;
+        memcpy(out, src, run);
+        out += run;
+        *out++ = '\n';
+        src = cr + 1;
+        if (src == end) {
+            *ends_cr = 1;
+            break;
+        }
+        if (*src == '\n')
+            ++src;
+    }
+
+    run = end - src;
+    memcpy(out, src, run);
+    out += run;
+    return out - dst;
+}
+
+static PyObject *normalize_newlines(PyObject *self, PyObject *args, PyObject *kwargs) {
+    static char *kwlist[] = { "data", "skip_lf", "final", NULL };
+    Py_buffer view;
+    int skip_lf = 0, final = 0, ends_cr = 0, modified = 0, need_lf;
+    const char *src;
+    const char *cr;
+    Py_ssize_t len;
+    size_t out_len;
+    PyObject *result;
+
+    UNREFERENCED_PARAMETER(self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*|pp:normalize_newlines", kwlist, &view, &skip_lf, &final))
+        return NULL;
+
+    src = (const char *) view.buf;
+    len = view.len;
+
+    // The previous block ended in \r, which was already emitted as \n.
+    if (skip_lf && len && *src == '\n') {
+        ++src;
+        --len;
+        modified = 1;
+    }
+
+    // A trailing \r becomes \n, so only data ending in neither needs an extra line break.
+    need_lf = final && len && src[len - 1] != '\n' && src[len - 1] != '\r';
+    cr = len ? (const char *) memchr(src, '\r', len) : NULL;
+
+    if (!cr && !need_lf) {
+        // Fast path: nothing to translate, avoid copying when the input is already a bytes object.
+        if (!modified && view.obj && PyBytes_CheckExact(view.obj)) {
+            result = view.obj;
+            Py_INCREF(result);
+        } else {
+            result = PyBytes_FromStringAndSize(src, len);
+        }
+    } else {
+        result = PyBytes_FromStringAndSize(NULL, len + need_lf);
+        if (result) {
+            char *out = PyBytes_AS_STRING(result);
+            Py_BEGIN_ALLOW_THREADS;
+            out_len = normalize_block(src, len, out, &ends_cr);
+            if (need_lf)
+                out[out_len++] = '\n';
+            Py_END_ALLOW_THREADS;
+            modified = 1;
+            if (out_len != (size_t) (len + need_lf) && _PyBytes_Resize(&result, out_len) < 0)
+                result = NULL;
+        }
+    }
+
+    PyBuffer_Release(&view);
+    if (!result)
+        return NULL;
+    return Py_BuildValue("(NOO)", result, ends_cr ? Py_True : Py_False, modified ? Py_True : Py_False);
+}
+
+static PyMethodDef normalize_methods[] = {
+    { "normalize_newlines", (PyCFunction) (void (*)(void)) normalize_newlines, METH_VARARGS | METH_KEYWORDS,
+      "Normalize \\r\\n and \\r to \\n, returning (data, ends_with_cr, modified)." },
+    { NULL, NULL, 0, NULL }
+};
+
+static struct PyModuleDef moduledef = {
+    PyModuleDef_HEAD_INIT, "_normalize", NULL, -1, normalize_methods, NULL, NULL, NULL, NULL
+};
+
+PyMODINIT_FUNC PyInit__normalize(void) {
+    return PyModule_Create(&moduledef);
+}
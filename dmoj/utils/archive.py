@@ -0,0 +1,245 @@
+import io
+import json
+import mmap
+import os
+import struct
+import tempfile
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Union
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+ZSTD_ARCHIVE_MAGIC = b'DMOJZSA1'
+# Trailer: index offset, index length, magic.
+ZSTD_ARCHIVE_TRAILER = struct.Struct('<QQ8s')
+ZIP_LOCAL_HEADER = struct.Struct('<4s22xHH')
+ZIP_LOCAL_HEADER_MAGIC = b'PK\x03\x04'
+
+ARCHIVE_FORMATS = ('zip', 'stored', 'zstd')
+
+
+class BadArchiveError(Exception):
+    pass
+
+
+class MappedZipFile(zipfile.ZipFile):
+    """
+    A read-only ZipFile that serves uncompressed (ZIP_STORED) members directly out of a memory map of the archive,
+    bypassing zipfile's pure-Python read path. Compressed members are read through ZipFile as usual.
+    """
+
+    def __init__(self, file: str) -> None:
+        super().__init__(file, 'r')
+        assert self.fp is not None
+        try:
+            self._mmap: Optional[mmap.mmap] = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            super().close()
+            raise
+
+    def _stored_range(self, info: zipfile.ZipInfo) -> Optional[slice]:
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return None
+
+        assert self._mmap is not None
+        start = info.header_offset + ZIP_LOCAL_HEADER.size
+        if start > len(self._mmap):
+            raise BadArchiveError('truncated local header for %s' % info.filename)
+        magic, name_length, extra_length = ZIP_LOCAL_HEADER.unpack_from(self._mmap, info.header_offset)
+        if magic != ZIP_LOCAL_HEADER_MAGIC:
+            raise BadArchiveError('bad local header for %s' % info.filename)
+
+        start += name_length + extra_length
+        if start + info.file_size > len(self._mmap):
+            raise BadArchiveError('truncated data for %s' % info.filename)
+        return slice(start, start + info.file_size)
+
+    def open(self, name, mode='r', pwd=None, *, force_zip64=False):  # type: ignore[override]
+        if mode != 'r' or self._mmap is None:
+            return super().open(name, mode, pwd, force_zip64=force_zip64)
+
+        info = name if isinstance(name, zipfile.ZipInfo) else self.getinfo(name)
+        member = self._stored_range(info)
+        if member is None:
+            return super().open(info, mode, pwd)
+
+        data = self._mmap[member]
+        if zlib.crc32(data) != info.CRC:
+            raise BadArchiveError('bad CRC-32 for %s' % info.filename)
+        return io.BytesIO(data)
+
+    def close(self) -> None:
+        mapping = getattr(self, '_mmap', None)
+        if mapping is not None:
+            mapping.close()
+            self._mmap = None
+        super().close()
+
+
+class ZstdArchiveMember(NamedTuple):
+    filename: str
+    offset: int
+    compress_size: int
+    file_size: int
+
+
+class ZstdArchive:
+    """
+    An archive of independently zstd-compressed members followed by a JSON index, which allows any member to be
+    decompressed without touching the rest, and from multiple threads at once (zstandard releases the GIL).
+    """
+
+    def __init__(self, file: str) -> None:
+        if zstandard is None:
+            raise BadArchiveError('zstandard module not found, install it to read zstd archives')
+
+        with open(file, 'rb') as f:
+            try:
+                self._mmap: Optional[mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise BadArchiveError('empty archive')
+
+        try:
+            self._members = self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_index(self) -> Dict[str, ZstdArchiveMember]:
+        assert self._mmap is not None
+        size = len(self._mmap)
+        if (
+            size < len(ZSTD_ARCHIVE_MAGIC) + ZSTD_ARCHIVE_TRAILER.size
+            or self._mmap[: len(ZSTD_ARCHIVE_MAGIC)] != ZSTD_ARCHIVE_MAGIC
+        ):
+            raise BadArchiveError('not a zstd archive')
+
+        index_offset, index_length, magic = ZSTD_ARCHIVE_TRAILER.unpack_from(
+            self._mmap, size - ZSTD_ARCHIVE_TRAILER.size
+        )
+        if magic != ZSTD_ARCHIVE_MAGIC or index_offset + index_length > size - ZSTD_ARCHIVE_TRAILER.size:
+            raise BadArchiveError('bad zstd archive trailer')
+
+        try:
+            index = json.loads(self._mmap[index_offset : index_offset + index_length])
+            members = [ZstdArchiveMember(*entry) for entry in index]
+        except (ValueError, TypeError):
+            raise BadArchiveError('bad zstd archive index')
+
+        for member in members:
+            if member.offset + member.compress_size > index_offset:
+                raise BadArchiveError('bad offset for %s' % member.filename)
+        return {member.filename: member for member in members}
+
+    def namelist(self) -> List[str]:
+        return list(self._members)
+
+    def infolist(self) -> List[ZstdArchiveMember]:
+        return list(self._members.values())
+
+    def getinfo(self, name: str) -> ZstdArchiveMember:
+        try:
+            return self._members[name]
+        except KeyError:
+            raise KeyError('There is no item named %r in the archive' % name)
+
+    def read(self, name: Union[str, ZstdArchiveMember]) -> bytes:
+        if self._mmap is None:
+            raise ValueError('attempt to read from closed archive')
+        member = name if isinstance(name, ZstdArchiveMember) else self.getinfo(name)
+        try:
+            with memoryview(self._mmap) as view:
+                return zstandard.ZstdDecompressor().decompress(
+                    view[member.offset : member.offset + member.compress_size], max_output_size=member.file_size
+                )
+        except zstandard.ZstdError as e:
+            raise BadArchiveError('bad data for %s: %s' % (member.filename, e))
+
+    def open(self, name: Union[str, ZstdArchiveMember]) -> BinaryIO:
+        return io.BytesIO(self.read(name))
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> 'ZstdArchive':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+ProblemArchive = Union[MappedZipFile, ZstdArchive]
+
+
+def open_archive(path: str) -> ProblemArchive:
+    with open(path, 'rb') as f:
+        magic = f.read(len(ZSTD_ARCHIVE_MAGIC))
+
+    if magic == ZSTD_ARCHIVE_MAGIC:
+        return ZstdArchive(path)
+
+    try:
+        return MappedZipFile(path)
+    except (zipfile.BadZipFile, ValueError) as e:
+        raise BadArchiveError(str(e))
+
+
+def write_zstd_archive(archive: ProblemArchive, dst: BinaryIO, level: int = 3) -> None:
+    if zstandard is None:
+        raise BadArchiveError('zstandard module not found, install it to write zstd archives')
+
+    compressor = zstandard.ZstdCompressor(level=level, write_content_size=True)
+    index = []
+    dst.write(ZSTD_ARCHIVE_MAGIC)
+    offset = len(ZSTD_ARCHIVE_MAGIC)
+    for info in archive.infolist():
+        if info.filename.endswith('/'):
+            continue
+        data = archive.read(info.filename)
+        compressed = compressor.compress(data)
+        dst.write(compressed)
+        index.append([info.filename, offset, len(compressed), len(data)])
+        offset += len(compressed)
+
+    encoded_index = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    dst.write(encoded_index)
+    dst.write(ZSTD_ARCHIVE_TRAILER.pack(offset, len(encoded_index), ZSTD_ARCHIVE_MAGIC))
+
+
+def write_zip_archive(archive: ProblemArchive, dst: BinaryIO, compression: int = zipfile.ZIP_STORED) -> None:
+    with zipfile.ZipFile(dst, 'w', compression=compression, allowZip64=True) as out:
+        for info in archive.infolist():
+            if info.filename.endswith('/'):
+                continue
+            out.writestr(info.filename, archive.read(info.filename))
+
+
+def convert_archive(path: str, archive_format: str, level: int = 3) -> None:
+    """
+    Rewrites the archive at path in the given format. The file is replaced atomically, and keeps its name so that
+    problem configurations need not change; readers detect the format from the file contents.
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError('unknown archive format: %s' % archive_format)
+
+    dirname, basename = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.%s.' % basename, dir=dirname)
+    try:
+        with open_archive(path) as archive, os.fdopen(fd, 'wb') as dst:
+            if archive_format == 'zstd':
+                write_zstd_archive(archive, dst, level=level)
+            elif archive_format == 'stored':
+                write_zip_archive(archive, dst)
+            else:
+                write_zip_archive(archive, dst, compression=zipfile.ZIP_DEFLATED)
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
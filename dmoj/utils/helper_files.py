@@ -1,7 +1,7 @@
 import os
 import signal
 import tempfile
-from typing import IO, List, Optional, Sequence, TYPE_CHECKING
+from typing import List, Optional, Sequence, TYPE_CHECKING
 
 import requests
 
@@ -15,13 +15,6 @@ if TYPE_CHECKING:
     from dmoj.executors.base_executor import BaseExecutor
 
 
-def mktemp(data: bytes) -> IO:
-    tmp = tempfile.NamedTemporaryFile()
-    tmp.write(data)
-    tmp.flush()
-    return tmp
-
-
 def mkdtemp():
     return tempfile.TemporaryDirectory()
 
@@ -1,20 +1,61 @@
-from io import TextIOWrapper
+from typing import BinaryIO, Tuple
 
+DEFAULT_BLOCK_SIZE = 1048576
 
-def normalized_file_copy(src, dst, block_size=16384):
-    src_wrap = TextIOWrapper(src, encoding='iso-8859-1', newline=None)
-    dst_wrap = TextIOWrapper(dst, encoding='iso-8859-1', newline='')
 
-    add_newline = False
+def _normalize_newlines(data: bytes, skip_lf: bool = False, final: bool = False) -> Tuple[bytes, bool, bool]:
+    modified = False
+    if skip_lf and data[:1] == b'\n':
+        data = data[1:]
+        modified = True
+
+    need_lf = final and data and not data.endswith((b'\n', b'\r'))
+    if b'\r' not in data and not need_lf:
+        return data, False, modified
+
+    ends_cr = data.endswith(b'\r')
+    data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    if need_lf:
+        data += b'\n'
+    return data, ends_cr, True
+
+
+try:
+    from dmoj.utils._normalize import normalize_newlines
+except ImportError:
+    normalize_newlines = _normalize_newlines
+
+
+def normalized_bytes(data: bytes) -> bytes:
+    """
+    Normalizes all newline formats (\\r\\n, \\r, \\n) in data to \\n, and ensures that non-empty data ends with one.
+    Data that is already normalized is returned as-is, without copying.
+    """
+    return normalize_newlines(data, final=True)[0]
+
+
+def normalized_file_copy(src: BinaryIO, dst: BinaryIO, block_size: int = DEFAULT_BLOCK_SIZE) -> bool:
+    """
+    Copies src to dst with newlines normalized like `normalized_bytes`, one block at a time.
+    :return: True if the data was already normalized, i.e. dst is an exact copy of src.
+    """
+    skip_lf = False
+    modified = False
+    last = b'\n'
+
     while True:
-        buf = src_wrap.read(block_size)
+        buf = src.read(block_size)
         if not buf:
             break
-        dst_wrap.write(buf)
-        add_newline = not buf.endswith('\n')
+        # A \r\n pair may be split across blocks, so carry over whether the last block ended in \r.
+        buf, skip_lf, block_modified = normalize_newlines(buf, skip_lf)
+        modified |= block_modified
+        if buf:
+            dst.write(buf)
+            last = buf[-1:]
 
-    if add_newline:
-        dst_wrap.write('\n')
+    if last != b'\n':
+        dst.write(b'\n')
+        modified = True
 
-    src_wrap.detach()
-    dst_wrap.detach()
+    return not modified
@@ -0,0 +1,241 @@
+import glob
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from dmoj.utils.glob_ext import find_glob_root
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class DirectoryListing(NamedTuple):
+    mtime: float
+    subdirs: List[str]
+    has_config: bool
+
+
+class ScanResult(NamedTuple):
+    # (problem directory, mtime) in the order the globs were given, sorted within each glob
+    problems: List[Tuple[str, float]]
+    # mtimes of the directories traversed outside of problem directories; if none of these changed, no problem
+    # directories were added or removed
+    structure: Dict[str, float]
+
+
+def _list_directory(path: str) -> Optional[DirectoryListing]:
+    try:
+        mtime = os.stat(path).st_mtime
+        subdirs = []
+        has_config = False
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name == 'init.yml':
+                    has_config = entry.is_file()
+                elif entry.is_dir():
+                    subdirs.append(entry.name)
+    except OSError:
+        return None
+
+    if has_config:
+        has_config = os.access(os.path.join(path, 'init.yml'), os.R_OK)
+    return DirectoryListing(mtime, subdirs, has_config)
+
+
+def _stat_mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _matches(name: str, part: str) -> bool:
+    # Like glob, wildcards don't match hidden directories.
+    if name.startswith('.') and not part.startswith('.'):
+        return False
+    return fnmatch(name, part)
+
+
+def _matches_parts(names: Tuple[str, ...], parts: Tuple[str, ...]) -> bool:
+    if not parts:
+        return not names
+    part = parts[0]
+    if part == '**':
+        return _matches_parts(names, parts[1:]) or (
+            bool(names) and not names[0].startswith('.') and _matches_parts(names[1:], parts)
+        )
+    if not names:
+        return False
+    if not (_matches(names[0], part) if glob.has_magic(part) else names[0] == part):
+        return False
+    return _matches_parts(names[1:], parts[1:])
+
+
+def matches_glob(path: str, problem_glob: str) -> bool:
+    """
+    :return: whether a directory would be found by scanning a problem glob, which matches a path component at a time,
+             unlike fnmatch, where `*` also matches `/`.
+    """
+    root = str(find_glob_root(problem_glob))
+    try:
+        names = Path(os.path.normpath(path)).relative_to(root).parts
+    except ValueError:
+        return False
+    return _matches_parts(names, Path(problem_glob).relative_to(root).parts)
+
+
+class ProblemScanner:
+    """
+    Finds problem directories (those matching a problem glob and containing a readable init.yml) with os.scandir,
+    listing the directories of each level of the tree in parallel. This hides most of the latency of networked
+    filesystems, where every listing and stat is a round trip.
+    """
+
+    def __init__(self, threads: int = 8) -> None:
+        self.threads = max(threads, 1)
+
+    def scan(self, problem_globs: List[str]) -> ScanResult:
+        listings: Dict[str, 'Future[Optional[DirectoryListing]]'] = {}
+        problems: List[Tuple[str, float]] = []
+        seen_problems: Set[str] = set()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+
+            def listing(path: str) -> 'Future[Optional[DirectoryListing]]':
+                if path not in listings:
+                    listings[path] = pool.submit(_list_directory, path)
+                return listings[path]
+
+            for problem_glob in problem_globs:
+                found = []
+                for problem_dir, mtime in self._scan_glob(problem_glob, listing):
+                    if problem_dir not in seen_problems:
+                        seen_problems.add(problem_dir)
+                        found.append((problem_dir, mtime))
+                problems.extend(sorted(found))
+
+        structure = {}
+        for path, future in listings.items():
+            result = future.result()
+            if result is not None and not self._inside_problem(path, seen_problems):
+                structure[path] = result.mtime
+        return ScanResult(problems, structure)
+
+    def _scan_glob(self, problem_glob: str, listing) -> List[Tuple[str, float]]:
+        root = str(find_glob_root(problem_glob))
+        parts = Path(problem_glob).relative_to(root).parts
+        found = []
+
+        level = [(root, 0)]
+        seen = set(level)
+        while level:
+            # Start listing everything on this level before waiting on any of it.
+            for path, _ in level:
+                listing(path)
+
+            next_level = []
+            for path, index in level:
+                result = listing(path).result()
+                if result is None:
+                    continue
+
+                if index == len(parts):
+                    if result.has_config:
+                        found.append((path, result.mtime))
+                    continue
+
+                part = parts[index]
+                if part == '**':
+                    # `**` matches zero directories, which is the current one, or descends into any subdirectory.
+                    if (path, index + 1) not in seen:
+                        seen.add((path, index + 1))
+                        level.append((path, index + 1))
+                    states = [(os.path.join(path, name), index) for name in result.subdirs if not name.startswith('.')]
+                elif glob.has_magic(part):
+                    states = [(os.path.join(path, name), index + 1) for name in result.subdirs if _matches(name, part)]
+                else:
+                    states = [(os.path.join(path, part), index + 1)] if part in result.subdirs else []
+
+                for state in states:
+                    if state not in seen:
+                        seen.add(state)
+                        next_level.append(state)
+            level = next_level
+        return found
+
+    @staticmethod
+    def _inside_problem(path: str, problem_dirs: Set[str]) -> bool:
+        while True:
+            if path in problem_dirs:
+                return True
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+    def validate(self, problem_globs: List[str], snapshot: dict) -> Optional[ScanResult]:
+        """
+        Checks a snapshot written by save_snapshot against the filesystem, stat-ing the directories it recorded
+        instead of listing them.
+        :return: the snapshot's result with up-to-date problem mtimes, or None if the problem set may have changed.
+        """
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('globs') != problem_globs:
+            return None
+
+        structure: Dict[str, float] = snapshot['structure']
+        problems: List[Tuple[str, float]] = [(path, mtime) for path, mtime in snapshot['problems']]
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            structure_mtimes = pool.map(_stat_mtime, structure)
+            if any(mtime != structure[path] for path, mtime in zip(structure, structure_mtimes)):
+                return None
+
+            problem_mtimes = list(pool.map(_stat_mtime, [path for path, _ in problems]))
+
+        current = []
+        for (problem_dir, old_mtime), mtime in zip(problems, problem_mtimes):
+            if mtime is None:
+                return None
+            # If the problem directory changed, init.yml may have been removed.
+            if mtime != old_mtime and not os.access(os.path.join(problem_dir, 'init.yml'), os.R_OK):
+                continue
+            current.append((problem_dir, mtime))
+        return ScanResult(current, structure)
+
+
+def load_snapshot(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(path: str, problem_globs: List[str], result: ScanResult) -> None:
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'globs': problem_globs,
+        'problems': result.problems,
+        'structure': result.structure,
+    }
+
+    dirname = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, temp_path = tempfile.mkstemp(prefix='.problem-snapshot.', dir=dirname)
+    except OSError:
+        logger.exception('Failed to save problem snapshot to %s', path)
+        return
+
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+    except OSError:
+        logger.exception('Failed to save problem snapshot to %s', path)
+        os.unlink(temp_path)
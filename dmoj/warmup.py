@@ -0,0 +1,147 @@
+import logging
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dmoj.checkers.bridged import compile_checker
+from dmoj.config import ConfigNode
+from dmoj.problem import BaseTestCase, BatchedTestCase, Problem, TestCase
+from dmoj.utils.ansi import print_ansi
+
+logger = logging.getLogger(__name__)
+
+
+def _config_key(config) -> str:
+    return repr(config.unwrap() if isinstance(config, ConfigNode) else config)
+
+
+def _flatten_cases(cases: List[BaseTestCase]) -> Iterator[TestCase]:
+    for case in cases:
+        if isinstance(case, BatchedTestCase):
+            yield from _flatten_cases(case.batched_cases)
+        else:
+            assert isinstance(case, TestCase)
+            yield case
+
+
+def get_auxiliary_programs(problem: Problem) -> Dict[str, Callable]:
+    """
+    Finds the programs a problem compiles on behalf of submissions: interactors, communication managers,
+    bridged checkers and generators.
+    :return: a map of description to a function compiling the program, exactly as grading would.
+    """
+    from dmoj.graders.bridged import compile_interactor
+    from dmoj.graders.communication import compile_manager
+
+    programs: Dict[str, Callable] = {}
+
+    if 'interactive' in problem.config:
+        programs['interactor'] = lambda: compile_interactor(problem, problem.config.interactive)
+    if 'communication' in problem.config and 'manager' in problem.config.communication:
+        programs['manager'] = lambda: compile_manager(problem, problem.config.communication.manager)
+
+    for case in _flatten_cases(problem.cases()):
+        checker = case.config['checker']
+        if isinstance(checker, ConfigNode) and checker['name'] == 'bridged':
+            args = checker['args'] or ConfigNode()
+            key = 'checker ' + _config_key(args)
+            if key not in programs:
+                programs[key] = lambda args=args: compile_checker(problem.id, problem.storage_namespace, **args)
+
+        gen = case.config.generator
+        if gen and (not case.config['out'] or not case.config['in']):
+            key = 'generator ' + _config_key(gen)
+            if key not in programs:
+                programs[key] = lambda case=case, gen=gen: case._compile_generator(gen, case.config.generator_args)
+
+    return programs
+
+
+def warm_up_problem(problem_id: str, storage_namespace: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Compiles every auxiliary program of a problem into the compiled binary cache.
+    :return: a list of (program, error) for the programs that failed to compile.
+    """
+    from dmoj.judgeenv import env
+
+    failures = []
+    try:
+        problem = Problem(problem_id, env.generator_time_limit, env.generator_memory_limit, {}, storage_namespace)
+        programs = get_auxiliary_programs(problem)
+    except Exception as e:
+        return [('init.yml', str(e))]
+
+    for name, compile in programs.items():
+        try:
+            compile()
+        except Exception as e:
+            failures.append((name, getattr(e, 'message', None) or str(e)))
+    return failures
+
+
+def build_precompiled_headers() -> None:
+    """
+    Builds the precompiled headers of every loaded C/C++ executor with its default flags, by compiling a program
+    that uses them, so that the first submissions don't wait on it.
+    """
+    from dmoj.executors import executors
+    from dmoj.executors.c_like_executor import CLikeExecutor
+
+    for name, module in sorted(executors.items()):
+        executor = module.Executor
+        if not issubclass(executor, CLikeExecutor) or executor.pch_header is None:
+            continue
+        try:
+            executor('_pch', f'#include <{executor.pch_header}>\nint main() {{}}\n'.encode())
+        except Exception:
+            logger.exception('Failed to build precompiled header for %s', name)
+
+
+class WarmupWorker(Thread):
+    """
+    Compiles the auxiliary programs of updated problems in the background, so that the first submissions to them
+    don't pay for it, and broken programs are reported as soon as the problem data changes.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.daemon = True
+        self._trigger = Event()
+        self._terminate = False
+        self._lock = Lock()
+        self._pending: Set[Tuple[str, Optional[str]]] = set()
+
+    def warm_up(self, problem_ids: Iterable[str], storage_namespace: Optional[str] = None) -> None:
+        with self._lock:
+            self._pending.update((problem_id, storage_namespace) for problem_id in problem_ids)
+        self._trigger.set()
+
+    def stop(self) -> None:
+        self._terminate = True
+        self._trigger.set()
+
+    def run(self) -> None:
+        while True:
+            self._trigger.wait()
+            self._trigger.clear()
+            if self._terminate:
+                break
+
+            with self._lock:
+                pending = sorted(self._pending, key=lambda item: (item[1] or '', item[0]))
+                self._pending.clear()
+
+            for problem_id, storage_namespace in pending:
+                if self._terminate:
+                    return
+                logger.info('Warming up problem: %s', problem_id)
+                try:
+                    failures = warm_up_problem(problem_id, storage_namespace)
+                except Exception:
+                    logger.exception('Failed to warm up problem: %s', problem_id)
+                    continue
+
+                for name, error in failures:
+                    logger.error('Failed to compile %s of problem %s: %s', name, problem_id, error)
+                    print_ansi(
+                        f'#ansi[Warning: failed to compile {name} of problem {problem_id}](yellow)\n{error.rstrip()}'
+                    )
@@ -135,6 +135,8 @@ cptbox_sources = [
     'ptdebug_arm.cpp',
     'ptdebug_arm64.cpp',
     'ptdebug_freebsd_x64.cpp',
+    'ptfs.cpp',
+    'ptnotify.cpp',
     'ptproc.cpp',
 ]
 
@@ -144,7 +146,7 @@ if not has_pyx:
 SOURCE_DIR = os.path.dirname(__file__)
 cptbox_sources = [os.path.join(SOURCE_DIR, 'dmoj', 'cptbox', f) for f in cptbox_sources]
 
-libs = ['rt']
+libs = ['rt', 'pthread']
 if sys.platform.startswith('freebsd'):
     libs += ['procstat']
 else:
@@ -152,6 +154,7 @@ else:
 
 extensions = [
     Extension('dmoj.checkers._checker', sources=['dmoj/checkers/_checker.cpp']),
+    Extension('dmoj.utils._normalize', sources=['dmoj/utils/_normalize.c']),
     Extension('dmoj.cptbox._cptbox', sources=cptbox_sources, language='c++', libraries=libs),
     SimpleSharedObject('dmoj.utils.setbufsize', sources=['dmoj/utils/setbufsize.c']),
 ]
@@ -177,7 +180,7 @@ setup(
     ext_modules=cythonize(extensions),
     install_requires=['watchdog', 'pyyaml', 'termcolor', 'pygments', 'setproctitle', 'pylru', 'requests'],
     tests_require=['requests', 'parameterized'],
-    extras_require={'test': ['requests', 'parameterized']},
+    extras_require={'test': ['requests', 'parameterized'], 'zstd': ['zstandard']},
     cmdclass={'build_ext': build_ext_dmoj},
     author='DMOJ Team',
     author_email='contact@dmoj.ca',
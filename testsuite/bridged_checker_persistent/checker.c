@@ -0,0 +1,21 @@
+#include <stdio.h>
+#include <string.h>
+
+// Answers every check sent by the judge, rather than checking one case and exiting.
+int main() {
+    char input[4096], output[4096], answer[4096];
+    while (scanf("%4095s %4095s %4095s", input, output, answer) == 3) {
+        FILE *proc_output = fopen(output, "r"), *judge_output = fopen(answer, "r");
+        long long expected, actual;
+        if (!proc_output || !judge_output || fscanf(judge_output, "%lld", &expected) != 1)
+            return 3;
+
+        int code = fscanf(proc_output, "%lld", &actual) != 1 || actual != expected;
+        const char *feedback = code ? "wrong answer" : "";
+        printf("%d %zu 0\n%s", code, strlen(feedback), feedback);
+        fflush(stdout);
+        fclose(proc_output);
+        fclose(judge_output);
+    }
+    return 0;
+}